@@ -3,3 +3,4 @@ from .tools import *
 from .api import *
 from .prjman import ProjectManager
 from .dtw import *
+from .corpus import *
@@ -6,6 +6,11 @@ from PIL import Image
 
 class Animater:
     def __init__(self, data):
+        """Animaterの初期化
+        Args:
+            data(array-like): 正規化済みの (データ数, 2) の座標データ.
+                TrajectoryStore.getのビューはコピーせずにそのまま使う.
+        """
         self.__data = data
 
     def set_data(self, data):
@@ -56,7 +61,8 @@ class Animater:
         def __update(frame):
             x, y = self.__data[frame]
             trajectory_data.append([x, y])  # 現在の座標を軌跡データに追加
-            point.set_data(x, y)
+            # 1点でも系列として渡す（ビューの要素はnumpyのスカラーになるため）
+            point.set_data([x], [y])
             trajectory.set_data(*zip(*trajectory_data))  # 軌跡を更新
             ab = AnnotationBbox(im, (x, y), xycoords="data", frameon=False)
             ax.add_artist(ab)
@@ -1,33 +1,29 @@
 import sys
 import os
 from tqdm import tqdm
-import pandas as pd
 
 sys.path.append("../../")
 
-from tslearn.preprocessing import TimeSeriesScalerMinMax
-from tslearn.utils import to_time_series_dataset
-
-from prjman import ProjectManager
-from config import constants
-from utils import DfManager, parallel_runner, remove_extension
+from utils import remove_extension
+from corpus import TrajectoryCache
+from dtw import normalize_coordinate
 from animation import Animater
-from dtw import DTW
 
+# アニメーションにする点の数の上限
+MAX_POINTS = 101
+
+# 追跡済みの軌跡は正規化済みのキャッシュ（TrajectoryStoreのビュー）から取得する
+cache = TrajectoryCache("../../out/trajectory_cache", "../../out/tracked")
+cache.refresh()
 for file_name in tqdm(os.listdir("../../out/tracked")):
-    df = pd.read_csv(f"../../out/tracked/{file_name}")
-    if len(df.index) > 100:
-        print("too long")
-        df = df.loc[0:100]
     id = remove_extension(file_name)
-    data = (
-        TimeSeriesScalerMinMax()
-        .fit_transform(to_time_series_dataset([df[["x", "y"]].values.tolist()]))
-        .flatten()
-        .reshape(-1, 2)
-    )
+    data = cache.get(id)
+    if data is None:
+        continue
+    if len(data) > MAX_POINTS:
+        print("too long")
+        # 先頭の点だけで正規化し直す（軸ごとの最小・最大による正規化のため，元の座標から求めた場合と同じ）
+        data = normalize_coordinate(data[:MAX_POINTS])
     animater = Animater(data)
     print("animate")
     animater.generate_gif(f"../../out/animations/{id}.gif")
-    print("animate")
-    continue
@@ -0,0 +1,21 @@
+import sys
+import os
+
+sys.path.append("../../")
+
+from utils import remove_extension
+from corpus import TrajectoryCache
+from dtw import evaluate_fast_dtw
+
+# 追跡済みの全作品の軌跡でFastDTWの精度を確認する
+cache = TrajectoryCache("../../out/trajectory_cache", "../../out/tracked")
+cache.refresh()
+trajectories = []
+for file_name in os.listdir("../../out/tracked"):
+    trajectory = cache.get(remove_extension(file_name))
+    if trajectory is not None and len(trajectory) > 1:
+        trajectories.append(trajectory)
+
+report = evaluate_fast_dtw(trajectories, radii=(1, 2, 5, 10, 20), pair_num=500)
+print(report.to_string(index=False))
+report.to_csv("../../out/fastdtw_report.csv", index=False)
@@ -0,0 +1,62 @@
+import sys
+import os
+import time
+import itertools
+
+sys.path.append("../../")
+
+import pandas as pd
+
+from utils import read_project
+from converter import AstConverter
+from edit import EditCost, compact_ast_to_tree, tree_edit_distance
+
+try:
+    import zss
+except ImportError:
+    zss = None
+
+# 比較する作品JSONのディレクトリ（引数で指定できる）
+JSON_DIR = sys.argv[1] if len(sys.argv) > 1 else "../../sample_json"
+
+
+def to_zss(tree):
+    # 後行順の木をzssのノードに変換する（参照実装との比較用）
+    nodes = [zss.Node(label) for label in tree.labels]
+    stack = []
+    for i, node in enumerate(nodes):
+        while stack and tree.lml[stack[-1]] >= tree.lml[i]:
+            node.children.insert(0, nodes[stack.pop()])
+        stack.append(i)
+    return nodes[-1]
+
+
+trees = {}
+for file_name in sorted(os.listdir(JSON_DIR)):
+    project = read_project(os.path.join(JSON_DIR, file_name))
+    if not project or "targets" not in project:
+        continue
+    trees[file_name] = compact_ast_to_tree(AstConverter(project).get_compact_ast())
+
+cost = EditCost()
+rows = []
+for (name1, tree1), (name2, tree2) in itertools.combinations(trees.items(), 2):
+    row = {"pair": f"{name1} - {name2}", "size": f"{len(tree1)}x{len(tree2)}"}
+    for strategy in ["left", "right", "auto"]:
+        start = time.perf_counter()
+        row[strategy] = tree_edit_distance(tree1, tree2, cost, strategy)
+        row[f"{strategy}_ms"] = (time.perf_counter() - start) * 1000
+    if zss:
+        start = time.perf_counter()
+        row["zss"] = zss.distance(
+            to_zss(tree1),
+            to_zss(tree2),
+            zss.Node.get_children,
+            lambda node: 1,
+            lambda node: 1,
+            lambda a, b: cost.rename(a.label, b.label),
+        )
+        row["zss_ms"] = (time.perf_counter() - start) * 1000
+    rows.append(row)
+
+print(pd.DataFrame(rows).to_string(index=False))
@@ -1,27 +1,26 @@
 import sys
-import csv
 from tqdm import tqdm
+
 sys.path.append("../../")
 
 from api import get_username, get_project_num
+from utils import ToCsv
 
 num = 0
-for i in tqdm(range(996888792, 276751787, -1)):
-  with open('users.csv', 'a', newline='', encoding='utf-8') as file:
-      writer = csv.writer(file)
-      username = get_username(i)
-
-      if not username:
-        continue
+# 1行ごとにファイルを開かず，まとめて追記する
+with ToCsv("users.csv", append=True) as writer:
+    for i in tqdm(range(996888792, 276751787, -1)):
+        username = get_username(i)
 
-      project_num = get_project_num(username)
+        if not username:
+            continue
 
-      if not project_num:
-        continue
+        project_num = get_project_num(username)
 
-      if project_num > 19:
-        num += 1
-        writer.writerow([i, username, project_num])
-        print(num)
+        if not project_num:
+            continue
 
-    
\ No newline at end of file
+        if project_num > 19:
+            num += 1
+            writer.writeRow([i, username, project_num])
+            print(num)
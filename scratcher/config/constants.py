@@ -1,3 +1,4 @@
+import os
 import sys
 
 sys.path.append("../")
@@ -64,8 +65,15 @@ CHANGE_VARIABLE = "data_changevariableby"
 
 # パス
 COORDINATE_PATH = sys.path[-1] + "/out/coorfinate_final/"
+COORDINATE_STORE_PATH = sys.path[-1] + "/out/coordinate_store/"
 COORDINATE_LIST_PATH = sys.path[-1] + "out/coordinate_looped"
+TRACKED_PATH = sys.path[-1] + "/out/tracked/"
+TRAJECTORY_CACHE_PATH = sys.path[-1] + "/out/trajectory_cache/"
+DTW_CACHE_PATH = sys.path[-1] + "/out/dtw_cache.sqlite3"
 TOKEN_PATH = sys.path[-1] + "/cert/token.json"
+CONFIG_PATH = os.path.dirname(os.path.abspath(__file__))
+SIM_CSV_PATH = os.path.join(CONFIG_PATH, "sim.csv")
+FILTER_CSV_PATH = os.path.join(CONFIG_PATH, "filter.csv")
 
 
 # URL，トークン
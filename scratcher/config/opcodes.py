@@ -0,0 +1,203 @@
+# 語彙で固定のIDを振るオペコード（IDは特殊トークンの後ろにこの順で振る）．
+# 保存したIDを別のプロセスや後の実行でも同じ意味で読めるよう，並べ替え・削除はせず末尾にのみ追加する．
+# 先頭はconstants，filter.csv，sim.csvから語彙を作っていた頃と同じ順で，その後に拡張機能などのオペコードを続ける
+SCRATCH_OPCODES = [
+    "event_whenflagclicked",
+    "event_whenkeypressed",
+    "event_whenthisspriteclicked",
+    "event_whenbackdropswitchesto",
+    "event_whengreaterthan",
+    "event_whenbroadcastreceived",
+    "event_broadcast",
+    "event_broadcastandwait",
+    "control_repeat",
+    "control_forever",
+    "control_if",
+    "control_if_else",
+    "control_repeat_until",
+    "control_all_at_once",
+    "control_while",
+    "control_for_each",
+    "motion_movesteps",
+    "motion_turnright",
+    "motion_turnleft",
+    "motion_goto",
+    "motion_gotoxy",
+    "motion_glideto",
+    "motion_glidesecstoxy",
+    "motion_pointindirection",
+    "motion_pointtowards",
+    "motion_changexby",
+    "motion_setx",
+    "motion_changeyby",
+    "motion_sety",
+    "motion_ifonedgebounce",
+    "motion_setrotationstyle",
+    "procedures_call",
+    "data_setvariableto",
+    "data_changevariableby",
+    "procedures_definition",
+    "motion_pointtowards_menu",
+    "motion_goto_menu",
+    "motion_glideto_menu",
+    "sensing_keypressed",
+    "sensing_keyoptions",
+    "sensing_mousedown",
+    "sensing_mousex",
+    "sensing_mousey",
+    "sensing_setdragmode",
+    "sensing_distanceto",
+    "sensing_askandwait",
+    "event_whenstageclicked",
+    "makeymakey_whenMakeyKeyPressed",
+    "makeymakey_whenCodePressed",
+    "microbit_whenButtonPressed",
+    "microbit_isButtonPressed",
+    "microbit_whenGesture",
+    "motion_xposition",
+    "motion_yposition",
+    "motion_direction",
+    "looks_sayforsecs",
+    "looks_say",
+    "looks_thinkforsecs",
+    "looks_think",
+    "looks_show",
+    "looks_hide",
+    "looks_switchcostumeto",
+    "looks_nextcostume",
+    "looks_backdrops",
+    "looks_switchbackdropto",
+    "looks_nextbackdrop",
+    "looks_changesizeby",
+    "looks_setsizeto",
+    "looks_changeeffectby",
+    "looks_seteffectto",
+    "looks_cleargraphiceffects",
+    "looks_gotofrontback",
+    "looks_goforwardbackwardlayers",
+    "looks_costumenumbername",
+    "looks_backdropnumbername",
+    "looks_size",
+    "sound_play",
+    "sound_playuntildone",
+    "sound_stopallsounds",
+    "sound_changeeffectby",
+    "sound_seteffectto",
+    "sound_cleareffects",
+    "sound_changevolumeby",
+    "sound_setvolumeto",
+    "sound_volume",
+    "sensing_touchingobject",
+    "sensing_touchingobjectmenu",
+    "sensing_touchingcolor",
+    "sensing_coloristouchingcolor",
+    "sensing_answer",
+    "sensing_timer",
+    "sensing_resettimer",
+    "sensing_of",
+    "sensing_current",
+    "sensing_dayssince2000",
+    "sensing_username",
+    "operator_add",
+    "operator_subtract",
+    "operator_multiply",
+    "operator_divide",
+    "operator_random",
+    "operator_lt",
+    "operator_equals",
+    "operator_gt",
+    "operator_and",
+    "operator_or",
+    "operator_not",
+    "operator_join",
+    "operator_letter_of",
+    "operator_length",
+    "operator_mod",
+    "operator_contains",
+    "operator_round",
+    "operator_mathop",
+    "my_variable reporter Variables_variable",
+    "data_showvariable",
+    "data_hidevariable",
+    "list",
+    "data_addtolist",
+    "data_deleteoflist",
+    "data_insertatlist",
+    "data_replaceitemoflist stack Variables_list",
+    "data_replaceitemoflist",
+    "data_itemoflist",
+    "data_lengthoflist",
+    "data_listcontainsitem",
+    "data_showlist",
+    "data_hidelist",
+    "data_deletealloflist",
+    "data_itemnumoflist",
+    "music_playDrumForBeats",
+    "music_restForBeats",
+    "music_playNoteForBeats",
+    "music_setInstrument",
+    "music_setTempo",
+    "music_changeTempo",
+    "music_getTempo",
+    "pen_clear",
+    "pen_stamp",
+    "pen_penDown",
+    "pen_penUp",
+    "pen_setPenColorToColor",
+    "pen_changePenColorParamBy",
+    "pen_setPenColorParamTo",
+    "pen_changePenSizeBy",
+    "pen_setPenSizeTo",
+    "control_wait",
+    "control_wait_until",
+    "control_stop",
+    "control_start_as_clone",
+    "control_create_clone_of",
+    "control_create_clone_of_menu",
+    "control_delete_this_clone",
+    "sound_sounds_menu",
+    "argument_reporter_string_number",
+    "procedures_prototype",
+    "looks_costume",
+    "procedues_definition",
+    "pen_changePenHueBy",
+    "pen_setPenShadeToNumber",
+    "pen_changePenShadeBy",
+    "pen_setPenHueToNumber",
+    "pen_menu_colorParam",
+    "music_menu_DRUM",
+    "music_menu_INSTRUMENT",
+    "note",
+    "event_whentouchingobject",
+    "event_touchingobjectmenu",
+    "event_broadcast_menu",
+    "sensing_of_object_menu",
+    "sensing_distancetomenu",
+    "sensing_loudness",
+    "sensing_online",
+    "data_variable",
+    "data_listcontents",
+    "argument_reporter_boolean",
+    "math_number",
+    "math_positive_number",
+    "math_whole_number",
+    "math_integer",
+    "math_angle",
+    "colour_picker",
+    "text",
+    "videoSensing_whenMotionGreaterThan",
+    "videoSensing_videoOn",
+    "videoSensing_videoToggle",
+    "videoSensing_setVideoTransparency",
+    "videoSensing_menu_ATTRIBUTE",
+    "videoSensing_menu_SUBJECT",
+    "videoSensing_menu_VIDEO_STATE",
+    "text2speech_speakAndWait",
+    "text2speech_setVoice",
+    "text2speech_setLanguage",
+    "text2speech_menu_voices",
+    "text2speech_menu_languages",
+    "translate_getTranslate",
+    "translate_getViewerLanguage",
+    "translate_menu_languages",
+]
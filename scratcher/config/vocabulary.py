@@ -0,0 +1,226 @@
+import sys
+
+sys.path.append("../")
+
+import csv
+import threading
+
+import numpy as np
+
+from config import constants
+from config.opcodes import SCRATCH_OPCODES
+
+# オペコード以外のトークン．<unk>は作品の初期状態の行など，ブロックでない行に使う
+UNKNOWN = "<unk>"
+SCRIPT = "SCRIPT"
+SUBSTACK = "SUBSTACK"
+SPECIAL_TOKENS = [UNKNOWN, SCRIPT, SUBSTACK]
+UNKNOWN_ID = 0
+# 保存した列で，固定のIDを持たないオペコード（読み込む側でブロック名から変換する）を表す値
+OTHER_ID = -1
+DTYPE = np.int16
+# Sorterの出力でブロック名とIDを保存する列名．IDが実行ごとに変わっていた頃のopcode列とは区別する
+NAME_COLUMN = "BlockName"
+OPCODE_COLUMN = "opcode_id"
+
+# 語彙に含めるconstantsのオペコード
+CONSTANT_OPCODES = (
+    constants.EVENT_BLOCKS
+    + constants.CONTROL_BLOCKS
+    + constants.COORDINATE_BLOCKS
+    + constants.BOUND_FIELDS
+    + constants.PROCEDURES_CALL
+    + constants.VARIABLE_BLOCKS
+    + [constants.PROCEDURES_DEFINE]
+)
+
+
+class Vocabulary:
+    """オペコードを小さな整数のIDに変換（インターン）するためのクラス
+
+    特殊トークンとSCRATCH_OPCODESには，プロセスや設定ファイルによらない固定のIDを振る．
+    constants，filter.csv，sim.csvにのみあるオペコードと，初めて出現したオペコードには後ろにIDを追加する．
+    後ろのIDはプロセスごとに異なり得るため，保存する場合はget_stored_idでOTHER_IDに置き換える．
+    複数のスレッドから使ってもよい．
+    """
+
+    def __init__(
+        self, filter_path=constants.FILTER_CSV_PATH, sim_path=constants.SIM_CSV_PATH
+    ):
+        """Vocabularyの初期化
+        Args:
+            filter_path(str, optional): フィルタリング用CSVのパス.
+            sim_path(str, optional): 抽象化用CSVのパス.
+        """
+        self.__ids = {}
+        self.__opcodes = []
+        self.__lock = threading.Lock()
+        for opcode in SPECIAL_TOKENS + SCRATCH_OPCODES:
+            self.get_id(opcode)
+        self.__stable_size = len(self.__opcodes)
+        for opcode in CONSTANT_OPCODES:
+            self.get_id(opcode)
+        for path in [filter_path, sim_path]:
+            if not path:
+                continue
+            with open(path, encoding="utf-8-sig") as f:
+                for row in list(csv.reader(f))[1:]:
+                    # filter.csvの "Motion(3.0)" のような区切り行は除く
+                    if row and "(" not in row[0]:
+                        self.get_id(row[0].strip())
+        self.__base_size = len(self.__opcodes)
+
+    def __getstate__(self):
+        # ロックはpickleできないため，プロセスに渡す場合は除く
+        state = self.__dict__.copy()
+        del state["_Vocabulary__lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__opcodes)
+
+    def __contains__(self, opcode):
+        return opcode in self.__ids
+
+    def get_stable_size(self):
+        """固定のIDを振ったオペコードの数を取得
+        Returns:
+            int: これより小さいIDはプロセスや設定ファイルによらず変わらない（保存してよい）
+        """
+        return self.__stable_size
+
+    def get_base_size(self):
+        """設定ファイルから固定のIDを振ったオペコードの数を取得
+        Returns:
+            int: これより小さいIDは実行ごとに変わらない
+        """
+        return self.__base_size
+
+    def get_id(self, opcode, add=True):
+        """オペコードのIDを取得
+        Args:
+            opcode(str): ブロックのオペコード
+            add(boolean, optional): 語彙にない場合に追加するか. Falseの場合はUNKNOWN_IDを返す.
+
+        Returns:
+            int: オペコードのIDを返す
+        """
+        id = self.__ids.get(opcode)
+        if id is None:
+            if not add:
+                return UNKNOWN_ID
+            # 複数のスレッドが同時に追加しても，同じオペコードに別のIDを振らないようにする
+            with self.__lock:
+                id = self.__ids.get(opcode)
+                if id is None:
+                    id = len(self.__opcodes)
+                    self.__opcodes.append(opcode)
+                    self.__ids[opcode] = id
+        return id
+
+    def get_stored_id(self, opcode):
+        """保存用のIDを取得
+        Args:
+            opcode(str): ブロックのオペコード
+
+        Returns:
+            int: 固定のIDを持つ場合はそのID，持たない場合はOTHER_IDを返す
+        """
+        id = self.get_id(opcode)
+        return id if id < self.__stable_size else OTHER_ID
+
+    def get_opcode(self, id):
+        """IDからオペコードを取得
+        Args:
+            id(int): オペコードのID
+
+        Returns:
+            str: オペコードを返す
+        """
+        return self.__opcodes[id]
+
+    def get_ids(self, opcodes):
+        """複数のオペコードのIDの集合を取得
+        Args:
+            opcodes(list): オペコードのリスト
+
+        Returns:
+            frozenset: IDの集合を返す
+        """
+        return frozenset(self.get_id(opcode) for opcode in opcodes)
+
+    def encode(self, opcodes, add=True):
+        """オペコードの列をIDの配列に変換
+        Args:
+            opcodes(list): オペコードの列
+            add(boolean, optional): 語彙にないオペコードを追加するか.
+
+        Returns:
+            numpy.ndarray: IDのint16の配列を返す
+        """
+        return np.fromiter(
+            (self.get_id(opcode, add) for opcode in opcodes), dtype=DTYPE
+        )
+
+    def decode(self, ids):
+        """IDの配列をオペコードのリストに変換
+        Args:
+            ids(array-like): IDの配列
+
+        Returns:
+            list: オペコードのリストを返す
+        """
+        return [self.__opcodes[id] for id in np.asarray(ids).tolist()]
+
+    def encode_blocks(self, df):
+        """Sorter.sort_blocksの結果（保存したCSVを含む）をIDの配列に変換
+        opcode_id列の固定のIDはそのまま使い，固定のIDを持たない行と，列のない古いCSVはブロック名から変換する．
+        1行目（作品の初期状態）はUNKNOWN_IDとする．
+
+        Args:
+            df(Dataframe): Sorter.sort_blocksで取得したDataframe
+
+        Returns:
+            numpy.ndarray: IDのint64の配列を返す
+        """
+        if OPCODE_COLUMN in df:
+            ids = np.array(df[OPCODE_COLUMN].fillna(OTHER_ID), dtype=np.int64)
+        else:
+            ids = np.full(len(df.index), OTHER_ID, dtype=np.int64)
+        ids[:1] = UNKNOWN_ID
+        others = np.flatnonzero((ids < 0) | (ids >= self.__stable_size))
+        if len(others):
+            names = df[NAME_COLUMN].to_numpy()
+            ids[others] = [self.get_id(str(names[i])) for i in others]
+        return ids
+
+    def match(self, predicate):
+        """条件を満たすオペコードのIDを表すマスクを取得
+        Args:
+            predicate(function): オペコードを受け取り，booleanを返す関数
+
+        Returns:
+            numpy.ndarray: IDをインデックスとするbooleanの配列を返す
+        """
+        return np.fromiter((predicate(opcode) for opcode in self.__opcodes), dtype=bool)
+
+
+__vocabulary = None
+__vocabulary_lock = threading.Lock()
+
+
+def get_vocabulary():
+    """プロセス内で共有する語彙を取得
+    Returns:
+        Vocabulary: 初回のみ設定ファイルから作成した語彙を返す
+    """
+    global __vocabulary
+    if __vocabulary is None:
+        with __vocabulary_lock:
+            if __vocabulary is None:
+                __vocabulary = Vocabulary()
+    return __vocabulary
@@ -1 +1,3 @@
 from .ast_converter import AstConverter
+from .abstracter import Abstracter
+from .compact_ast import CompactAst, build_compact_ast
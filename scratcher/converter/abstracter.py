@@ -0,0 +1,160 @@
+import csv
+
+import numpy as np
+
+from config import constants
+from config.vocabulary import DTYPE, NAME_COLUMN, get_vocabulary
+
+SUBSTACK_KEYS = ["SUBSTACK", "SUBSTACK2"]
+
+
+class Abstracter:
+    """sim.csvのブロックの抽象化を，整数の対応表にまとめて適用するためのクラス
+
+    オペコードIDは共有の語彙（config.vocabulary）のIDを使い，抽象クラスに整数のIDを振って
+    オペコードID -> 抽象クラスID の対応表（int16）で変換する．
+    sim.csvにないオペコードは，そのオペコード自身を抽象クラスとする．
+    """
+
+    def __init__(self, sim_path=constants.SIM_CSV_PATH, vocabulary=None):
+        """Abstracterの初期化
+        Args:
+            sim_path(str, optional): 抽象化用CSVのパス. Noneの場合は抽象化しない.
+            vocabulary(Vocabulary, optional): オペコードの語彙. 指定なしだと共有の語彙.
+        """
+        self.__vocabulary = vocabulary or get_vocabulary()
+        self.__block_absts = {}
+        self.__class_ids = {}
+        self.__class_names = []
+        self.__classes = []
+        self.__lookup = None
+        if sim_path:
+            with open(sim_path, encoding="utf-8-sig") as f:
+                for block, block_abst in list(csv.reader(f))[1:]:
+                    self.__block_absts[block.strip()] = block_abst.strip()
+
+    def __len__(self):
+        return len(self.__vocabulary)
+
+    def get_vocabulary(self):
+        return self.__vocabulary
+
+    def get_opcode_id(self, opcode):
+        """オペコードのIDを取得
+        Args:
+            opcode(str): ブロックのオペコード
+
+        Returns:
+            int: オペコードのIDを返す
+        """
+        return self.__vocabulary.get_id(opcode)
+
+    def get_class_id(self, opcode):
+        """オペコードの抽象クラスのIDを取得
+        Args:
+            opcode(str): ブロックのオペコード
+
+        Returns:
+            int: 抽象クラスのIDを返す
+        """
+        return self.get_lookup()[self.get_opcode_id(opcode)]
+
+    def get_class_name(self, class_id):
+        """抽象クラスのIDから抽象クラス名を取得
+        Args:
+            class_id(int): 抽象クラスのID
+
+        Returns:
+            str: 抽象クラス名を返す
+        """
+        return self.__class_names[class_id]
+
+    def get_abstract_class(self, opcode):
+        """オペコードの抽象クラス名を取得
+        Args:
+            opcode(str): ブロックのオペコード
+
+        Returns:
+            str: 抽象クラス名を返す
+        """
+        return self.__class_names[self.get_class_id(opcode)]
+
+    def get_lookup(self):
+        """オペコードID -> 抽象クラスID の対応表を取得
+        Returns:
+            numpy.ndarray: オペコードIDをインデックスとするint16の配列を返す
+        """
+        # 語彙に追加されたオペコードの分だけ対応表を伸ばす
+        for opcode_id in range(len(self.__classes), len(self.__vocabulary)):
+            opcode = self.__vocabulary.get_opcode(opcode_id)
+            block_abst = self.__block_absts.get(opcode, opcode)
+            if block_abst not in self.__class_ids:
+                self.__class_ids[block_abst] = len(self.__class_names)
+                self.__class_names.append(block_abst)
+            self.__classes.append(self.__class_ids[block_abst])
+        if self.__lookup is None or len(self.__lookup) != len(self.__classes):
+            self.__lookup = np.array(self.__classes, dtype=DTYPE)
+        return self.__lookup
+
+    def encode(self, opcodes):
+        """オペコードの列をIDの配列に変換
+        Args:
+            opcodes(list): オペコードの列
+
+        Returns:
+            numpy.ndarray: オペコードIDのint16の配列を返す
+        """
+        return self.__vocabulary.encode(opcodes)
+
+    def abstract(self, opcodes):
+        """オペコードの列を抽象クラスIDの配列に変換
+        Args:
+            opcodes(list or numpy.ndarray): オペコードの列，または語彙のIDの配列
+
+        Returns:
+            numpy.ndarray: 抽象クラスIDのint16の配列を返す
+        """
+        if not isinstance(opcodes, np.ndarray) or opcodes.dtype.kind not in "iu":
+            opcodes = self.encode(opcodes)
+        return self.get_lookup()[opcodes]
+
+    def abstract_blocks(self, df, column=NAME_COLUMN):
+        """Sorterでソートしたブロックを抽象クラスIDの配列に変換
+        Args:
+            df(Dataframe): Sorter.sort_blocksで取得したDataframe
+            column(str, optional): オペコードの列名. ブロック名の列ではopcode_id列の固定のIDを使い，1行目（初期状態）はUNKNOWN_IDとする
+
+        Returns:
+            numpy.ndarray: 抽象クラスIDのint16の配列を返す
+        """
+        if column == NAME_COLUMN:
+            return self.abstract(self.__vocabulary.encode_blocks(df).astype(DTYPE))
+        return self.abstract(str(opcode) for opcode in df[column])
+
+    def abstract_tree(self, tree):
+        """木の各ノードを抽象クラスIDの配列に変換
+        Args:
+            tree(Tree): edit.Tree
+
+        Returns:
+            numpy.ndarray: 後行順に並べた抽象クラスIDのint16の配列を返す
+        """
+        return self.abstract(tree.labels)
+
+    def abstract_ast(self, ast):
+        """AstConverter.get_astで取得したASTのブロックを抽象クラスIDの配列に変換
+        Args:
+            ast(dictionary): AstConverter.get_astで取得したAST
+
+        Returns:
+            numpy.ndarray: スクリプトごとに先行順に並べた抽象クラスIDのint16の配列を返す
+        """
+        opcodes = []
+        for script in ast["sprites"]:
+            stack = list(reversed(script["blocks"]))
+            while stack:
+                block = stack.pop()
+                opcodes.append(block["name"])
+                for key in reversed(SUBSTACK_KEYS):
+                    stack.extend(reversed(block.get(key, [])))
+        return self.abstract(opcodes)
@@ -1,6 +1,7 @@
 import json
 
 from config import constants
+from .compact_ast import build_compact_ast
 
 
 class AstConverter:
@@ -11,6 +12,8 @@ class AstConverter:
         self.__ast = {"type": "Scratch", "sprites": []}
 
     def get_ast(self, path=""):
+        # 呼び出しのたびにスクリプトが重複して追加されないよう作り直す
+        self.__ast = {"type": "Scratch", "sprites": []}
         self.__project_to_ast()
         if path:
             with open(path, "w") as json_file:
@@ -20,6 +23,13 @@ class AstConverter:
 
         return ast
 
+    def get_compact_ast(self):
+        """配列で管理するASTを取得
+        Returns:
+            CompactAst: オペコードID，親，最初の子，次の兄弟の配列と，入力値の表からなるASTを返す
+        """
+        return build_compact_ast(self.__project)
+
     def __has_nextblock(self, block):
         if block["next"]:
             return True
@@ -33,7 +43,6 @@ class AstConverter:
             block = self.__blocks[hash]
             block_ast = self.__block_to_ast(block)
             children_ast.append(block_ast)
-            print("children")
             if self.__has_nextblock(block):
                 hash = block["next"]
                 continue
@@ -46,17 +55,15 @@ class AstConverter:
         block_ast = {
             "name": block["opcode"],
         }
-        if block in self.__C_BLOCKS:
-            if block == "control_if_else":
-                for key in ["SUBSTACK", "SUBSTACK2"]:
-                    if key in block["inputs"]:
-                        block_ast.update(
-                            {key: self.__children_to_ast(block["inputs"][key][1])}
-                        )
-            else:
-                if "SUBSTACK" in block["inputs"]:
+        if block["opcode"] in self.__C_BLOCKS:
+            keys = ["SUBSTACK"]
+            if block["opcode"] == "control_if_else":
+                keys.append("SUBSTACK2")
+            for key in keys:
+                # 中身が空のSUBSTACKは [2, null] のように保存される
+                if key in block["inputs"] and block["inputs"][key][1]:
                     block_ast.update(
-                        {"SUBSTACK": self.__children_to_ast(block["inputs"][key][1])}
+                        {key: self.__children_to_ast(block["inputs"][key][1])}
                     )
         else:
             block_ast.update({"inputs": block["inputs"]})
@@ -70,7 +77,6 @@ class AstConverter:
             block = self.__blocks[hash]
             block_ast = self.__block_to_ast(block)
             sprite_ast.append(block_ast)
-            print("sprite")
             if self.__has_nextblock(block):
                 hash = block["next"]
                 continue
@@ -86,7 +92,8 @@ class AstConverter:
             self.__blocks = json_blocks
             # ステージは無視
             for hash, block in self.__blocks.items():
-                if block["topLevel"] == True:
+                # 変数などのトップレベルのレポーターはリストで保存されているため除く
+                if isinstance(block, dict) and block["topLevel"] == True:
                     sprite_ast = self.__sprite_to_ast(hash)
 
                     self.__ast["sprites"].append(
@@ -0,0 +1,295 @@
+import numpy as np
+
+from config import constants
+from config.vocabulary import SCRIPT, SUBSTACK, DTYPE, get_vocabulary
+
+ROOT = "Scratch"
+SUBSTACK_KEYS = ["SUBSTACK", "SUBSTACK2"]
+# 入力値のプリミティブの種類（Scratch 3.0の形式）
+NUMBER_PRIMITIVES = [4, 5, 6, 7, 8]
+TEXT_PRIMITIVES = [9, 10, 11, 12, 13]
+
+# 入力値の表の列と型
+NUMBER_COLUMNS = {
+    "node": np.int32,
+    "name": np.int16,
+    "kind": np.int8,
+    "value": np.float64,
+}
+TEXT_COLUMNS = {"node": np.int32, "name": np.int16, "kind": np.int8, "value": np.str_}
+FIELD_COLUMNS = {"node": np.int32, "name": np.int16, "value": np.str_}
+REPORTER_COLUMNS = {"node": np.int32, "name": np.int16, "opcode": DTYPE}
+TABLES = {
+    "numbers": NUMBER_COLUMNS,
+    "texts": TEXT_COLUMNS,
+    "fields": FIELD_COLUMNS,
+    "reporters": REPORTER_COLUMNS,
+}
+
+
+class CompactAst:
+    """ASTをノードごとの配列で管理するためのクラス
+
+    ノードは先行順に並べ，根（Scratch），スクリプトごとのSCRIPTノード，ブロックからなる．
+    if-elseブロックの中身はSUBSTACKノードを挟む（edit.ast_to_treeと同じ構造）．
+    入力値はノードに埋め込まず，種類ごとの表（数値，文字列，フィールド，レポーター）に分ける．
+
+    Args:
+        opcodes (numpy.ndarray): 各ノードのオペコードのID（config.vocabulary）
+        parents (numpy.ndarray): 各ノードの親ノードのインデックス．根は-1
+        first_child (numpy.ndarray): 各ノードの最初の子ノードのインデックス．ない場合は-1
+        next_sibling (numpy.ndarray): 各ノードの次の兄弟ノードのインデックス．ない場合は-1
+        sprites (list): スプライト名のリスト
+        script_sprites (numpy.ndarray): 各SCRIPTノードのノード番号とスプライト番号の (スクリプト数, 2) の配列
+        input_names (list): 入力値・フィールドの名前のリスト（表のname列はこのインデックス）
+        numbers (dictionary): node, name, kind, value 列の数値の入力値の表
+        texts (dictionary): node, name, kind, value 列の文字列の入力値の表
+        fields (dictionary): node, name, value 列のフィールドの表
+        reporters (dictionary): node, name, opcode 列の，入力に差し込まれたレポーターの表
+    """
+
+    def __init__(self, opcodes, parents, sprites, script_sprites, input_names, tables):
+        """CompactAstの初期化（通常はbuild_compact_astかloadで作成する）
+        Args:
+            opcodes(array-like): 各ノードのオペコードのID
+            parents(array-like): 各ノードの親ノードのインデックス
+            sprites(list): スプライト名のリスト
+            script_sprites(array-like): (SCRIPTノード, スプライト番号) の配列
+            input_names(list): 入力値・フィールドの名前のリスト
+            tables(dictionary): 表の名前 -> 列の名前 -> 値の配列
+        """
+        self.opcodes = np.asarray(opcodes, dtype=DTYPE)
+        self.parents = np.asarray(parents, dtype=np.int32)
+        self.sprites = list(sprites)
+        self.script_sprites = np.asarray(script_sprites, dtype=np.int32).reshape(-1, 2)
+        self.input_names = list(input_names)
+        for table, columns in TABLES.items():
+            setattr(
+                self,
+                table,
+                {
+                    column: np.asarray(tables[table][column], dtype=dtype)
+                    for column, dtype in columns.items()
+                },
+            )
+
+        # 先行順のため，同じ親の子ノードはインデックスの昇順に並ぶ
+        self.first_child = np.full(len(self.parents), -1, dtype=np.int32)
+        self.next_sibling = np.full(len(self.parents), -1, dtype=np.int32)
+        nodes = np.arange(1, len(self.parents), dtype=np.int32)
+        order = np.argsort(self.parents[1:], kind="stable")
+        nodes = nodes[order]
+        parents = self.parents[nodes]
+        is_first = np.ones(len(nodes), dtype=bool)
+        is_first[1:] = parents[1:] != parents[:-1]
+        self.first_child[parents[is_first]] = nodes[is_first]
+        self.next_sibling[nodes[:-1][~is_first[1:]]] = nodes[1:][~is_first[1:]]
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    def get_labels(self):
+        """各ノードのオペコードを取得
+        Returns:
+            list: 先行順に並べたオペコードのリストを返す
+        """
+        return get_vocabulary().decode(self.opcodes)
+
+    def get_children(self, node):
+        """子ノードを取得
+        Args:
+            node(int): ノードのインデックス
+
+        Returns:
+            list: 子ノードのインデックスのリストを返す
+        """
+        children = []
+        child = self.first_child[node]
+        while child != -1:
+            children.append(int(child))
+            child = self.next_sibling[child]
+        return children
+
+    def get_scripts(self):
+        """スクリプトごとのSCRIPTノードとスプライト名を取得
+        Returns:
+            list: (SCRIPTノードのインデックス, スプライト名) のリストを返す
+        """
+        return [
+            (int(node), self.sprites[sprite]) for node, sprite in self.script_sprites
+        ]
+
+    def get_inputs(self, node):
+        """ノードの入力値とフィールドを取得
+        Args:
+            node(int): ノードのインデックス
+
+        Returns:
+            dictionary: 入力値・フィールドの名前 -> 値 を返す．レポーターの場合はオペコード
+        """
+        inputs = {}
+        for table in ["numbers", "texts", "fields"]:
+            columns = getattr(self, table)
+            for i in np.flatnonzero(columns["node"] == node):
+                inputs[self.input_names[columns["name"][i]]] = columns["value"][
+                    i
+                ].item()
+        for i in np.flatnonzero(self.reporters["node"] == node):
+            inputs[self.input_names[self.reporters["name"][i]]] = (
+                get_vocabulary().get_opcode(self.reporters["opcode"][i])
+            )
+        return inputs
+
+    def save(self, path):
+        """npzで保存
+        オペコードのIDは実行ごとに変わりうるため，使っているオペコードの名前と一緒に保存する．
+
+        Args:
+            path(str): 保存先のパス（.npz）
+        """
+        used, opcodes = np.unique(
+            np.concatenate([self.opcodes, self.reporters["opcode"]]),
+            return_inverse=True,
+        )
+        arrays = {
+            "opcode_names": np.array(get_vocabulary().decode(used), dtype=np.str_),
+            "opcodes": opcodes[: len(self)],
+            "reporters.opcode": opcodes[len(self) :],
+            "parents": self.parents,
+            "sprites": np.array(self.sprites, dtype=np.str_),
+            "script_sprites": self.script_sprites,
+            "input_names": np.array(self.input_names, dtype=np.str_),
+        }
+        for table, columns in TABLES.items():
+            for column in columns:
+                arrays.setdefault(f"{table}.{column}", getattr(self, table)[column])
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """saveで保存したASTを読み込む
+        Args:
+            path(str): 保存したパス
+
+        Returns:
+            CompactAst: 読み込んだASTを返す
+        """
+        with np.load(path) as data:
+            ids = get_vocabulary().encode(data["opcode_names"].tolist())
+            tables = {
+                table: {column: data[f"{table}.{column}"] for column in columns}
+                for table, columns in TABLES.items()
+            }
+            tables["reporters"]["opcode"] = ids[data["reporters.opcode"]]
+            return cls(
+                ids[data["opcodes"]],
+                data["parents"],
+                data["sprites"].tolist(),
+                data["script_sprites"],
+                data["input_names"].tolist(),
+                tables,
+            )
+
+
+def build_compact_ast(project):
+    """作品のJSONから配列で管理するASTを作成
+    Args:
+        project(dictionary): 作品のJSON
+
+    Returns:
+        CompactAst: 作成したASTを返す
+    """
+    vocabulary = get_vocabulary()
+    control_blocks = vocabulary.get_ids(constants.CONTROL_BLOCKS)
+    substack_id = vocabulary.get_id(SUBSTACK)
+    opcodes = [vocabulary.get_id(ROOT)]
+    parents = [-1]
+    sprites = []
+    script_sprites = []
+    input_names = {}
+    tables = {
+        table: {column: [] for column in columns} for table, columns in TABLES.items()
+    }
+
+    def add_node(opcode_id, parent):
+        opcodes.append(opcode_id)
+        parents.append(parent)
+        return len(opcodes) - 1
+
+    def add_row(table, node, name, **values):
+        columns = tables[table]
+        columns["node"].append(node)
+        columns["name"].append(input_names.setdefault(name, len(input_names)))
+        for column, value in values.items():
+            columns[column].append(value)
+
+    def add_inputs(node, block, blocks):
+        for name, input in (block.get("inputs") or {}).items():
+            if name in SUBSTACK_KEYS or not isinstance(input, list) or len(input) < 2:
+                continue
+            value = input[1]
+            if isinstance(value, str):
+                if isinstance(blocks.get(value), dict):
+                    reporter = vocabulary.get_id(blocks[value]["opcode"])
+                    add_row("reporters", node, name, opcode=reporter)
+            elif isinstance(value, list) and len(value) >= 2:
+                if value[0] in NUMBER_PRIMITIVES:
+                    try:
+                        number = float(value[1])
+                    except (TypeError, ValueError):
+                        number = np.nan
+                    add_row("numbers", node, name, kind=value[0], value=number)
+                elif value[0] in TEXT_PRIMITIVES:
+                    add_row("texts", node, name, kind=value[0], value=str(value[1]))
+        for name, field in (block.get("fields") or {}).items():
+            if isinstance(field, list) and field:
+                add_row("fields", node, name, value=str(field[0]))
+
+    for target in project["targets"]:
+        blocks = target["blocks"]
+        sprite = len(sprites)
+        sprites.append(target["name"])
+        for hash, block in blocks.items():
+            # 変数などのトップレベルのレポーターはリストで保存されているため除く
+            if not isinstance(block, dict) or not block.get("topLevel"):
+                continue
+            script = add_node(vocabulary.get_id(SCRIPT), 0)
+            script_sprites.append((script, sprite))
+            # (ブロックのハッシュ値, 親ノード) を先行順に処理する．
+            # ハッシュ値がNoneの要素は，SUBSTACKノード（中身はSUBSTACKノードの子）を表す
+            stack = [(hash, script, None)]
+            visited = set()
+            while stack:
+                hash, parent, body = stack.pop()
+                if hash is None:
+                    marker = add_node(substack_id, parent)
+                    if body:
+                        stack.append((body, marker, None))
+                    continue
+                if hash in visited or not isinstance(blocks.get(hash), dict):
+                    continue
+                visited.add(hash)
+                block = blocks[hash]
+                opcode_id = vocabulary.get_id(block["opcode"])
+                node = add_node(opcode_id, parent)
+                add_inputs(node, block, blocks)
+
+                # 次のブロックは，SUBSTACKの中身の後に処理する
+                if block.get("next"):
+                    stack.append((block["next"], parent, None))
+                if opcode_id not in control_blocks:
+                    continue
+                inputs = block.get("inputs") or {}
+                bodies = [
+                    inputs[key][1] if key in inputs else None for key in SUBSTACK_KEYS
+                ]
+                if block["opcode"] == "control_if_else":
+                    # if-elseブロックは2段階構造のため，SUBSTACKノードを挟む
+                    for body in reversed(bodies):
+                        stack.append((None, node, body))
+                elif bodies[0]:
+                    stack.append((bodies[0], node, None))
+
+    return CompactAst(
+        opcodes, parents, sprites, script_sprites, list(input_names), tables
+    )
@@ -0,0 +1,6 @@
+from .store import TrajectoryStore, write_store
+from .cache import TrajectoryCache
+from .motion import MotionDataset, compact_motions
+from .coordinate import compact_coordinates, load_coordinates
+from .stats import ProjectStats, build_stats_table, get_project_stats, write_stats
+from .columnar import ColumnarWriter, ColumnarDataset, SORTED_COLUMNS, TRACKED_COLUMNS
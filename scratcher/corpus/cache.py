@@ -0,0 +1,141 @@
+import sys
+
+sys.path.append("../")
+
+import os
+import json
+
+import numpy as np
+import pandas as pd
+
+from utils import remove_extension, generate_file_hash
+from config import constants
+from dtw.core import normalize_coordinate, NORMALIZATION_VERSION
+from .store import TrajectoryStore, write_store
+
+INDEX_FILE = "index.json"
+
+
+class TrajectoryCache:
+    """正規化済みの軌跡をキャッシュするためのクラス
+
+    軌跡は作品IDと元CSVの内容のハッシュ値で管理し，CSVが変わった場合は自動で読み直す．
+    """
+
+    def __init__(
+        self,
+        cache_path=constants.TRAJECTORY_CACHE_PATH,
+        source_path=constants.TRACKED_PATH,
+    ):
+        """TrajectoryCacheの初期化
+        Args:
+            cache_path(str, optional): キャッシュを保存するディレクトリのパス.
+            source_path(str, optional): 座標データのCSVが置かれたディレクトリのパス.
+        """
+        self.__cache_path = cache_path
+        self.__source_path = source_path
+        self.__store = None
+        self.__entries = {}
+        # 保存後にCSVが変わった軌跡（refreshまではメモリ上で保持）
+        self.__updated = {}
+        self.__load()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def get(self, id):
+        """作品IDを指定して正規化済みの軌跡を取得
+        Args:
+            id(int or str): 作品ID
+
+        Returns:
+            numpy.ndarray: (データ数, 2) の正規化済み座標データを返す．CSVが存在しない場合はNone
+        """
+        id = str(id)
+        path = self.__source_file(id)
+        if not os.path.isfile(path):
+            return None
+
+        if id in self.__updated:
+            entry, trajectory = self.__updated[id]
+            if not self.__is_stale(entry, path):
+                return trajectory
+        elif id in self.__entries and not self.__is_stale(self.__entries[id], path):
+            return self.__store.get(id)
+
+        entry, trajectory = self.__read(path)
+        self.__updated[id] = (entry, trajectory)
+        return trajectory
+
+    def refresh(self):
+        """元CSVと比較して，追加・変更・削除された軌跡のみを反映してキャッシュを保存
+        Returns:
+            int: 読み直した軌跡の数を返す
+        """
+        ids = []
+        entries = {}
+        trajectories = []
+        count = 0
+        for file_name in sorted(os.listdir(self.__source_path)):
+            if not file_name.endswith(".csv"):
+                continue
+            id = remove_extension(file_name)
+            path = self.__source_file(id)
+
+            if id in self.__updated and not self.__is_stale(
+                self.__updated[id][0], path
+            ):
+                entry, trajectory = self.__updated[id]
+            elif id in self.__entries and not self.__is_stale(self.__entries[id], path):
+                entry, trajectory = self.__entries[id], self.__store.get(id)
+            else:
+                entry, trajectory = self.__read(path)
+                count += 1
+
+            ids.append(id)
+            entries[id] = entry
+            trajectories.append(trajectory)
+
+        write_store(self.__cache_path, ids, trajectories, normalized=True)
+        with open(os.path.join(self.__cache_path, INDEX_FILE), "w") as f:
+            json.dump({"version": NORMALIZATION_VERSION, "entries": entries}, f)
+
+        self.__updated = {}
+        self.__load()
+        return count
+
+    def __load(self):
+        index_path = os.path.join(self.__cache_path, INDEX_FILE)
+        if not os.path.isfile(index_path):
+            return
+        with open(index_path) as f:
+            index = json.load(f)
+        # 正規化の方法が変わった場合はキャッシュ全体を無効にする
+        if index["version"] != NORMALIZATION_VERSION:
+            return
+        self.__entries = index["entries"]
+        self.__store = TrajectoryStore(self.__cache_path)
+
+    def __source_file(self, id):
+        return os.path.join(self.__source_path, f"{id}.csv")
+
+    def __is_stale(self, entry, path):
+        stat = os.stat(path)
+        if stat.st_size == entry["size"] and stat.st_mtime_ns == entry["mtime_ns"]:
+            return False
+        # 更新日時だけが変わった場合は内容のハッシュ値で判定する
+        if generate_file_hash(path) == entry["hash"]:
+            entry["size"] = stat.st_size
+            entry["mtime_ns"] = stat.st_mtime_ns
+            return False
+        return True
+
+    def __read(self, path):
+        stat = os.stat(path)
+        entry = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "hash": generate_file_hash(path),
+        }
+        df = pd.read_csv(path, usecols=["x", "y"])
+        return entry, normalize_coordinate(df.values, np.float32)
@@ -0,0 +1,395 @@
+import sys
+
+sys.path.append("../")
+
+import os
+import json
+import uuid
+import zlib
+import argparse
+
+import pandas as pd
+
+from utils import remove_extension, parallel_map
+from config.vocabulary import NAME_COLUMN, OPCODE_COLUMN, UNKNOWN_ID, get_vocabulary
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+PROJECT_ID_COLUMN = "project_id"
+# 作品IDのハッシュ値で分けるパーティションの列（bucket=番号 のディレクトリになる）
+BUCKET_COLUMN = "bucket"
+META_FILE = "_dataset.json"
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+# Sorter.sort_blocksの列と型（1行目はスプライトの向き・x・yを文字列で持つ）．
+# opcode_idは語彙の固定のIDで，固定のIDを持たないブロックはOTHER_ID（ブロック名から変換する）
+SORTED_COLUMNS = {
+    "BlockName": "string",
+    "Key": "string",
+    "Field": "string",
+    "node_id": "int32",
+    "parent_id": "int32",
+    "hash": "string",
+    OPCODE_COLUMN: "int16",
+}
+# Tracker.get_coordinateの列と型
+TRACKED_COLUMNS = {
+    "key": "string",
+    "x": "double",
+    "y": "double",
+    "wait": "double",
+    "move_index": "int32",
+}
+KINDS = {"sorted": SORTED_COLUMNS, "tracked": TRACKED_COLUMNS}
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("pyarrow is not installed")
+
+
+def get_bucket(project_id, partitions):
+    """作品IDが入るパーティションの番号を取得
+    Args:
+        project_id(int or str): 作品ID
+        partitions(int): パーティションの数
+
+    Returns:
+        int: パーティションの番号を返す
+    """
+    return zlib.crc32(str(project_id).encode("utf-8")) % partitions
+
+
+class ColumnarWriter:
+    """作品ごとのDataFrameを，型付きの列と作品ID列を持つ1つのデータセットに追記するためのクラス
+
+    作品は一定の行数ごとにまとめて1ファイルとして書き出す（1作品が複数ファイルに分かれることはない）．
+    ファイル名は書き込みごとに異なるため，複数のプロセスから同じディレクトリに追記してもよい．
+    """
+
+    def __init__(
+        self,
+        dir_path,
+        columns,
+        format="parquet",
+        partitions=None,
+        rows_per_file=1_000_000,
+        compression="zstd",
+    ):
+        """ColumnarWriterの初期化
+        Args:
+            dir_path(str): データセットのディレクトリのパス
+            columns(dict): 列名 -> 型（SORTED_COLUMNS，TRACKED_COLUMNSなど）
+            format(str, optional): parquetかarrow（Arrow IPC）.
+            partitions(int, optional): 作品IDで分けるパーティションの数. 指定なしだと分けない.
+            rows_per_file(int, optional): 1ファイルにまとめる行数の目安.
+            compression(str, optional): 圧縮方式.
+        """
+        _require_pyarrow()
+        if format not in FORMATS:
+            raise ValueError(f"format must be one of {list(FORMATS)}")
+        self.__dir_path = dir_path
+        self.__columns = dict(columns)
+        self.__format = format
+        self.__partitions = partitions
+        self.__rows_per_file = rows_per_file
+        self.__compression = compression
+        self.__schema = pa.schema(
+            [(PROJECT_ID_COLUMN, pa.string())]
+            + [(name, pa.type_for_alias(type)) for name, type in columns.items()]
+        )
+        # 作品ID -> 書き出し待ちのTable
+        self.__buffer = {}
+        self.__buffered_rows = 0
+        os.makedirs(dir_path, exist_ok=True)
+        self.__write_meta()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, project_id, df):
+        """作品のDataFrameを追記
+        Args:
+            project_id(int or str): 作品ID
+            df(Dataframe): columnsの列を持つDataFrame（インデックスは保存しない）
+        """
+        project_id = str(project_id)
+        arrays = [pa.array([project_id] * len(df.index), type=pa.string())]
+        for name, type in self.__columns.items():
+            values = df[name] if name in df else self.__derive(name, df)
+            arrays.append(self.__to_array(values, type))
+        if project_id in self.__buffer:
+            self.__buffered_rows -= self.__buffer[project_id].num_rows
+        self.__buffer[project_id] = pa.Table.from_arrays(arrays, schema=self.__schema)
+        self.__buffered_rows += len(df.index)
+        if self.__buffered_rows >= self.__rows_per_file:
+            self.flush()
+
+    def flush(self):
+        """書き出し待ちの作品をファイルに書き出す"""
+        if not self.__buffer:
+            return
+        groups = {}
+        # 作品ID順に並べ，行グループの統計量で作品IDの条件を絞り込めるようにする
+        for project_id in sorted(self.__buffer):
+            bucket = (
+                get_bucket(project_id, self.__partitions) if self.__partitions else None
+            )
+            groups.setdefault(bucket, []).append(self.__buffer[project_id])
+        for bucket, tables in groups.items():
+            dir_path = self.__dir_path
+            if bucket is not None:
+                dir_path = os.path.join(dir_path, f"{BUCKET_COLUMN}={bucket}")
+                os.makedirs(dir_path, exist_ok=True)
+            self.__write_file(dir_path, pa.concat_tables(tables))
+        self.__buffer = {}
+        self.__buffered_rows = 0
+
+    def close(self):
+        """書き出し待ちの作品を書き出して終了"""
+        self.flush()
+
+    def __derive(self, name, df):
+        # opcode_id列のない古いソート済みCSVは，ブロック名から固定のIDを求める
+        if name != OPCODE_COLUMN:
+            raise KeyError(name)
+        vocabulary = get_vocabulary()
+        return pd.Series(
+            [UNKNOWN_ID]
+            + [vocabulary.get_stored_id(str(opcode)) for opcode in df[NAME_COLUMN][1:]],
+            index=df.index,
+        )
+
+    def __to_array(self, values, type):
+        if type == "string":
+            return pa.array(
+                [None if pd.isna(value) else str(value) for value in values],
+                type=pa.string(),
+            )
+        values = pd.to_numeric(values, errors="coerce")
+        return pa.array(values, type=pa.type_for_alias(type), from_pandas=True)
+
+    def __write_file(self, dir_path, table):
+        file_name = f"part-{uuid.uuid4().hex}{FORMATS[self.__format]}"
+        # 読み込み中のデータセットに書きかけのファイルが見えないよう，"."で始まる名前で書いてから置き換える
+        tmp_path = os.path.join(dir_path, f".{file_name}.tmp")
+        if self.__format == "parquet":
+            pq.write_table(table, tmp_path, compression=self.__compression)
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=self.__compression)
+            with pa.OSFile(tmp_path, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+                    writer.write_table(table)
+        os.replace(tmp_path, os.path.join(dir_path, file_name))
+
+    def __write_meta(self):
+        meta = {
+            "format": self.__format,
+            "partitions": self.__partitions,
+            "columns": self.__columns,
+        }
+        path = os.path.join(self.__dir_path, META_FILE)
+        if os.path.isfile(path):
+            with open(path) as f:
+                if json.load(f) != meta:
+                    raise ValueError(f"{path} has a different format or columns")
+            return
+        with open(path, "w") as f:
+            json.dump(meta, f)
+
+
+class ColumnarDataset:
+    """ColumnarWriterで保存したデータセットを，必要な列と行だけ読み込むためのクラス
+
+    列の指定（射影）と条件（述語）はファイルの読み込み時に適用するため，
+    使わない列は読まず，条件を満たさない行グループやパーティションは読み飛ばす．
+    """
+
+    def __init__(self, dir_path):
+        """ColumnarDatasetの初期化
+        Args:
+            dir_path(str): ColumnarWriterで保存したディレクトリのパス
+        """
+        _require_pyarrow()
+        with open(os.path.join(dir_path, META_FILE)) as f:
+            meta = json.load(f)
+        self.__partitions = meta["partitions"]
+        self.__columns = list(meta["columns"])
+        self.__dataset = ds.dataset(
+            dir_path,
+            format="ipc" if meta["format"] == "arrow" else "parquet",
+            partitioning="hive" if self.__partitions else None,
+        )
+
+    def get_columns(self):
+        """作品IDとパーティション以外の列名を取得
+        Returns:
+            list: 列名のリストを返す
+        """
+        return list(self.__columns)
+
+    def to_table(self, columns=None, filters=None, project_ids=None):
+        """条件を満たす行を読み込む
+        Args:
+            columns(list, optional): 読み込む列. 指定なしだと作品IDと全ての列.
+            filters(list or Expression, optional): 行の条件. [("BlockName", "==", "motion_movesteps")] のような
+                (列名, 演算子, 値) のリスト（AND）か，pyarrow.dataset.Expression.
+            project_ids(list, optional): 読み込む作品ID.
+
+        Returns:
+            pyarrow.Table: 読み込んだ表を返す
+        """
+        return self.__dataset.to_table(
+            columns=self.__get_columns(columns),
+            filter=self.__get_filter(filters, project_ids),
+        )
+
+    def to_pandas(self, columns=None, filters=None, project_ids=None):
+        """条件を満たす行をDataFrameとして読み込む
+        Args:
+            columns(list, optional): 読み込む列. 指定なしだと作品IDと全ての列.
+            filters(list or Expression, optional): 行の条件.
+            project_ids(list, optional): 読み込む作品ID.
+
+        Returns:
+            Dataframe: 読み込んだDataFrameを返す
+        """
+        return self.to_table(columns, filters, project_ids).to_pandas()
+
+    def get_project(self, project_id, columns=None):
+        """1作品のDataFrameを取得
+        Args:
+            project_id(int or str): 作品ID
+            columns(list, optional): 読み込む列. 指定なしだと全ての列.
+
+        Returns:
+            Dataframe: CSVから読み込んだ場合と同じ行順のDataFrameを返す
+        """
+        columns = columns or self.__columns
+        df = self.to_pandas(columns, project_ids=[project_id])
+        return df.reset_index(drop=True)
+
+    def iter_projects(self, columns=None, filters=None, project_ids=None):
+        """作品ごとにDataFrameを読み込む
+        メモリに載せるのは1ファイル分だけのため，データセット全体を走査する分析に使う．
+
+        Args:
+            columns(list, optional): 読み込む列. 指定なしだと全ての列.
+            filters(list or Expression, optional): 行の条件.
+            project_ids(list, optional): 読み込む作品ID.
+
+        Returns:
+            generator: (作品ID, DataFrame) を返す
+        """
+        columns = [PROJECT_ID_COLUMN] + [
+            column
+            for column in (columns or self.__columns)
+            if column != PROJECT_ID_COLUMN
+        ]
+        filter = self.__get_filter(filters, project_ids)
+        # 1作品は1ファイルにまとまっているため，ファイルごとに作品に分ける
+        for fragment in self.__dataset.get_fragments(filter=filter):
+            df = fragment.to_table(
+                schema=self.__dataset.schema, columns=columns, filter=filter
+            ).to_pandas()
+            for project_id, group in df.groupby(PROJECT_ID_COLUMN, sort=False):
+                yield project_id, group.drop(columns=PROJECT_ID_COLUMN).reset_index(
+                    drop=True
+                )
+
+    def __get_columns(self, columns):
+        if columns is None:
+            return [PROJECT_ID_COLUMN] + self.__columns
+        return list(columns)
+
+    def __get_filter(self, filters, project_ids):
+        expressions = []
+        if filters is not None:
+            if not isinstance(filters, ds.Expression):
+                filters = pq.filters_to_expression(filters)
+            expressions.append(filters)
+        if project_ids is not None:
+            project_ids = [str(project_id) for project_id in project_ids]
+            expressions.append(ds.field(PROJECT_ID_COLUMN).isin(project_ids))
+            if self.__partitions:
+                # 対象の作品を含まないパーティションのディレクトリは開かない
+                buckets = sorted(
+                    {get_bucket(id, self.__partitions) for id in project_ids}
+                )
+                expressions.append(ds.field(BUCKET_COLUMN).isin(buckets))
+        if not expressions:
+            return None
+        filter = expressions[0]
+        for expression in expressions[1:]:
+            filter = filter & expression
+        return filter
+
+
+def _read_csv(path):
+    # Sorter.to_csv・Tracker.to_csvで保存したCSV（1列目はインデックス）
+    try:
+        return remove_extension(os.path.basename(path)), pd.read_csv(path, index_col=0)
+    except Exception as e:
+        print(f"{path}: {e}")
+        return None
+
+
+def convert_csv_dir(csv_dir, out_path, kind, workers=None, **options):
+    """作品ごとのCSVのディレクトリを1つのデータセットに変換
+    Args:
+        csv_dir(str): 作品ID.csvのディレクトリのパス
+        out_path(str): データセットのディレクトリのパス
+        kind(str): sorted（Sorter.to_csv）かtracked（Tracker.to_csv）
+        workers(int, optional): CSVを読み込むプロセス数.
+        options: ColumnarWriterの引数（format，partitionsなど）
+
+    Returns:
+        int: 変換した作品の数を返す
+    """
+    paths = [
+        os.path.join(csv_dir, file_name)
+        for file_name in sorted(os.listdir(csv_dir))
+        if file_name.endswith(".csv")
+    ]
+    count = 0
+    with ColumnarWriter(out_path, KINDS[kind], **options) as writer:
+        for result in parallel_map(
+            _read_csv, paths, backend="process", workers=workers, chunksize=64
+        ):
+            if result is not None:
+                writer.write(*result)
+                count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="作品ごとのCSVを1つのParquet/Arrowのデータセットに変換する"
+    )
+    parser.add_argument("kind", choices=list(KINDS))
+    parser.add_argument("csv_dir")
+    parser.add_argument("out_path")
+    parser.add_argument("--format", choices=list(FORMATS), default="parquet")
+    parser.add_argument("--partitions", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    count = convert_csv_dir(
+        args.csv_dir,
+        args.out_path,
+        args.kind,
+        args.workers,
+        format=args.format,
+        partitions=args.partitions,
+    )
+    print(f"{count}件の作品を変換しました．")
+
+
+if __name__ == "__main__":
+    main()
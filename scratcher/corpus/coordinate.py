@@ -0,0 +1,101 @@
+import sys
+
+sys.path.append("../")
+
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from config import constants
+from dtw.core import normalize_coordinate
+from utils import remove_extension, parallel_map
+from .store import TrajectoryStore, write_store
+
+MOVE_INDEX_COLUMN = "move_index"
+
+
+def _read_coordinate(args):
+    path, normalize = args
+    df = pd.read_csv(path)
+    points = df[["x", "y"]].to_numpy(dtype=np.float64)
+    if normalize:
+        points = normalize_coordinate(points, np.float32)
+    move_index = (
+        df[MOVE_INDEX_COLUMN].to_numpy(dtype=np.int32)
+        if MOVE_INDEX_COLUMN in df
+        else np.full(len(points), -1, dtype=np.int32)
+    )
+    return points, move_index
+
+
+def compact_coordinates(
+    csv_dir=constants.COORDINATE_PATH,
+    out_path=constants.COORDINATE_STORE_PATH,
+    normalize=True,
+    workers=None,
+):
+    """作品ごとの座標CSV（作品ID.csv）を1つの配列にまとめて保存
+    各CSVは x, y 列（とmove_index列）を持つものとする．move_indexは1点ごとの列として保存する．
+
+    Args:
+        csv_dir(str, optional): 座標CSVが置かれたディレクトリのパス.
+        out_path(str, optional): まとめた配列を保存するディレクトリのパス.
+        normalize(bool, optional): 座標を0〜1に正規化して保存するか. デフォルトはTrue.
+        workers(int, optional): CSVを読み込むプロセス数. 0だと並列化しない.
+
+    Returns:
+        int: 保存した軌跡の数を返す
+    """
+    file_names = sorted(
+        file_name for file_name in os.listdir(csv_dir) if file_name.endswith(".csv")
+    )
+    args = [(os.path.join(csv_dir, file_name), normalize) for file_name in file_names]
+    results = list(
+        parallel_map(
+            _read_coordinate, args, backend="process", workers=workers, chunksize=64
+        )
+    )
+
+    write_store(
+        out_path,
+        [remove_extension(file_name) for file_name in file_names],
+        [points for points, _ in results],
+        point_columns={MOVE_INDEX_COLUMN: [move_index for _, move_index in results]},
+        normalized=normalize,
+    )
+    return len(file_names)
+
+
+def load_coordinates(path=constants.COORDINATE_STORE_PATH):
+    """compact_coordinatesで保存した座標データを読み込む
+    DTWやAnimaterには，get(作品ID) で取得したビューをそのまま渡せる．
+    正規化して保存したかはis_normalized()で確認できる（DTWのstoreに渡した場合は自動で確認する）．
+
+    Args:
+        path(str, optional): compact_coordinatesで保存したディレクトリのパス.
+
+    Returns:
+        TrajectoryStore: 座標データをメモリマップで開いたTrajectoryStoreを返す
+    """
+    return TrajectoryStore(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="作品ごとの座標CSVを1つのメモリマップ用の配列にまとめる"
+    )
+    parser.add_argument("--csv-dir", default=constants.COORDINATE_PATH)
+    parser.add_argument("--out-path", default=constants.COORDINATE_STORE_PATH)
+    parser.add_argument("--raw", action="store_true", help="正規化せずに保存する")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    count = compact_coordinates(
+        args.csv_dir, args.out_path, normalize=not args.raw, workers=args.workers
+    )
+    print(f"{count}件の軌跡を保存しました．")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import sys
+
+sys.path.append("../")
+
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from dtw.core import normalize_coordinate
+from .store import TrajectoryStore, write_store
+
+PROJECT_COLUMN = "prjId"
+SPRITE_COLUMN = "sprite"
+
+
+def compact_motions(dir_path, out_path, normalize=True):
+    """分割済みの動作CSV（0.csv … N.csv）を1つのインデックスにまとめて保存
+    各CSVは x, y, prjId, sprite 列を持つものとする．
+
+    Args:
+        dir_path(str): 動作CSVが置かれたディレクトリのパス
+        out_path(str): まとめたインデックスを保存するディレクトリのパス
+        normalize(bool, optional): 座標を0〜1に正規化して保存するか. デフォルトはTrue.
+
+    Returns:
+        int: 保存した動作の数を返す
+    """
+    # ディレクトリは1度だけ走査し，ファイル名の番号順に並べる
+    numbers = sorted(
+        int(entry.name[:-4])
+        for entry in os.scandir(dir_path)
+        if entry.name.endswith(".csv") and entry.name[:-4].isdigit()
+    )
+
+    trajectories = []
+    project_ids = []
+    sprites = []
+    for number in numbers:
+        df = pd.read_csv(os.path.join(dir_path, f"{number}.csv"))
+        points = df[["x", "y"]].values
+        if normalize:
+            points = normalize_coordinate(points, np.float32)
+        trajectories.append(points)
+        project_ids.append(int(df[PROJECT_COLUMN].iloc[0]) if len(df) else -1)
+        sprites.append(str(df[SPRITE_COLUMN].iloc[0]) if len(df) else "")
+
+    write_store(
+        out_path,
+        numbers,
+        trajectories,
+        columns={
+            PROJECT_COLUMN: np.array(project_ids, dtype=np.int64),
+            SPRITE_COLUMN: np.array(sprites, dtype=np.str_),
+        },
+        normalized=normalize,
+    )
+    return len(numbers)
+
+
+class MotionDataset:
+    """compact_motionsでまとめた動作データセットを読み込むためのクラス
+
+    座標データはメモリマップで開くため，複数のワーカープロセスで共有される．
+    """
+
+    def __init__(self, path):
+        """MotionDatasetの初期化
+        Args:
+            path(str): compact_motionsで保存したディレクトリのパス
+        """
+        self.__store = TrajectoryStore(path)
+        self.__project_ids = self.__store.get_column(PROJECT_COLUMN)
+        self.__sprites = self.__store.get_column(SPRITE_COLUMN)
+
+    def __len__(self):
+        return len(self.__store)
+
+    def __iter__(self):
+        return iter(self.__store)
+
+    def get_store(self):
+        return self.__store
+
+    def get_points(self, index):
+        """動作の座標データを取得
+        Args:
+            index(int): 動作の番号（CSVのファイル名の番号）
+
+        Returns:
+            numpy.ndarray: (データ数, 2) の座標データのビューを返す
+        """
+        return self.__store.get(index)
+
+    def get_motion(self, index):
+        """動作の座標データと作品ID，スプライト名を取得
+        Args:
+            index(int): 動作の番号（CSVのファイル名の番号）
+
+        Returns:
+            dictionary: {"points", "prjId", "sprite"} を返す．存在しない番号の場合はKeyErrorを送出する
+        """
+        i = self.__store.get_index(index)
+        if i is None:
+            raise KeyError(f"motion {index} is not in the dataset")
+        return {
+            "points": self.__store.get_at(i),
+            PROJECT_COLUMN: int(self.__project_ids[i]),
+            SPRITE_COLUMN: str(self.__sprites[i]),
+        }
+
+    def get_project_ids(self):
+        return self.__project_ids
+
+    def get_sprites(self):
+        return self.__sprites
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分割済みの動作CSVを1つにまとめる")
+    parser.add_argument("dir_path")
+    parser.add_argument("out_path")
+    parser.add_argument("--raw", action="store_true", help="正規化せずに保存する")
+    args = parser.parse_args()
+    count = compact_motions(args.dir_path, args.out_path, normalize=not args.raw)
+    print(f"{count}件の動作を保存しました．")
+
+
+if __name__ == "__main__":
+    main()
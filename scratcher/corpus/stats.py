@@ -0,0 +1,313 @@
+import sys
+
+sys.path.append("../")
+
+import os
+import argparse
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from config import constants
+from config.vocabulary import get_vocabulary
+from utils.project_reader import read_project
+from utils.parallelizer import parallel_map
+
+IDS_FILE = "ids.npy"
+SPRITE_OFFSETS_FILE = "sprite_offsets.npy"
+SPRITE_BLOCKS_FILE = "sprite_blocks.npy"
+OPCODE_OFFSETS_FILE = "opcode_offsets.npy"
+OPCODE_IDS_FILE = "opcode_ids.npy"
+OPCODE_COUNTS_FILE = "opcode_counts.npy"
+OPCODE_NAMES_FILE = "opcode_names.npy"
+# 作品ごとの統計量の列と型（列ごとに 列名.npy として保存する）
+STATS_COLUMNS = {
+    "num_sprites": np.int32,
+    "num_blocks": np.int32,
+    "stage_blocks": np.int32,
+    "max_sprite_blocks": np.int32,
+    "num_scripts": np.int32,
+    "num_hats": np.int32,
+    "duplicate_hats": np.int32,
+    "max_loop_depth": np.int16,
+    "num_procedures": np.int32,
+    "num_opcodes": np.int32,
+}
+LOOP_BLOCKS = constants.REPEAT_BLOCKS + [
+    "control_repeat_until",
+    "control_while",
+    "control_for_each",
+]
+# 統計量の算出に使うスプライトのキー
+STATS_TARGET_KEYS = ["isStage", "blocks"]
+
+
+def get_project_stats(project):
+    """作品のブロックを1度だけ走査し，作品単位の統計量を算出
+    Args:
+        project(dictionary): 作品のJSON
+
+    Returns:
+        dictionary: STATS_COLUMNSの各統計量と，sprite_blocks（スプライトごとのブロック数のリスト），
+            opcodes（オペコード -> 個数のCounter）を返す
+    """
+    stats = {column: 0 for column in STATS_COLUMNS}
+    sprite_blocks = []
+    opcodes = Counter()
+    for target in project["targets"]:
+        blocks = target["blocks"]
+        num_blocks = 0
+        hats = Counter()
+        # ブロックのハッシュ値 -> 入れ子になっているループの数
+        depths = {}
+        for hash, block in blocks.items():
+            # 変数などのトップレベルのレポーターはリストで保存されているため除く
+            if not isinstance(block, dict):
+                continue
+            num_blocks += 1
+            opcode = block["opcode"]
+            opcodes[opcode] += 1
+            if opcode == constants.PROCEDURES_DEFINE:
+                stats["num_procedures"] += 1
+            if block.get("topLevel"):
+                stats["num_scripts"] += 1
+                if opcode in constants.EVENT_BLOCKS:
+                    # 同じスプライトで同じ条件のイベントブロックが複数あるものを重複とする
+                    fields = block.get("fields") or {}
+                    hats[(opcode, str(sorted(fields.items())))] += 1
+            depth = __get_loop_depth(blocks, hash, depths)
+            stats["max_loop_depth"] = max(stats["max_loop_depth"], depth)
+
+        stats["num_blocks"] += num_blocks
+        stats["num_hats"] += sum(hats.values())
+        stats["duplicate_hats"] += sum(count - 1 for count in hats.values())
+        if target.get("isStage"):
+            stats["stage_blocks"] += num_blocks
+        else:
+            sprite_blocks.append(num_blocks)
+
+    stats["num_sprites"] = len(sprite_blocks)
+    stats["max_sprite_blocks"] = max(sprite_blocks, default=0)
+    stats["num_opcodes"] = len(opcodes)
+    stats["sprite_blocks"] = sprite_blocks
+    stats["opcodes"] = opcodes
+    return stats
+
+
+def __get_loop_depth(blocks, hash, depths):
+    # 親をたどり，計算済みのブロックに着いたら戻りながら深さを記録する（再帰を使わない）
+    path = []
+    visited = set()
+    while hash not in depths:
+        block = blocks.get(hash)
+        if not isinstance(block, dict) or hash in visited:
+            depths[hash] = 0
+            break
+        path.append(hash)
+        visited.add(hash)
+        hash = block.get("parent")
+        if hash is None:
+            depths[None] = 0
+    depth = depths[hash]
+    for child in reversed(path):
+        parent = blocks.get(blocks[child].get("parent"))
+        # ループのSUBSTACKの先頭のブロック（とその次に続くブロック）は1段深い
+        if (
+            isinstance(parent, dict)
+            and parent["opcode"] in LOOP_BLOCKS
+            and (parent.get("inputs") or {}).get("SUBSTACK", [None, None])[1] == child
+        ):
+            depth += 1
+        depths[child] = depth
+    return depth
+
+
+def _read_stats(path):
+    project = read_project(
+        path, project_keys=["targets"], target_keys=STATS_TARGET_KEYS
+    )
+    if not project or "targets" not in project:
+        return None
+    return get_project_stats(project)
+
+
+def build_stats_table(json_dir, out_path, workers=None):
+    """ディレクトリ内の作品JSONから作品ごとの統計量の表を作成
+    Args:
+        json_dir(str): 作品JSON（作品ID.json）のディレクトリのパス
+        out_path(str): 保存先のディレクトリのパス
+        workers(int, optional): JSONを読み込むプロセス数. 0だと並列化しない.
+
+    Returns:
+        int: 登録した作品の数を返す
+    """
+    file_names = sorted(os.listdir(json_dir))
+    paths = [os.path.join(json_dir, file_name) for file_name in file_names]
+    results = parallel_map(
+        _read_stats, paths, backend="process", workers=workers, chunksize=64
+    )
+
+    ids = []
+    rows = []
+    for file_name, stats in zip(file_names, results):
+        if stats is not None:
+            ids.append(os.path.splitext(file_name)[0])
+            rows.append(stats)
+    write_stats(out_path, ids, rows)
+    return len(ids)
+
+
+def write_stats(dir_path, ids, rows):
+    """get_project_statsの結果を列ごとの配列にまとめて保存
+    スプライトごとのブロック数とオペコードの個数は，作品ごとの開始位置と連結した配列で保存する．
+
+    Args:
+        dir_path(str): 保存先のディレクトリのパス
+        ids(list): 作品ID
+        rows(list): get_project_statsで取得した統計量
+    """
+    vocabulary = get_vocabulary()
+    arrays = {IDS_FILE: np.array([str(id) for id in ids], dtype=np.str_)}
+    for column, dtype in STATS_COLUMNS.items():
+        arrays[f"{column}.npy"] = np.array([row[column] for row in rows], dtype=dtype)
+
+    sprite_blocks = [row["sprite_blocks"] for row in rows]
+    arrays[SPRITE_OFFSETS_FILE] = __get_offsets(sprite_blocks)
+    arrays[SPRITE_BLOCKS_FILE] = np.fromiter(
+        (count for counts in sprite_blocks for count in counts), dtype=np.int32
+    )
+
+    opcodes = [row["opcodes"] for row in rows]
+    opcode_ids = np.fromiter(
+        (vocabulary.get_id(opcode) for counts in opcodes for opcode in counts),
+        dtype=np.int64,
+    )
+    # IDは実行ごとに変わりうるため，使っているオペコードの名前の番号で保存する
+    names, opcode_ids = np.unique(opcode_ids, return_inverse=True)
+    arrays[OPCODE_NAMES_FILE] = np.array(vocabulary.decode(names), dtype=np.str_)
+    arrays[OPCODE_OFFSETS_FILE] = __get_offsets(opcodes)
+    arrays[OPCODE_IDS_FILE] = opcode_ids.astype(np.int32)
+    arrays[OPCODE_COUNTS_FILE] = np.fromiter(
+        (count for counts in opcodes for count in counts.values()), dtype=np.int32
+    )
+
+    os.makedirs(dir_path, exist_ok=True)
+    # 読み込み中のプロセスを壊さないよう，一時ファイルに書いてから置き換える
+    for file_name, array in arrays.items():
+        path = os.path.join(dir_path, file_name)
+        with open(f"{path}.tmp", "wb") as f:
+            np.save(f, array)
+        os.replace(f"{path}.tmp", path)
+
+
+def __get_offsets(values):
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in values], out=offsets[1:])
+    return offsets
+
+
+class ProjectStats:
+    """build_stats_tableで作成した統計量の表を読み込み，データセットの作品を選ぶためのクラス
+
+    JSONを読み直さずに，DataFrameの条件式で作品を絞り込める．
+    """
+
+    def __init__(self, dir_path):
+        """ProjectStatsの初期化
+        Args:
+            dir_path(str): build_stats_tableで保存したディレクトリのパス
+        """
+        self.__dir_path = dir_path
+        self.__ids = np.load(os.path.join(dir_path, IDS_FILE))
+        self.__df = pd.DataFrame(
+            {column: self.__load(f"{column}.npy") for column in STATS_COLUMNS},
+            index=pd.Index(self.__ids, name="id"),
+        )
+        self.__opcode_names = self.__load(OPCODE_NAMES_FILE).tolist()
+        self.__opcode_index = {name: i for i, name in enumerate(self.__opcode_names)}
+
+    def __len__(self):
+        return len(self.__ids)
+
+    def get_ids(self):
+        return self.__ids
+
+    def get_df(self, opcodes=None):
+        """統計量のDataFrameを取得
+        Args:
+            opcodes(list, optional): 個数の列を追加するオペコード.
+
+        Returns:
+            Dataframe: 作品IDをインデックスとするDataFrameを返す
+        """
+        if not opcodes:
+            return self.__df.copy()
+        return self.__df.join(self.get_opcode_counts(opcodes))
+
+    def get_opcode_counts(self, opcodes):
+        """作品ごとのオペコードの個数を取得
+        Args:
+            opcodes(list): オペコードのリスト
+
+        Returns:
+            Dataframe: オペコードを列名とする個数のDataFrameを返す
+        """
+        offsets = self.__load(OPCODE_OFFSETS_FILE)
+        opcode_ids = self.__load(OPCODE_IDS_FILE, mmap_mode="r")
+        counts = self.__load(OPCODE_COUNTS_FILE, mmap_mode="r")
+        # 連結した配列の各要素がどの作品のものかを表す
+        rows = np.repeat(np.arange(len(self), dtype=np.int64), np.diff(offsets))
+        columns = {}
+        for opcode in opcodes:
+            index = self.__opcode_index.get(opcode)
+            column = np.zeros(len(self), dtype=np.int32)
+            if index is not None:
+                mask = opcode_ids == index
+                column[rows[mask]] = counts[mask]
+            columns[opcode] = column
+        return pd.DataFrame(columns, index=self.__df.index)
+
+    def get_sprite_blocks(self, id):
+        """スプライトごとのブロック数を取得
+        Args:
+            id(int or str): 作品ID
+
+        Returns:
+            numpy.ndarray: ステージを除くスプライトごとのブロック数を返す
+        """
+        index = self.__df.index.get_loc(str(id))
+        offsets = self.__load(SPRITE_OFFSETS_FILE)
+        return self.__load(SPRITE_BLOCKS_FILE, mmap_mode="r")[
+            offsets[index] : offsets[index + 1]
+        ]
+
+    def select(self, expression, opcodes=None):
+        """条件式を満たす作品IDを取得
+        Args:
+            expression(str): DataFrame.queryの条件式（例: "num_sprites == 1 and duplicate_hats == 0"）
+            opcodes(list, optional): 条件式で使うオペコードの個数の列. 列名は `` で囲む.
+
+        Returns:
+            list: 条件を満たす作品IDのリストを返す
+        """
+        return self.get_df(opcodes).query(expression).index.tolist()
+
+    def __load(self, file_name, mmap_mode=None):
+        return np.load(os.path.join(self.__dir_path, file_name), mmap_mode=mmap_mode)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="作品JSONから作品ごとの統計量の表を作成する"
+    )
+    parser.add_argument("json_dir")
+    parser.add_argument("out_path")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    count = build_stats_table(args.json_dir, args.out_path, args.workers)
+    print(f"{count}件の作品を登録しました．")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import os
+import json
+
+import numpy as np
+
+POINTS_FILE = "points.npy"
+OFFSETS_FILE = "offsets.npy"
+IDS_FILE = "ids.npy"
+# 座標データを正規化したかなど，ストア全体の情報
+METADATA_FILE = "metadata.json"
+# 座標データと同じ行数を持つ列（移動ブロックの行番号など）のファイル名の接頭辞
+POINT_COLUMN_PREFIX = "point_"
+
+
+def write_store(
+    dir_path,
+    ids,
+    trajectories,
+    dtype=np.float32,
+    columns=None,
+    point_columns=None,
+    normalized=False,
+):
+    """複数の軌跡を1つの配列に連結して保存
+    Args:
+        dir_path(str): 保存先のディレクトリのパス
+        ids(list): 各軌跡のID
+        trajectories(list): 各軌跡の (データ数, 2) の座標データ
+        dtype(numpy.dtype, optional): 座標データの型. デフォルトはfloat32.
+        columns(dict, optional): 列名 -> 軌跡ごとの値の配列. 軌跡単位の付加情報を保存する場合に指定.
+        point_columns(dict, optional): 列名 -> 軌跡ごとの (データ数,) の配列のリスト.
+            座標データの1点ごとの付加情報を保存する場合に指定.
+        normalized(bool, optional): 座標データを0〜1に正規化済みの場合はTrue. 読み込む側が確認できるよう保存する.
+    """
+    os.makedirs(dir_path, exist_ok=True)
+    lengths = np.fromiter((len(t) for t in trajectories), dtype=np.int64)
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    points = np.empty((offsets[-1], 2), dtype=dtype)
+    for i, trajectory in enumerate(trajectories):
+        points[offsets[i] : offsets[i + 1]] = trajectory
+
+    arrays = {
+        POINTS_FILE: points,
+        OFFSETS_FILE: offsets,
+        IDS_FILE: np.array([str(id) for id in ids], dtype=np.str_),
+    }
+    for name, values in (columns or {}).items():
+        arrays[f"{name}.npy"] = np.asarray(values)
+    for name, values in (point_columns or {}).items():
+        column = (
+            np.concatenate([np.asarray(value) for value in values])
+            if len(values)
+            else np.empty(0)
+        )
+        if len(column) != len(points):
+            raise ValueError(f"point column {name} must have one value per point")
+        arrays[f"{POINT_COLUMN_PREFIX}{name}.npy"] = column
+
+    # 読み込み中のプロセスを壊さないよう，一時ファイルに書いてから置き換える
+    for file_name, array in arrays.items():
+        path = os.path.join(dir_path, file_name)
+        with open(f"{path}.tmp", "wb") as f:
+            np.save(f, array)
+        os.replace(f"{path}.tmp", path)
+    path = os.path.join(dir_path, METADATA_FILE)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump({"normalized": bool(normalized)}, f)
+    os.replace(f"{path}.tmp", path)
+
+
+class TrajectoryStore:
+    """連結して保存した軌跡をメモリマップで読み込むためのクラス
+
+    各軌跡はコピーせずに連結配列のビューとして返す．
+    """
+
+    def __init__(self, dir_path):
+        """TrajectoryStoreの初期化
+        Args:
+            dir_path(str): write_storeで保存したディレクトリのパス
+        """
+        self.__dir_path = dir_path
+        self.__points = np.load(os.path.join(dir_path, POINTS_FILE), mmap_mode="r")
+        self.__offsets = np.load(os.path.join(dir_path, OFFSETS_FILE))
+        self.__ids = np.load(os.path.join(dir_path, IDS_FILE))
+        self.__index = {id: i for i, id in enumerate(self.__ids.tolist())}
+        self.__point_columns = {}
+        metadata_path = os.path.join(dir_path, METADATA_FILE)
+        self.__metadata = {}
+        if os.path.isfile(metadata_path):
+            with open(metadata_path) as f:
+                self.__metadata = json.load(f)
+
+    def __len__(self):
+        return len(self.__ids)
+
+    def __contains__(self, id):
+        return str(id) in self.__index
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.get_at(i)
+
+    def get_ids(self):
+        """保存されている軌跡のIDを取得
+        Returns:
+            numpy.ndarray: 保存順に並べたIDの配列を返す
+        """
+        return self.__ids
+
+    def get_index(self, id):
+        """IDから保存順のインデックスを取得
+        Args:
+            id(int or str): 軌跡のID
+
+        Returns:
+            int: 保存順のインデックスを返す．存在しない場合はNone
+        """
+        return self.__index.get(str(id))
+
+    def get(self, id):
+        """IDを指定して軌跡を取得
+        Args:
+            id(int or str): 軌跡のID
+
+        Returns:
+            numpy.ndarray: (データ数, 2) の座標データのビューを返す．存在しない場合はNone
+        """
+        index = self.get_index(id)
+        if index is None:
+            return None
+        return self.get_at(index)
+
+    def get_at(self, index):
+        """保存順のインデックスを指定して軌跡を取得
+        Args:
+            index(int): 保存順のインデックス
+
+        Returns:
+            numpy.ndarray: (データ数, 2) の座標データのビューを返す
+        """
+        return self.__points[self.__offsets[index] : self.__offsets[index + 1]]
+
+    def get_points(self):
+        """連結された全軌跡の座標データを取得
+        Returns:
+            numpy.memmap: (総データ数, 2) の座標データを返す
+        """
+        return self.__points
+
+    def get_offsets(self):
+        """各軌跡の開始位置を取得
+        Returns:
+            numpy.ndarray: 軌跡数+1 の長さの開始位置の配列を返す
+        """
+        return self.__offsets
+
+    def is_normalized(self):
+        """座標データが正規化済みかを確認
+        Returns:
+            boolean: write_storeでnormalized=Trueとして保存した場合はTrue．
+                情報が保存されていない古いストアではFalse
+        """
+        return self.__metadata.get("normalized", False)
+
+    def has_column(self, name):
+        """軌跡単位の付加情報が保存されているかを確認
+        Args:
+            name(str): write_storeのcolumnsで指定した列名
+
+        Returns:
+            boolean: 保存されている場合はTrue
+        """
+        return os.path.isfile(os.path.join(self.__dir_path, f"{name}.npy"))
+
+    def get_column(self, name):
+        """軌跡単位の付加情報を取得
+        Args:
+            name(str): write_storeのcolumnsで指定した列名
+
+        Returns:
+            numpy.ndarray: 保存順に並べた値の配列を返す
+        """
+        return np.load(os.path.join(self.__dir_path, f"{name}.npy"), mmap_mode="r")
+
+    def has_point_column(self, name):
+        """座標データの1点ごとの付加情報が保存されているかを確認
+        Args:
+            name(str): write_storeのpoint_columnsで指定した列名
+
+        Returns:
+            boolean: 保存されている場合はTrue
+        """
+        return os.path.isfile(self.__point_column_file(name))
+
+    def get_point_column(self, name, id):
+        """軌跡の1点ごとの付加情報を取得
+        Args:
+            name(str): write_storeのpoint_columnsで指定した列名
+            id(int or str): 軌跡のID
+
+        Returns:
+            numpy.ndarray: (データ数,) の値のビューを返す．軌跡が存在しない場合はNone
+        """
+        index = self.get_index(id)
+        if index is None:
+            return None
+        if name not in self.__point_columns:
+            self.__point_columns[name] = np.load(
+                self.__point_column_file(name), mmap_mode="r"
+            )
+        return self.__point_columns[name][
+            self.__offsets[index] : self.__offsets[index + 1]
+        ]
+
+    def __point_column_file(self, name):
+        return os.path.join(self.__dir_path, f"{POINT_COLUMN_PREFIX}{name}.npy")
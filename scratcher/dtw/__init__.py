@@ -1 +1,11 @@
 from .dtw import *
+from .core import (
+    normalize_coordinate,
+    band_window,
+    calculate_dtw_cost,
+    calculate_dtw_path,
+    NORMALIZATION_VERSION,
+)
+from .query import DtwQuery
+from .result_cache import DtwResultCache, dtw_params, trajectory_key
+from .fastdtw import fast_dtw, evaluate_fast_dtw
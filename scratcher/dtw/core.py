@@ -0,0 +1,168 @@
+import numpy as np
+
+# 正規化の方法を変えた場合は更新する（キャッシュの無効化に使う）
+NORMALIZATION_VERSION = 1
+
+
+def normalize_coordinate(data, dtype=np.float64):
+    """座標データを軸ごとに0〜1へ正規化（TimeSeriesScalerMinMaxと同等）
+    Args:
+        data(array-like): [[x, y], [x1, y1], ...] 形式の座標データ
+        dtype(numpy.dtype, optional): 返す配列の型. デフォルトはfloat64.
+
+    Returns:
+        numpy.ndarray: (データ数, 2) の正規化済み座標データを返す
+    """
+    data = np.asarray(data, dtype=np.float64).reshape(-1, 2)
+    if len(data) == 0:
+        return data.astype(dtype)
+    min_ = np.nanmin(data, axis=0)
+    range_ = np.nanmax(data, axis=0) - min_
+    # 値が一定の軸は0に揃える（tslearnと同じ扱い）
+    range_[range_ == 0.0] = 1.0
+    return ((data - min_) / range_).astype(dtype, copy=False)
+
+
+def band_window(length1, length2, radius):
+    """Sakoe-Chibaバンドの各行で計算対象とする列範囲を取得
+    Args:
+        length1(int): 行方向（1つ目）の系列長
+        length2(int): 列方向（2つ目）の系列長
+        radius(int): バンドの半径（2つ目の系列のインデックス単位）
+
+    Returns:
+        tuple: 各行の列範囲の開始（含む），終了（含まない）の配列を返す
+    """
+    # 長さの異なる系列でも両端が対角に乗るよう傾きを合わせる
+    slope = (length2 - 1) / (length1 - 1) if length1 > 1 else 0.0
+    # 隣接する行の範囲が必ず重なるように半径を補正
+    radius = max(radius, slope, 1)
+    center = np.arange(length1) * slope
+    lo = np.clip(np.ceil(center - radius), 0, length2 - 1).astype(np.int64)
+    hi = np.clip(np.floor(center + radius) + 1, 1, length2).astype(np.int64)
+    return lo, hi
+
+
+def calculate_dtw_cost(x, y, window=None, max_cost=None):
+    """2つの系列間のDTW距離（累積コスト）のみを算出
+    行ごとにベクトル化して計算するため，パスは保持しない．
+
+    Args:
+        x(numpy.ndarray): (データ数, 2) の座標データ
+        y(numpy.ndarray): (データ数, 2) の座標データ
+        window(tuple, optional): 各行で計算する列範囲 (lo, hi). 指定なしだと全範囲.
+        max_cost(float, optional): 累積コストの上限. 途中で超えた時点で打ち切る.
+
+    Returns:
+        float: DTW距離を返す．max_costを超えた場合はinfを返す
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    Tx = len(x)
+    Ty = len(y)
+    if Tx == 0 or Ty == 0:
+        return np.inf
+    if window is None:
+        lo = np.zeros(Tx, dtype=np.int64)
+        hi = np.full(Tx, Ty, dtype=np.int64)
+    else:
+        lo, hi = window
+
+    # prev[j + 1] に1つ前の行のC[i - 1, j]を保持する（prev[0]は番兵）
+    prev = np.full(Ty + 1, np.inf)
+    curr = np.full(Ty + 1, np.inf)
+    # 一番初めのマスだけは左下から到達できるようにしておく
+    prev[0] = 0.0
+
+    for i in range(Tx):
+        l, h = lo[i], hi[i]
+        dist = np.sqrt(((y[l:h] - x[i]) ** 2).sum(axis=1))
+        # 下，左下からの遷移
+        t = dist + np.minimum(prev[l + 1 : h + 1], prev[l:h])
+        # 左からの遷移は累積和と累積最小値で一括計算する
+        # C[j] = S[j] + min_{k<=j}(t[k] - S[k])
+        s = np.cumsum(dist)
+        row = s + np.minimum.accumulate(t - s)
+
+        curr.fill(np.inf)
+        curr[l + 1 : h + 1] = row
+        if max_cost is not None and row.min() > max_cost:
+            return np.inf
+        prev, curr = curr, prev
+        prev[0] = np.inf
+
+    # 行の最小値が上限以下でも，最後のマスの累積コストは上限を超えることがある
+    cost = float(prev[Ty])
+    if max_cost is not None and cost > max_cost:
+        return np.inf
+    return cost
+
+
+def calculate_dtw_path(x, y, window=None):
+    """2つの系列間のDTW距離とワーピングパスを算出
+    遷移方向は1マス1バイトで保持する．
+
+    Args:
+        x(numpy.ndarray): (データ数, 2) の座標データ
+        y(numpy.ndarray): (データ数, 2) の座標データ
+        window(tuple, optional): 各行で計算する列範囲 (lo, hi). 指定なしだと全範囲.
+
+    Returns:
+        tuple: (パス, DTW距離) を返す．パスは (0, 0) から始まる (長さ, 2) の配列
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    Tx = len(x)
+    Ty = len(y)
+    if Tx == 0 or Ty == 0:
+        return np.empty((0, 2), dtype=np.int64), np.inf
+    if window is None:
+        lo = np.zeros(Tx, dtype=np.int64)
+        hi = np.full(Tx, Ty, dtype=np.int64)
+    else:
+        lo, hi = window
+
+    prev = np.full(Ty + 1, np.inf)
+    curr = np.full(Ty + 1, np.inf)
+    prev[0] = 0.0
+    # 各行の遷移方向 0: 左下, 1: 下, 2: 左
+    directions = []
+
+    for i in range(Tx):
+        l, h = lo[i], hi[i]
+        dist = np.sqrt(((y[l:h] - x[i]) ** 2).sum(axis=1))
+        diag = prev[l:h]
+        up = prev[l + 1 : h + 1]
+        from_up = up < diag
+        t = dist + np.where(from_up, up, diag)
+        s = np.cumsum(dist)
+        v = t - s
+        acc = np.minimum.accumulate(v)
+        row = s + acc
+        # 自身より左の値で最小値が更新されていれば左からの遷移
+        direction = np.where(v > acc, 2, from_up).astype(np.uint8)
+        directions.append(direction)
+
+        curr.fill(np.inf)
+        curr[l + 1 : h + 1] = row
+        prev, curr = curr, prev
+        prev[0] = np.inf
+
+    cost = float(prev[Ty])
+
+    # 右上から逆順にたどることでパスを求める
+    i = Tx - 1
+    j = Ty - 1
+    path = [(i, j)]
+    while i > 0 or j > 0:
+        direction = directions[i][j - lo[i]]
+        if direction == 0:
+            i -= 1
+            j -= 1
+        elif direction == 1:
+            i -= 1
+        else:
+            j -= 1
+        path.append((i, j))
+    path.reverse()
+    return np.array(path), cost
@@ -3,32 +3,86 @@ import sys
 sys.path.append("../")
 
 import numpy as np
-from tslearn.preprocessing import TimeSeriesScalerMinMax
-from tslearn.utils import to_time_series_dataset
+import pandas as pd
 
-from utils import DfManager
 from config import constants
+from .core import normalize_coordinate, calculate_dtw_cost, calculate_dtw_path
+from .result_cache import dtw_params, trajectory_key
+from .fastdtw import fast_dtw
 
 
 class DTW:
-    def __init__(self, windowSize=False):
+    def __init__(
+        self,
+        windowSize=False,
+        trajectory_cache=None,
+        result_cache=None,
+        fast_radius=None,
+        store=None,
+    ):
         self.__windowSize = windowSize
+        # fast_radiusを指定すると，FastDTWによる近似値を算出する
+        self.__fast_radius = fast_radius
+        # TrajectoryCacheを渡すと，set_dtwに作品IDを指定できる
+        self.__trajectory_cache = trajectory_cache
+        # TrajectoryStore（compact_coordinatesなど）を渡すと，作品IDを指定した場合に
+        # 正規化済みなら連結配列のビューをコピーせずに使い，正規化せずに保存したものは読み込むたびに
+        # 正規化する．部分DTWのmove_indexもここから取得する
+        self.__store = store
+        # DtwResultCacheを渡すと，get_dtwのkeysで算出済みの結果を再利用する．
+        # キーには軌跡の内容のハッシュ値を含め，軌跡を作り直した作品の結果は使わない
+        self.__result_cache = result_cache
+        if fast_radius is None:
+            self.__params = dtw_params(windowSize)
+        else:
+            self.__params = dtw_params(windowSize, fast_radius=fast_radius)
+
+    def set_dtw(self, data1, data2, normalized=False):
+        """比較する2つの座標データを指定
+        Args:
+            data1(array-like or int or str): 座標データか，storeまたはtrajectory_cacheの作品ID
+            data2(array-like or int or str): 座標データか，storeまたはtrajectory_cacheの作品ID
+            normalized(bool, optional): 座標データが正規化済みの場合はTrue. Trueの場合は正規化もコピーもしない.
+                作品IDを指定した場合は使わない（storeに保存した正規化の有無に従う）.
+        """
+        self.__data1 = self.__load_coordinate(data1, normalized)
+        self.__data2 = self.__load_coordinate(data2, normalized)
+
+    def get_dtw_path(self):
+        """set_dtwで指定した2つの座標データのワーピングパスとDTW距離を取得
+        Returns:
+            tuple: ((0, 0)から始まるパスの配列, DTW距離) を返す
+        """
+        return self.__calculate_dtw(self.__data1, self.__data2, with_path=True)
 
-    def set_dtw(self, data1, data2):
-        self.__data1 = self.__load_coordinate(data1)
-        self.__data2 = self.__load_coordinate(data2)
+    def get_params(self):
+        return self.__params
 
     def get_dtw(self, keys=[]):
+        use_cache = self.__result_cache is not None and len(keys) == 2
+        if use_cache:
+            cache_keys = (
+                trajectory_key(keys[0], self.__data1),
+                trajectory_key(keys[1], self.__data2),
+            )
+            cached = self.__result_cache.get(*cache_keys, self.__params)
+            if cached is not None:
+                return cached
+
         try:
             if self.__windowSize:
                 result = self.__calculate_partial_dtw(keys[0], keys[1])
-                return result
+            elif self.__fast_radius is not None:
+                result = fast_dtw(self.__data1, self.__data2, self.__fast_radius)[1]
             else:
-                dtwVal = self.__calculate_dtw(self.__data1, self.__data2)[1]
-                return dtwVal
+                result = self.__calculate_dtw(self.__data1, self.__data2)[1]
         except Exception:
             return "error"
 
+        if use_cache:
+            self.__result_cache.put(*cache_keys, self.__params, result)
+        return result
+
     def __calculate_partial_dtw(self, key1, key2):
         try:
             if (
@@ -42,10 +96,8 @@ class DTW:
             minRange1 = []
             minRange2 = []
 
-            dfM = DfManager(f"{constants.COORDINATE_PATH}{key1}.csv")
-            dfM2 = DfManager(f"{constants.COORDINATE_PATH}{key2}.csv")
-            df = dfM.get_df()
-            df2 = dfM2.get_df()
+            move_index1 = self.__get_move_index(key1)
+            move_index2 = self.__get_move_index(key2)
 
             for i in range(len(self.__data1)):
                 if i + self.__windowSize - 1 > len(self.__data1):
@@ -63,105 +115,65 @@ class DTW:
                         minDtwValue = dtwVal
 
                         minRange1 = [
-                            df.iloc[i]["move_index"],
-                            df.iloc[i + self.__windowSize - 1]["move_index"],
+                            move_index1[i],
+                            move_index1[i + self.__windowSize - 1],
                         ]
                         minRange2 = [
-                            df2.iloc[j]["move_index"],
-                            df2.iloc[j + self.__windowSize - 1]["move_index"],
+                            move_index2[j],
+                            move_index2[j + self.__windowSize - 1],
                         ]
         except Exception as e:
             print(e)
 
         return minDtwValue, minRange1, minRange2
 
-    def __load_coordinate(self, data):
+    def __get_move_index(self, key):
+        # storeに1点ごとのmove_indexがあればビューを使い，なければ座標CSVの列だけを読む
+        if self.__store is not None and self.__store.has_point_column("move_index"):
+            move_index = self.__store.get_point_column("move_index", key)
+            if move_index is not None:
+                return move_index
+        return pd.read_csv(
+            f"{constants.COORDINATE_PATH}{key}.csv", usecols=["move_index"]
+        )["move_index"].to_numpy()
+
+    def __load_coordinate(self, data, normalized=False):
         """
         data = [
             [x, y],
             [x1, x2],
             ...
         ]
+        もしくはstore，trajectory_cacheに保存されている作品ID
         """
 
-        return (
-            TimeSeriesScalerMinMax()
-            .fit_transform(to_time_series_dataset([data]))
-            .flatten()
-            .reshape(-1, 2)
-        )
-
-    def __calculate_dtw(self, x, y):
+        if isinstance(data, (int, str)):
+            if self.__store is not None and data in self.__store:
+                trajectory = self.__store.get(data)
+                if self.__store.is_normalized():
+                    return trajectory
+                return normalize_coordinate(trajectory)
+            if self.__trajectory_cache is not None:
+                return self.__trajectory_cache.get(data)
+        if normalized:
+            return np.asarray(data)
+        return normalize_coordinate(data)
+
+    def __calculate_dtw(self, x, y, with_path=False):
         try:
-            # xのデータ数，yのデータ数をそれぞれTx,Tyに代入
-            Tx = len(x)
-            Ty = len(y)
-
-            # C:各マスの累積コスト，　B：最小コストの行/列番号
-            C = np.zeros((Tx, Ty))
-            B = np.zeros((Tx, Ty, 2), int)
-
-            # 一番初めのマスのコストを，xとyのそれぞれ一番初めの値にする
-            C[0, 0] = self.__calculateDist(x[0], y[0])
-
             # 動的計画法を用いる
-            # 左下のマスからスタートし，各マスに到達するため最小の累積コストを1マスずつ求める
+            # 左下のマスからスタートし，各マスに到達するため最小の累積コストを1行ずつ求める
 
             # 境界条件：両端が左下と右上にあること
             # 単調性：左下から始まり，右，上，右上のいずれかにしか進まないこと
             # 連続性：繋がっていること
 
-            # 一番下の行は，真っ直ぐ右にコストが累積される
-            for i in range(Tx):
-                C[i, 0] = C[i - 1, 0] + self.__calculateDist(x[i], y[0])
-                B[i, 0] = [i - 1, 0]
-
-            # 同様に一番左の列は，真っ直ぐ上にコストが累積される
-            for j in range(1, Ty):
-                C[0, j] = C[0, j - 1] + self.__calculateDist(x[0], y[j])
-                B[0, j] = [0, j - 1]
-
-            # その他のマスの累積コストを求める
-            for i in range(1, Tx):
-                for j in range(1, Ty):
-                    pi, pj, m = self.__getMin(
-                        C[i - 1, j], C[i, j - 1], C[i - 1, j - 1], i, j
-                    )
-                    # get_minで返ってきた最小コストを累積コストに足す
-                    C[i, j] = self.__calculateDist(x[i], y[j]) + m
-                    # get_minで返ってきた最小コストの行/列番号を保持
-                    B[i, j] = [pi, pj]
-            # 最終的な右上（最終の到達点）のコスト
-            cost = C[-1, -1]
-
-            path = [[Tx - 1, Ty - 1]]
-
-            # 逆順にたどることでパスを求める
-            i = Tx - 1
-            j = Ty - 1
-
-            while (B[i, j][0] != 0) or (B[i, j][1] != 0):
-                path.append(B[i, j])
-                i, j = B[i, j].astype(int)
-            path.append([0, 0])
-            return np.array(path), cost, C
-
-        except Exception:
-            return (0, 0, 0)
+            # パスが不要な場合は累積コストを1行分だけ保持して計算する
+            if not with_path:
+                return None, calculate_dtw_cost(x, y)
 
-    # 距離算出
-    def __calculateDist(self, a, b):
-        return ((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2) ** 0.5
+            # パスが必要な場合も遷移方向を1マス1バイトで保持する
+            return calculate_dtw_path(x, y)
 
-    # 最小値算出
-    def __getMin(self, m0, m1, m2, i, j):
-        if m0 < m1:
-            if m0 < m2:
-                return i - 1, j, m0
-            else:
-                return i - 1, j - 1, m2
-        else:
-            if m1 < m2:
-                return i, j - 1, m1
-            else:
-                return i - 1, j - 1, m2
+        except Exception:
+            return (0, 0)
@@ -0,0 +1,98 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from .core import calculate_dtw_cost, calculate_dtw_path
+
+
+def fast_dtw(x, y, radius=1):
+    """FastDTWによる近似的なDTW距離とワーピングパスを算出
+    系列を半分ずつ粗くしてDTWを解き，そのパスの周辺のみを元の解像度で計算し直す．
+
+    Args:
+        x(array-like): (データ数, 2) の座標データ
+        y(array-like): (データ数, 2) の座標データ
+        radius(int, optional): 粗い解像度のパスから広げる範囲. 大きいほど正確で遅い.
+
+    Returns:
+        tuple: (パス, 近似DTW距離) を返す
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    min_size = radius + 2
+    if len(x) <= min_size or len(y) <= min_size:
+        return calculate_dtw_path(x, y)
+
+    low_path, _ = fast_dtw(__reduce_by_half(x), __reduce_by_half(y), radius)
+    window = __expand_window(low_path, len(x), len(y), radius)
+    return calculate_dtw_path(x, y, window)
+
+
+def evaluate_fast_dtw(trajectories, radii=(1, 2, 5, 10), pair_num=100, seed=0):
+    """FastDTWと厳密なDTWを比較した精度・速度のレポートを作成
+    Args:
+        trajectories(list): 正規化済みの座標データのリスト
+        radii(tuple, optional): 比較するradiusの一覧.
+        pair_num(int, optional): ランダムに選ぶ軌跡ペアの数.
+        seed(int, optional): ペアを選ぶ際の乱数シード.
+
+    Returns:
+        Dataframe: radiusごとの相対誤差と計算時間を返す
+    """
+    rng = np.random.default_rng(seed)
+    pairs = rng.integers(0, len(trajectories), size=(pair_num, 2))
+
+    exact = []
+    start = time.perf_counter()
+    for i, j in pairs:
+        exact.append(calculate_dtw_cost(trajectories[i], trajectories[j]))
+    exact_time = time.perf_counter() - start
+    exact = np.array(exact)
+
+    rows = []
+    for radius in radii:
+        approx = []
+        start = time.perf_counter()
+        for i, j in pairs:
+            approx.append(fast_dtw(trajectories[i], trajectories[j], radius)[1])
+        fast_time = time.perf_counter() - start
+
+        # 近似値は常に厳密な値以上になる
+        error = (np.array(approx) - exact) / np.where(exact > 0, exact, 1)
+        rows.append(
+            {
+                "radius": radius,
+                "mean_error": error.mean(),
+                "max_error": error.max(),
+                "exact_rate": (error < 1e-9).mean(),
+                "exact_time": exact_time,
+                "fast_time": fast_time,
+            }
+        )
+
+    return pd.DataFrame(rows)
+
+
+def __reduce_by_half(x):
+    # 隣り合う2点の平均を取って系列長を半分にする
+    even = len(x) // 2 * 2
+    reduced = (x[0:even:2] + x[1:even:2]) / 2
+    if len(x) % 2:
+        reduced = np.vstack([reduced, x[-1:]])
+    return reduced
+
+
+def __expand_window(path, length1, length2, radius):
+    # 粗い解像度のパスを元の解像度に投影し，radiusだけ広げた各行の列範囲を求める
+    offsets = np.arange(-radius, radius + 2)
+    rows = (2 * path[:, :1] + offsets).ravel()
+    lo = np.repeat(2 * path[:, 1] - radius, len(offsets))
+    hi = np.repeat(2 * path[:, 1] + radius + 2, len(offsets))
+    mask = (rows >= 0) & (rows < length1)
+
+    window_lo = np.full(length1, length2, dtype=np.int64)
+    window_hi = np.zeros(length1, dtype=np.int64)
+    np.minimum.at(window_lo, rows[mask], lo[mask])
+    np.maximum.at(window_hi, rows[mask], hi[mask])
+    return np.clip(window_lo, 0, length2 - 1), np.clip(window_hi, 1, length2)
@@ -0,0 +1,153 @@
+import heapq
+
+import numpy as np
+
+from .core import normalize_coordinate, band_window, calculate_dtw_cost
+
+
+class DtwQuery:
+    """1つのクエリ軌跡と複数の候補軌跡とのDTW距離をまとめて算出するためのクラス
+
+    クエリの正規化とエンベロープ（区間ごとの最小・最大値）の計算は初期化時に1度だけ行う．
+    """
+
+    def __init__(self, data, radius=None, normalized=False):
+        """DtwQueryの初期化
+        Args:
+            data(array-like): クエリの座標データ [[x, y], [x1, y1], ...]
+            radius(int, optional): Sakoe-Chibaバンドの半径. 指定なしだと制約なしのDTW.
+            normalized(bool, optional): dataが正規化済みの場合はTrue.
+        """
+        if normalized:
+            self.__query = np.asarray(data, dtype=np.float64).reshape(-1, 2)
+        else:
+            self.__query = normalize_coordinate(data)
+        self.__radius = radius
+        self.__upper, self.__lower = self.__build_envelope(self.__query)
+
+    def get_query(self):
+        """正規化済みのクエリを取得
+        Returns:
+            numpy.ndarray: (データ数, 2) の正規化済み座標データを返す
+        """
+        return self.__query
+
+    def get_radius(self):
+        return self.__radius
+
+    def score(self, candidate, normalized=False, max_distance=None):
+        """候補軌跡1つとのDTW距離を算出
+        Args:
+            candidate(array-like): 候補の座標データ
+            normalized(bool, optional): candidateが正規化済みの場合はTrue.
+            max_distance(float, optional): これを超える候補は計算を打ち切る.
+
+        Returns:
+            float: DTW距離を返す．打ち切った場合はinfを返す
+        """
+        if normalized:
+            candidate = np.asarray(candidate, dtype=np.float64).reshape(-1, 2)
+        else:
+            candidate = normalize_coordinate(candidate)
+
+        window = None
+        if self.__radius is not None:
+            window = band_window(len(self.__query), len(candidate), self.__radius)
+
+        if max_distance is not None:
+            if self.lower_bound(candidate, window) > max_distance:
+                return np.inf
+
+        return calculate_dtw_cost(self.__query, candidate, window, max_distance)
+
+    def score_batch(self, candidates, normalized=False, max_distance=None, k=None):
+        """複数の候補軌跡とのDTW距離をまとめて算出
+        candidatesはリストでもジェネレータでもよい．
+
+        Args:
+            candidates(iterable): 候補の座標データの集合
+            normalized(bool, optional): 候補が正規化済みの場合はTrue.
+            max_distance(float, optional): これを超える候補は計算を打ち切る.
+            k(int, optional): 上位k件に入り得ない候補の計算を打ち切る.
+
+        Returns:
+            numpy.ndarray: 候補の順にDTW距離を並べた配列を返す．打ち切った候補はinf
+        """
+        threshold = np.inf if max_distance is None else max_distance
+        # 現時点の上位k件（符号を反転して最大ヒープとして扱う）
+        best = []
+        distances = []
+        for candidate in candidates:
+            dist = self.score(
+                candidate,
+                normalized=normalized,
+                max_distance=None if np.isinf(threshold) else threshold,
+            )
+            distances.append(dist)
+            if k and np.isfinite(dist) and dist <= threshold:
+                if len(best) < k:
+                    heapq.heappush(best, -dist)
+                else:
+                    heapq.heappushpop(best, -dist)
+                if len(best) == k:
+                    threshold = min(threshold, -best[0])
+
+        return np.array(distances, dtype=np.float64)
+
+    def lower_bound(self, candidate, window=None):
+        """DTW距離の下界を算出
+        両端点の距離（LB_Kim）と，バンド指定時はエンベロープとの距離（LB_Keogh）の大きい方を返す．
+
+        Args:
+            candidate(numpy.ndarray): 正規化済みの候補の座標データ
+            window(tuple, optional): band_windowで求めた列範囲.
+
+        Returns:
+            float: DTW距離の下界を返す
+        """
+        query = self.__query
+        bound = np.linalg.norm(query[0] - candidate[0])
+        if len(query) > 1 or len(candidate) > 1:
+            bound += np.linalg.norm(query[-1] - candidate[-1])
+
+        if window is not None:
+            lo, hi = window
+            # 候補の各点が対応し得るクエリの区間 [start, end]
+            j = np.arange(len(candidate))
+            start = np.searchsorted(hi, j, side="right")
+            end = np.searchsorted(lo, j, side="right") - 1
+            # どの行の範囲にも入らない点があると，バンド内のパスは存在しない
+            if np.any(start > end):
+                return np.inf
+            upper, lower = self.__range_envelope(start, end)
+            gap = np.maximum(lower - candidate, 0) + np.maximum(candidate - upper, 0)
+            bound = max(bound, np.sqrt((gap**2).sum(axis=1)).sum())
+
+        return bound
+
+    def __build_envelope(self, query):
+        # 区間最大・最小を定数時間で引けるようにスパーステーブルを作る
+        upper = [query]
+        lower = [query]
+        width = 1
+        while width * 2 <= len(query):
+            upper.append(np.maximum(upper[-1][:-width], upper[-1][width:]))
+            lower.append(np.minimum(lower[-1][:-width], lower[-1][width:]))
+            width *= 2
+
+        # 各段の長さをクエリ長に揃えて1つの配列にまとめる
+        def stack(levels):
+            table = np.empty((len(levels), len(query), 2))
+            for level, values in enumerate(levels):
+                table[level, : len(values)] = values
+                table[level, len(values) :] = values[-1]
+            return table
+
+        return stack(upper), stack(lower)
+
+    def __range_envelope(self, start, end):
+        level = np.floor(np.log2(end - start + 1)).astype(np.int64)
+        other = end - (1 << level) + 1
+        upper = np.maximum(self.__upper[level, start], self.__upper[level, other])
+        lower = np.minimum(self.__lower[level, start], self.__lower[level, other])
+        return upper, lower
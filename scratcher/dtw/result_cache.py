@@ -0,0 +1,184 @@
+import sys
+
+sys.path.append("../")
+
+import json
+import sqlite3
+import hashlib
+import threading
+
+import numpy as np
+
+from config import constants
+from .core import NORMALIZATION_VERSION
+
+# 一度にIN句へ渡すキーの数（SQLiteの変数上限より小さくする）
+CHUNK_SIZE = 500
+# キャッシュの形式のバージョン．キーの作り方を変えた場合は上げ，古い行を破棄する
+SCHEMA_VERSION = 3
+# 作品IDと軌跡の内容のハッシュ値の区切り（作品IDに含まれない文字）
+DIGEST_SEPARATOR = "\x01"
+
+
+def dtw_params(window_size=False, **kwargs):
+    """DTWの計算条件をキャッシュのキー用の文字列に変換
+    Args:
+        window_size(int or bool, optional): 部分DTWのウインドウサイズ.
+        kwargs: その他の計算条件
+
+    Returns:
+        str: 計算条件を表す文字列を返す
+    """
+    params = {"window": window_size, **kwargs}
+    return json.dumps(params, sort_keys=True)
+
+
+def trajectory_key(key, trajectory):
+    """作品IDに軌跡の内容のハッシュ値を付けたキャッシュのキーを作成
+    軌跡を作り直した作品では別のキーになるため，古い算出結果を使わない．
+
+    Args:
+        key(int or str): 作品ID
+        trajectory(numpy.ndarray): DTWに使う（正規化後の）座標データ
+
+    Returns:
+        str: キャッシュのキーを返す
+    """
+    data = np.ascontiguousarray(trajectory, dtype=np.float64)
+    digest = hashlib.blake2b(data.tobytes(), digest_size=16).hexdigest()
+    return f"{key}{DIGEST_SEPARATOR}{data.shape[0]}:{digest}"
+
+
+class DtwResultCache:
+    """作品ペアごとのDTWの算出結果を保存するためのクラス
+
+    キーは (順序に依存しないペアのキー, 計算条件, 正規化のバージョン)．
+    作品IDには，trajectory_keyで軌跡の内容のハッシュ値を付けたものを使う．
+    複数スレッド・複数プロセスから同じファイルを使ってもよい．
+    """
+
+    def __init__(self, path=constants.DTW_CACHE_PATH):
+        """DtwResultCacheの初期化
+        Args:
+            path(str, optional): SQLiteファイルのパス.
+        """
+        self.__lock = threading.Lock()
+        self.__conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.__conn.execute("PRAGMA journal_mode=WAL")
+        self.__conn.execute("PRAGMA synchronous=NORMAL")
+        schema_version = self.__conn.execute("PRAGMA user_version").fetchone()[0]
+        if schema_version < SCHEMA_VERSION:
+            # 区切りなしでIDを結合していた頃や，軌跡の内容をキーに含めていなかった頃の行は
+            # 別のペアや作り直す前の軌跡と衝突し得るため破棄する
+            self.__conn.execute("DROP TABLE IF EXISTS dtw")
+            self.__conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.__conn.execute("""CREATE TABLE IF NOT EXISTS dtw (
+                pair_key TEXT NOT NULL,
+                params TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (pair_key, params, version)
+            ) WITHOUT ROWID""")
+        self.__conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """SQLiteとの接続を閉じる"""
+        with self.__lock:
+            self.__conn.close()
+
+    def get(self, key1, key2, params):
+        """作品ペアのDTWの算出結果を取得
+        Args:
+            key1(int or str): 1つ目の作品ID
+            key2(int or str): 2つ目の作品ID
+            params(str): dtw_paramsで作成した計算条件
+
+        Returns:
+            float or list: 保存されている算出結果を返す．存在しない場合はNone
+        """
+        return self.get_many([(key1, key2)], params).get((key1, key2))
+
+    def put(self, key1, key2, params, value):
+        """作品ペアのDTWの算出結果を保存
+        Args:
+            key1(int or str): 1つ目の作品ID
+            key2(int or str): 2つ目の作品ID
+            params(str): dtw_paramsで作成した計算条件
+            value(float or list): 算出結果
+        """
+        self.put_many([(key1, key2, value)], params)
+
+    def get_many(self, pairs, params):
+        """複数の作品ペアのDTWの算出結果をまとめて取得
+        Args:
+            pairs(list): (作品ID, 作品ID) のリスト
+            params(str): dtw_paramsで作成した計算条件
+
+        Returns:
+            dictionary: 保存されていたペア -> 算出結果 を返す
+        """
+        pair_keys = {}
+        for key1, key2 in pairs:
+            pair_keys.setdefault(self.__pair_key(key1, key2), []).append((key1, key2))
+
+        result = {}
+        keys = list(pair_keys)
+        with self.__lock:
+            for start in range(0, len(keys), CHUNK_SIZE):
+                chunk = keys[start : start + CHUNK_SIZE]
+                rows = self.__conn.execute(
+                    f"""SELECT pair_key, value FROM dtw
+                    WHERE params = ? AND version = ?
+                    AND pair_key IN ({",".join("?" * len(chunk))})""",
+                    [params, NORMALIZATION_VERSION, *chunk],
+                )
+                for pair_key, value in rows:
+                    for key1, key2 in pair_keys[pair_key]:
+                        result[(key1, key2)] = self.__orient(
+                            key1, key2, json.loads(value)
+                        )
+        return result
+
+    def put_many(self, items, params):
+        """複数の作品ペアのDTWの算出結果をまとめて保存
+        Args:
+            items(iterable): (作品ID, 作品ID, 算出結果) の集合
+            params(str): dtw_paramsで作成した計算条件
+        """
+        rows = [
+            (
+                self.__pair_key(key1, key2),
+                params,
+                NORMALIZATION_VERSION,
+                json.dumps(self.__orient(key1, key2, value), default=self.__to_builtin),
+            )
+            for key1, key2, value in items
+        ]
+        with self.__lock:
+            with self.__conn:
+                self.__conn.executemany(
+                    "INSERT OR REPLACE INTO dtw VALUES (?, ?, ?, ?)", rows
+                )
+
+    def __pair_key(self, key1, key2):
+        # 順序に依存しないペアのキー．IDに含まれない区切り文字で結合し，(1234, 56789)と(12345, 6789)を区別する
+        return "\x00".join(sorted([str(key1), str(key2)]))
+
+    def __to_builtin(self, value):
+        # numpyのスカラー値をJSONに変換できる型に戻す
+        return value.item()
+
+    def __orient(self, key1, key2, value):
+        # 部分DTWの結果 (DTW値, 範囲1, 範囲2) はIDの昇順で保存し，取り出す際に並べ直す．
+        # JSONからはリストで読み込まれるため，算出した場合と同じタプルに戻す
+        if isinstance(value, (list, tuple)) and len(value) == 3:
+            if sorted([str(key1), str(key2)])[0] != str(key1):
+                return (value[0], value[2], value[1])
+            return tuple(value)
+        return value
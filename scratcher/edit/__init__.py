@@ -0,0 +1,11 @@
+from .tree import Tree, ast_to_tree, compact_ast_to_tree, df_to_tree
+from .cost import EditCost
+from .edit import tree_edit_distance, choose_strategy, pairwise_distances
+from .bound import (
+    size_bound,
+    histogram_bound,
+    branch_bound,
+    lower_bound,
+    get_branches,
+    TreeIndex,
+)
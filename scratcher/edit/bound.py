@@ -0,0 +1,308 @@
+from collections import Counter
+
+import numpy as np
+
+from utils.parallelizer import parallel_map
+
+from .cost import EditCost
+from .edit import tree_edit_distance
+
+# 二分木表現で1回の編集操作により変化する枝の数の上限
+BRANCH_FACTOR = 5
+
+
+def size_bound(tree1, tree2):
+    """ノード数の差による木編集距離の下界を算出
+    Args:
+        tree1(Tree): 1つ目の木
+        tree2(Tree): 2つ目の木
+
+    Returns:
+        float: 下界を返す
+    """
+    return float(abs(len(tree1) - len(tree2)))
+
+
+def histogram_bound(tree1, tree2, cost=None):
+    """オペコードと抽象クラスのヒストグラムによる木編集距離の下界を算出
+    対応付けたノードのうち，同じオペコード同士は高々I組，同じ抽象クラス同士は高々J組のため，
+    max(n1, n2) - α*I - (1-α)*J が下界になる（αは同じ抽象クラス同士の置換コスト）．
+
+    Args:
+        tree1(Tree): 1つ目の木
+        tree2(Tree): 2つ目の木
+        cost(EditCost, optional): 各操作のコスト.
+
+    Returns:
+        float: 下界を返す
+    """
+    if cost is None:
+        cost = EditCost()
+    alpha = min(cost.get_abstract_cost(), 1.0)
+    same_label = __intersection(Counter(tree1.labels), Counter(tree2.labels))
+    same_class = __intersection(
+        Counter(map(cost.get_abstract_class, tree1.labels)),
+        Counter(map(cost.get_abstract_class, tree2.labels)),
+    )
+    return float(
+        max(len(tree1), len(tree2)) - alpha * same_label - (1 - alpha) * same_class
+    )
+
+
+def get_branches(tree, cost=None):
+    """木の二分木表現における枝（ノード, 最初の子, 次の兄弟）の出現数を取得
+    ラベルは抽象クラスに置き換えるため，同じ抽象クラス内の置換では枝は変化しない．
+
+    Args:
+        tree(Tree): 木
+        cost(EditCost, optional): 抽象クラスの取得に使うコスト.
+
+    Returns:
+        Counter: 枝 -> 出現数 を返す
+    """
+    if cost is None:
+        cost = EditCost()
+    # 末尾に-1（子・兄弟なし）用のラベルを追加して，抽象クラスIDで枝を表す
+    labels = np.append(cost.get_abstracter().abstract(tree.labels).astype(np.int64), -1)
+    return Counter(
+        zip(
+            labels[:-1].tolist(),
+            labels[tree.first_child].tolist(),
+            labels[tree.next_sibling].tolist(),
+        )
+    )
+
+
+def branch_bound(tree1, tree2, cost=None, branches1=None, branches2=None):
+    """二分枝距離による木編集距離の下界を算出
+    コスト1の操作1回で変化する枝は高々5つのため，二分枝距離/5 が下界になる．
+
+    Args:
+        tree1(Tree): 1つ目の木
+        tree2(Tree): 2つ目の木
+        cost(EditCost, optional): 各操作のコスト.
+        branches1(Counter, optional): 計算済みのtree1の枝.
+        branches2(Counter, optional): 計算済みのtree2の枝.
+
+    Returns:
+        float: 下界を返す
+    """
+    if branches1 is None:
+        branches1 = get_branches(tree1, cost)
+    if branches2 is None:
+        branches2 = get_branches(tree2, cost)
+    distance = sum((branches1 - branches2).values()) + sum(
+        (branches2 - branches1).values()
+    )
+    return distance / BRANCH_FACTOR
+
+
+def lower_bound(tree1, tree2, cost=None):
+    """各下界のうち最も大きいものを算出
+    Args:
+        tree1(Tree): 1つ目の木
+        tree2(Tree): 2つ目の木
+        cost(EditCost, optional): 各操作のコスト.
+
+    Returns:
+        float: 下界を返す
+    """
+    if cost is None:
+        cost = EditCost()
+    return max(
+        size_bound(tree1, tree2),
+        histogram_bound(tree1, tree2, cost),
+        branch_bound(tree1, tree2, cost),
+    )
+
+
+class TreeIndex:
+    """下界による枝刈りを行いながら，木編集距離の近い木を探すためのクラス
+
+    ノード数・ヒストグラムの下界は全候補についてまとめて算出し，残った候補のみ二分枝距離，
+    木編集距離の順に計算する．下界はEditCostのコスト（挿入・削除1，置換1以下）を前提とする．
+    """
+
+    def __init__(self, trees, cost=None, strategy="auto"):
+        """TreeIndexの初期化
+        Args:
+            trees(list): Treeのリスト
+            cost(EditCost, optional): 各操作のコスト.
+            strategy(str, optional): 木編集距離の分解の方向（左右のパスの選択）. "auto" or "left" or "right".
+        """
+        if cost is None:
+            cost = EditCost()
+        self.__trees = trees
+        self.__cost = cost
+        self.__strategy = strategy
+        self.__alpha = min(cost.get_abstract_cost(), 1.0)
+        self.__sizes = np.array([len(tree) for tree in trees], dtype=np.int64)
+        # ヒストグラムはオペコードID，抽象クラスIDを列とする
+        abstracter = cost.get_abstracter()
+        encoded = [abstracter.encode(tree.labels) for tree in trees]
+        self.__num_labels = len(abstracter)
+        self.__num_classes = int(abstracter.get_lookup().max(initial=-1)) + 1
+        self.__label_hist = self.__histograms(encoded, False)
+        self.__class_hist = self.__histograms(encoded, True)
+        self.__branches = [get_branches(tree, cost) for tree in trees]
+        self.__stats = Counter()
+
+    def __len__(self):
+        return len(self.__trees)
+
+    def get_stats(self):
+        """枝刈りの集計を取得
+        Returns:
+            dictionary: 段階ごとに枝刈りした候補数と，木編集距離を計算した数を返す．
+                並列化したfind_pairsの分はワーカー側で集計されるため含まない
+        """
+        return dict(self.__stats)
+
+    def get_bounds(self, tree, candidates=None):
+        """木と候補の木の，ノード数とヒストグラムによる下界をまとめて算出
+        Args:
+            tree(Tree): 木
+            candidates(numpy.ndarray, optional): 候補のインデックス. 指定なしだと全ての木.
+
+        Returns:
+            numpy.ndarray: 候補ごとの下界を返す
+        """
+        if candidates is None:
+            candidates = np.arange(len(self))
+        encoded = [self.__cost.get_abstracter().encode(tree.labels)]
+        label_hist = self.__histograms(encoded, False)[0]
+        class_hist = self.__histograms(encoded, True)[0]
+        same_label = np.minimum(self.__label_hist[candidates], label_hist).sum(axis=1)
+        same_class = np.minimum(self.__class_hist[candidates], class_hist).sum(axis=1)
+        # 語彙にないラベルは一致しないため，ヒストグラムの合計はノード数より小さくなりうる
+        return (
+            np.maximum(self.__sizes[candidates], len(tree))
+            - self.__alpha * same_label
+            - (1 - self.__alpha) * same_class
+        )
+
+    def search(self, tree, k=10, max_distance=None):
+        """木編集距離の近い木を検索
+        下界の小さい順に木編集距離を計算し，下界がk番目の距離以上になったら打ち切る．
+
+        Args:
+            tree(Tree): クエリの木
+            k(int, optional): 取得する件数.
+            max_distance(float, optional): これより遠い木は結果に含めない.
+
+        Returns:
+            list: 距離の昇順に (インデックス, 距離) を並べたリストを返す
+        """
+        threshold = np.inf if max_distance is None else max_distance
+        bounds = self.get_bounds(tree)
+        order = np.argsort(bounds, kind="stable")
+        branches = get_branches(tree, self.__cost)
+        results = []
+        for count, i in enumerate(order):
+            if len(results) == k:
+                threshold = min(threshold, results[-1][1])
+            if bounds[i] > threshold or (len(results) == k and bounds[i] >= threshold):
+                self.__stats["histogram"] += len(order) - count
+                break
+            distance = self.__distance(tree, branches, i, threshold)
+            if distance is None or distance > threshold:
+                continue
+            results.append((int(i), distance))
+            results.sort(key=lambda result: result[1])
+            del results[k:]
+        return results
+
+    def find_pairs(self, max_distance, workers=0):
+        """木編集距離がmax_distance以下の全てのペアを取得
+        ノード数の差がmax_distanceを超えるペアは，ノード数で並べ替えた範囲外として比較しない．
+
+        Args:
+            max_distance(float): 距離の閾値
+            workers(int, optional): プロセス数. 0だと並列化しない.
+
+        Returns:
+            list: (インデックス1, インデックス2, 距離) のリストを返す
+        """
+        # インデックスはワーカーごとに1度だけ渡し，タスクでは行番号のみを渡す
+        rows = parallel_map(
+            _find_row,
+            [(i, max_distance) for i in range(len(self))],
+            backend="process",
+            workers=workers,
+            chunksize=64,
+            initializer=_init_worker,
+            initargs=(self,),
+        )
+        pairs = [pair for row in rows for pair in row]
+        return sorted(pairs)
+
+    def find_row(self, i, max_distance):
+        """i番目の木と，ノード数の順でそれより後ろにある木のうち距離がmax_distance以下のペアを取得
+        Args:
+            i(int): 木のインデックス
+            max_distance(float): 距離の閾値
+
+        Returns:
+            list: (インデックス1, インデックス2, 距離) のリストを返す
+        """
+        sizes = self.__sizes
+        # (ノード数, インデックス) の順で後ろにあり，ノード数の差が閾値以内の木のみを候補にする
+        later = (sizes > sizes[i]) | ((sizes == sizes[i]) & (np.arange(len(self)) > i))
+        candidates = np.flatnonzero(later & (sizes - sizes[i] <= max_distance))
+        self.__stats["size"] += int(later.sum()) - len(candidates)
+        bounds = self.get_bounds(self.__trees[i], candidates)
+        survived = candidates[bounds <= max_distance]
+        self.__stats["histogram"] += len(candidates) - len(survived)
+
+        pairs = []
+        for j in survived:
+            distance = self.__distance(
+                self.__trees[i], self.__branches[i], j, max_distance
+            )
+            if distance is not None and distance <= max_distance:
+                pairs.append((min(i, int(j)), max(i, int(j)), distance))
+        return pairs
+
+    def __distance(self, tree, branches, i, threshold):
+        # 二分枝距離の下界で枝刈りし，残った場合のみ木編集距離を計算する
+        bound = branch_bound(
+            tree, self.__trees[i], branches1=branches, branches2=self.__branches[i]
+        )
+        if bound > threshold:
+            self.__stats["branch"] += 1
+            return None
+        self.__stats["exact"] += 1
+        return tree_edit_distance(tree, self.__trees[i], self.__cost, self.__strategy)
+
+    def __histograms(self, encoded, abstract):
+        # オペコードIDの配列から，各木のヒストグラムを行とする行列を作る
+        if abstract:
+            lookup = self.__cost.get_abstracter().get_lookup()
+            encoded = [lookup[ids] for ids in encoded]
+            width = self.__num_classes
+        else:
+            width = self.__num_labels
+        hist = np.zeros((len(encoded), width), dtype=np.int32)
+        for row, ids in enumerate(encoded):
+            # インデックス作成後に追加されたIDは一致しないため除く
+            ids = ids[ids < width]
+            hist[row] = np.bincount(ids, minlength=width)
+        return hist
+
+
+def __intersection(counter1, counter2):
+    # 2つの多重集合の共通部分の大きさ
+    return sum((counter1 & counter2).values())
+
+
+# ワーカープロセスごとに保持するインデックス
+_index = None
+
+
+def _init_worker(index):
+    global _index
+    _index = index
+
+
+def _find_row(args):
+    return _index.find_row(*args)
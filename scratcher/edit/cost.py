@@ -0,0 +1,83 @@
+import sys
+
+sys.path.append("../")
+
+import numpy as np
+
+from config import constants
+from converter.abstracter import Abstracter
+
+
+class EditCost:
+    """木編集距離の各操作のコストを管理するためのクラス
+
+    置換のコストは，同じオペコード同士なら0，sim.csvで同じ抽象クラスに属するならabstract_cost，
+    それ以外は1とする．挿入・削除のコストは1．
+    """
+
+    def __init__(self, sim_path=constants.SIM_CSV_PATH, abstract_cost=0.5):
+        """EditCostの初期化
+        Args:
+            sim_path(str, optional): 抽象化用CSVのパス. Noneの場合は抽象化しない.
+            abstract_cost(float, optional): 同じ抽象クラスのブロック同士の置換コスト.
+        """
+        self.__abstract_cost = abstract_cost
+        self.__abstracter = Abstracter(sim_path)
+
+    def get_abstract_cost(self):
+        return self.__abstract_cost
+
+    def get_abstracter(self):
+        return self.__abstracter
+
+    def get_abstract_class(self, label):
+        """ラベルの抽象クラスを取得
+        Args:
+            label(str): ブロックのオペコード
+
+        Returns:
+            str: 抽象クラスを返す．sim.csvにない場合はラベルそのもの
+        """
+        return self.__abstracter.get_abstract_class(label)
+
+    def rename(self, label1, label2):
+        """置換のコストを取得
+        Args:
+            label1(str): 置換前のラベル
+            label2(str): 置換後のラベル
+
+        Returns:
+            float: 置換のコストを返す
+        """
+        if label1 == label2:
+            return 0.0
+        if self.get_abstract_class(label1) == self.get_abstract_class(label2):
+            return self.__abstract_cost
+        return 1.0
+
+    def rename_matrix(self, labels1, labels2):
+        """2つのラベル列の全組み合わせの置換コストを取得
+        Args:
+            labels1(list): 1つ目の木のラベル
+            labels2(list): 2つ目の木のラベル
+
+        Returns:
+            numpy.ndarray: (len(labels1), len(labels2)) の置換コストを返す
+        """
+        # 文字列を比較せず，オペコードIDと抽象クラスIDで比較する
+        label1 = self.__abstracter.encode(labels1)
+        label2 = self.__abstracter.encode(labels2)
+        lookup = self.__abstracter.get_lookup()
+        matrix = np.where(
+            lookup[label1][:, None] == lookup[label2][None, :],
+            self.__abstract_cost,
+            1.0,
+        )
+        matrix[label1[:, None] == label2[None, :]] = 0.0
+        return matrix
+
+    def insert(self, label):
+        return 1.0
+
+    def delete(self, label):
+        return 1.0
@@ -0,0 +1,172 @@
+import numpy as np
+
+from utils.parallelizer import parallel_map
+
+from .cost import EditCost
+
+
+def tree_edit_distance(tree1, tree2, cost=None, strategy="auto"):
+    """2つの木の木編集距離を算出
+    strategyが "left" の場合はZhang-Shasha（最も左のパスで分解），"right" の場合は
+    左右反転した木で同じ計算を行う（最も右のパスで分解）．"auto" の場合は，左右のパスのうち
+    計算する部分問題の数が少なくなる方を木のペアごとに選ぶ（左右のパスの選択のみ．APTEDのように
+    部分木ごとにパスを選ぶわけではないため，計算量はZhang-Shashaと同じ）．
+
+    Args:
+        tree1(Tree): 1つ目の木
+        tree2(Tree): 2つ目の木
+        cost(EditCost, optional): 各操作のコスト. 指定なしだとsim.csvを使ったコスト.
+        strategy(str, optional): "auto"（左右のパスのうち少ない方） or "left" or "right". デフォルトはauto.
+
+    Returns:
+        float: 木編集距離を返す
+    """
+    if cost is None:
+        cost = EditCost()
+    if strategy == "auto":
+        strategy = choose_strategy(tree1, tree2)
+    if strategy == "right":
+        tree1 = tree1.mirror()
+        tree2 = tree2.mirror()
+    return __zhang_shasha(tree1, tree2, cost)
+
+
+def choose_strategy(tree1, tree2):
+    """左右のパスのうち，部分問題の数が少なくなる分解の方向を選ぶ
+    Args:
+        tree1(Tree): 1つ目の木
+        tree2(Tree): 2つ目の木
+
+    Returns:
+        str: "left" or "right" を返す
+    """
+    left = tree1.get_decomposition_cost() * tree2.get_decomposition_cost()
+    right = (
+        tree1.mirror().get_decomposition_cost()
+        * tree2.mirror().get_decomposition_cost()
+    )
+    return "left" if left <= right else "right"
+
+
+def pairwise_distances(trees, cost=None, strategy="auto", workers=None):
+    """木の全ペアの木編集距離を算出
+    Args:
+        trees(list): Treeのリスト
+        cost(EditCost, optional): 各操作のコスト.
+        strategy(str, optional): "auto" or "left" or "right".
+        workers(int, optional): プロセス数. 0だと並列化しない.
+
+    Returns:
+        numpy.ndarray: (木の数, 木の数) の距離行列を返す
+    """
+    if cost is None:
+        cost = EditCost()
+    distances = np.zeros((len(trees), len(trees)))
+    # 木はワーカーごとに1度だけ渡し，タスクでは行番号のみを渡す
+    results = parallel_map(
+        _distance_row,
+        range(len(trees)),
+        backend="process",
+        workers=workers,
+        initializer=_init_worker,
+        initargs=(trees, cost, strategy),
+    )
+    for i, row in enumerate(results):
+        distances[i, i + 1 :] = row
+
+    return distances + distances.T
+
+
+# ワーカープロセスごとに保持する木と計算条件
+_trees = None
+_cost = None
+_strategy = None
+
+
+def _init_worker(trees, cost, strategy):
+    global _trees, _cost, _strategy
+    _trees = trees
+    _cost = cost
+    _strategy = strategy
+
+
+def _distance_row(i):
+    # i番目の木と，それより後ろの木との距離
+    return [
+        tree_edit_distance(_trees[i], _trees[j], _cost, _strategy)
+        for j in range(i + 1, len(_trees))
+    ]
+
+
+def __zhang_shasha(tree1, tree2, cost):
+    l1 = tree1.lml
+    l2 = tree2.lml
+    rename = cost.rename_matrix(tree1.labels, tree2.labels)
+    delete = np.array([cost.delete(label) for label in tree1.labels])
+    insert = np.array([cost.insert(label) for label in tree2.labels])
+    # td[a, b]: aを根とする部分木とbを根とする部分木の距離
+    td = np.zeros((len(tree1), len(tree2)))
+
+    # 葉と部分木の距離は，葉を1つのノードに対応付けるか削除するかで直接求まる
+    leaves1 = np.flatnonzero(l1 == np.arange(len(tree1)))
+    leaves2 = np.flatnonzero(l2 == np.arange(len(tree2)))
+    td[leaves1, :] = __leaf_distances(rename[leaves1], delete[leaves1], insert, l2)
+    td[:, leaves2] = __leaf_distances(
+        rename[:, leaves2].T, insert[leaves2], delete, l1
+    ).T
+
+    for i in tree1.keyroots:
+        li = l1[i]
+        if li == i:
+            continue
+        for j in tree2.keyroots:
+            lj = l2[j]
+            if lj == j:
+                continue
+            # fd[x, y]: 部分森 (li..li+x-1) と (lj..lj+y-1) の距離
+            b = np.arange(lj, j + 1)
+            ins = np.concatenate([[0.0], np.cumsum(insert[b])])
+            fd = np.empty((i - li + 2, j - lj + 2))
+            fd[0] = ins
+            fd[1:, 0] = np.cumsum(delete[li : i + 1])
+            # bが部分森の根（最も左の葉がlj）か
+            b_is_tree = l2[b] == lj
+            q = l2[b] - lj
+
+            for x in range(1, i - li + 2):
+                a = li + x - 1
+                # 削除した場合
+                candidate = fd[x - 1, 1:] + delete[a]
+                if l1[a] == li:
+                    # 両方が部分木なら置換，そうでなければ計算済みの部分木の距離を使う
+                    match = np.where(
+                        b_is_tree,
+                        fd[x - 1, :-1] + rename[a, b],
+                        fd[0, q] + td[a, b],
+                    )
+                else:
+                    match = fd[l1[a] - li, q] + td[a, b]
+                candidate = np.minimum(candidate, match)
+
+                # 挿入による左からの遷移は累積和と累積最小値で一括計算する
+                # fd[x, y] = S[y] + min_{k<=y}(A[k] - S[k])
+                values = np.concatenate([[fd[x, 0]], candidate]) - ins
+                fd[x] = ins + np.minimum.accumulate(values)
+
+                if l1[a] == li:
+                    td[a, b[b_is_tree]] = fd[x, 1:][b_is_tree]
+
+    return float(td[-1, -1])
+
+
+def __leaf_distances(rename, leaf_cost, other_cost, lml):
+    # 葉ノードと，もう一方の木の各部分木との距離
+    # = 部分木の全挿入 + min(葉の削除, min_c(葉をcに置換 - cの挿入))
+    subtree_cost = np.concatenate([[0.0], np.cumsum(other_cost)])
+    nodes = np.arange(len(lml))
+    subtree_cost = subtree_cost[nodes + 1] - subtree_cost[lml]
+    gain = rename - other_cost[None, :]
+    best = np.empty_like(gain)
+    for b in nodes:
+        best[:, b] = gain[:, lml[b] : b + 1].min(axis=1)
+    return subtree_cost[None, :] + np.minimum(leaf_cost[:, None], best)
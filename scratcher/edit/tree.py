@@ -0,0 +1,154 @@
+import numpy as np
+
+SUBSTACK_KEYS = ["SUBSTACK", "SUBSTACK2"]
+
+
+class Tree:
+    """木編集距離の算出用に，ノードを後行順に並べた木を管理するためのクラス
+
+    Args:
+        labels (list): 後行順に並べた各ノードのラベル（オペコード）
+        lml (numpy.ndarray): 各ノードの最も左の葉のインデックス
+        keyroots (numpy.ndarray): Zhang-Shashaのキールートのインデックス（昇順）
+        first_child (numpy.ndarray): 各ノードの最初の子ノードのインデックス．葉の場合は-1
+        next_sibling (numpy.ndarray): 各ノードの次の兄弟ノードのインデックス．ない場合は-1
+    """
+
+    def __init__(self, labels, children, root=0):
+        """Treeの初期化
+        Args:
+            labels(list): 各ノードのラベル
+            children(list): 各ノードの子ノードのインデックスのリスト
+            root(int, optional): 根ノードのインデックス.
+        """
+        self.__source = (labels, children, root)
+        order = []
+        # 再帰を使わずに後行順に並べる
+        stack = [(root, False)]
+        while stack:
+            node, visited = stack.pop()
+            if visited:
+                order.append(node)
+                continue
+            stack.append((node, True))
+            for child in reversed(children[node]):
+                stack.append((child, False))
+
+        position = {node: i for i, node in enumerate(order)}
+        self.labels = [labels[node] for node in order]
+        self.lml = np.empty(len(order), dtype=np.int64)
+        for i, node in enumerate(order):
+            if children[node]:
+                self.lml[i] = self.lml[position[children[node][0]]]
+            else:
+                self.lml[i] = i
+
+        self.first_child = np.full(len(order), -1, dtype=np.int64)
+        self.next_sibling = np.full(len(order), -1, dtype=np.int64)
+        for i, node in enumerate(order):
+            kids = [position[child] for child in children[node]]
+            if kids:
+                self.first_child[i] = kids[0]
+                self.next_sibling[kids[:-1]] = kids[1:]
+
+        # 同じ最も左の葉を持つノードのうち，最も上にあるものがキールート
+        keyroots = {}
+        for i, leaf in enumerate(self.lml):
+            keyroots[leaf] = i
+        self.keyroots = np.array(sorted(keyroots.values()), dtype=np.int64)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def mirror(self):
+        """子ノードの順番を左右反転した木を取得
+        Returns:
+            Tree: 左右反転した木を返す
+        """
+        labels, children, root = self.__source
+        return Tree(labels, [list(reversed(c)) for c in children], root)
+
+    def get_decomposition_cost(self):
+        """Zhang-Shashaで計算する部分森の大きさの合計を取得
+        Returns:
+            int: キールートを根とする部分木の大きさの合計を返す
+        """
+        return int((self.keyroots - self.lml[self.keyroots] + 1).sum())
+
+
+def ast_to_tree(ast):
+    """AstConverter.get_astで取得したASTを木に変換
+    スクリプトごとに "SCRIPT" ノードを作り，ブロックはSUBSTACKの中身を子ノードとする．
+
+    Args:
+        ast(dictionary): AstConverter.get_astで取得したAST
+
+    Returns:
+        Tree: 変換した木を返す
+    """
+    labels = [ast.get("type", "Scratch")]
+    children = [[]]
+
+    def add_node(label, parent):
+        labels.append(label)
+        children.append([])
+        children[parent].append(len(labels) - 1)
+        return len(labels) - 1
+
+    def add_blocks(blocks, parent):
+        # 作業用のスタックで，(ブロックのリスト, 親ノード) を順に処理する
+        stack = [(blocks, parent)]
+        while stack:
+            blocks, parent = stack.pop()
+            for block in blocks:
+                node = add_node(block["name"], parent)
+                if block["name"] == "control_if_else":
+                    # if-elseブロックは2段階構造のため，SUBSTACKノードを挟む
+                    for key in SUBSTACK_KEYS:
+                        stack.append((block.get(key, []), add_node("SUBSTACK", node)))
+                elif "SUBSTACK" in block:
+                    stack.append((block["SUBSTACK"], node))
+
+    for script in ast["sprites"]:
+        add_blocks(script["blocks"], add_node("SCRIPT", 0))
+
+    return Tree(labels, children)
+
+
+def compact_ast_to_tree(ast):
+    """AstConverter.get_compact_astで取得したASTを木に変換
+    ノードの構造はast_to_treeと同じになる．
+
+    Args:
+        ast(CompactAst): AstConverter.get_compact_astで取得したAST
+
+    Returns:
+        Tree: 変換した木を返す
+    """
+    children = [[] for _ in range(len(ast))]
+    # 先行順のため，親ごとにインデックス順に追加すれば兄弟の順番になる
+    for node, parent in enumerate(ast.parents.tolist()):
+        if parent >= 0:
+            children[parent].append(node)
+    return Tree(ast.get_labels(), children)
+
+
+def df_to_tree(df):
+    """CodeToASTNodeで取得したDataframeを木に変換
+    Args:
+        df(Dataframe): block, node_id, parent_node_id 列を持つDataframe
+
+    Returns:
+        Tree: 変換した木を返す
+    """
+    labels = df["block"].tolist()
+    node_ids = df["node_id"].tolist()
+    position = {node_id: i for i, node_id in enumerate(node_ids)}
+    children = [[] for _ in labels]
+    root = 0
+    for i, parent in enumerate(df["parent_node_id"].tolist()):
+        if parent in position and position[parent] != i:
+            children[position[parent]].append(i)
+        else:
+            root = i
+    return Tree(labels, children, root)
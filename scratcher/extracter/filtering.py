@@ -1,35 +1,29 @@
-import csv
+import sys
+
+sys.path.append("../")
+
 import os
 import json
 
+from tools.block_filter import get_block_filter
+
 csv_path = "./available_blocks(3.0).csv"
 
-ava_blocks = []
 ds_cnt = 0
 notds_cnt = 0
 
 
-# フィルタリング用関数
-def filterJson(block_hash):
-    for k in block_hash:
-        for block, ava in ava_blocks:
-            if block_hash[k]["opcode"] == block and int(ava) == 0:
-                return False
-    return True
+# フィルタリング用関数（prjmanやpartitionerと同じく，ステージを含む全てのスプライトを判定する）
+def filterJson(json_load):
+    # フィルタリング用CSVは最初の1回だけ読み込む
+    return get_block_filter(csv_path).is_dataset(json_load)
 
 
 # ファイルの読み込み，実行用関数
 def separateJson(json_load, json_path):
     global ds_cnt
     global notds_cnt
-    # フィルタリング用CSVの読み込み
-    with open(csv_path, encoding="utf-8-sig") as f:
-        reader = csv.reader(f)
-        for row in reader:
-            ava_blocks.append(row)
-    # jsonファイルの読み込み
-    block_hash = json_load["targets"][1]["blocks"]
-    if filterJson(block_hash):
+    if filterJson(json_load):
         with open(f"./dataset_json/{json_path}", "w") as f:
             json.dump(json_load, f, ensure_ascii=False)
         ds_cnt += 1
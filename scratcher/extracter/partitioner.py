@@ -0,0 +1,214 @@
+import sys
+
+sys.path.append("../")
+
+import os
+import csv
+import shutil
+import argparse
+from collections import Counter
+
+from config import constants
+from tools.block_filter import BlockFilter
+from utils.project_reader import read_project
+from utils.parallelizer import parallel_map
+
+DATASET = "dataset"
+NOT_DATASET = "notdataset"
+ERROR = "error"
+MANIFEST_COLUMNS = ["file", "verdict"]
+# 作品JSONを振り分ける方法
+MODES = ["link", "move", "copy"]
+
+_block_filter = None
+
+
+def _init_worker(block_filter):
+    global _block_filter
+    _block_filter = block_filter
+
+
+def _partition_file(args):
+    src_path, dst_dirs, mode = args
+    # 1ファイルの失敗で全体を止めないよう，読み込み・判定・配置の失敗はerrorとして記録する
+    try:
+        # フィルタリングにはブロックしか使わないため，他のキーは読み込まない
+        project = read_project(
+            src_path, project_keys=["targets"], target_keys=["blocks"]
+        )
+        verdict = DATASET if _block_filter.is_dataset(project) else NOT_DATASET
+        place_file(
+            src_path, os.path.join(dst_dirs[verdict], os.path.basename(src_path)), mode
+        )
+    except Exception:
+        return ERROR
+    return verdict
+
+
+def place_file(src_path, dst_path, mode="link"):
+    """ファイルを読み直さずに振り分け先へ配置
+    Args:
+        src_path(str): 元のファイルのパス
+        dst_path(str): 配置先のパス
+        mode(str, optional): link（ハードリンク），move（移動），copy（コピー）のいずれか.
+            linkでファイルシステムが異なる場合はコピーする.
+    """
+    # 中断後の再開で，配置済みのファイルはそのまま使う
+    if os.path.exists(dst_path):
+        if mode == "move":
+            os.remove(src_path)
+        return
+    if mode == "move":
+        shutil.move(src_path, dst_path)
+        return
+    if mode == "link":
+        try:
+            os.link(src_path, dst_path)
+            return
+        except OSError:
+            pass
+    shutil.copyfile(src_path, dst_path)
+
+
+def read_manifest(manifest_path):
+    """振り分け結果のマニフェストを読み込む
+    Args:
+        manifest_path(str): マニフェスト（CSV）のパス
+
+    Returns:
+        dictionary: ファイル名 -> 判定（dataset，notdataset，error）を返す
+    """
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, newline="") as f:
+        return {row["file"]: row["verdict"] for row in csv.DictReader(f)}
+
+
+def partition_dataset(
+    json_dir,
+    dataset_dir,
+    notdataset_dir,
+    manifest_path,
+    filter_path=constants.FILTER_CSV_PATH,
+    mode="link",
+    workers=None,
+    retry_errors=False,
+):
+    """作品JSONをフィルタリングし，データセットとそれ以外のディレクトリに振り分ける
+    JSONの判定と配置はプロセスプールで行い，ファイルは書き直さずにハードリンクか移動で配置する．
+    判定はマニフェストに1行ずつ書き出すため，中断しても記録済みのファイルを飛ばして再開できる．
+    moveで記録前に中断した場合は，再開時に振り分け先にあるファイルをマニフェストに補う．
+
+    Args:
+        json_dir(str): 作品JSONのディレクトリのパス
+        dataset_dir(str): フィルタリングを通過した作品の配置先
+        notdataset_dir(str): フィルタリングに引っかかった作品の配置先
+        manifest_path(str): マニフェスト（CSV）のパス
+        filter_path(str, optional): フィルタリング用CSVのパス.
+        mode(str, optional): link，move，copyのいずれか.
+        workers(int, optional): プロセス数. 0だと並列化しない.
+        retry_errors(boolean, optional): 読み込みに失敗したと記録されたファイルを再度処理するか.
+
+    Returns:
+        Counter: 今回処理したファイルの判定ごとの件数を返す
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}")
+    manifest = read_manifest(manifest_path)
+    sources = {entry.name for entry in os.scandir(json_dir) if entry.is_file()}
+    dst_dirs = {DATASET: dataset_dir, NOT_DATASET: notdataset_dir}
+    for dir_path in dst_dirs.values():
+        os.makedirs(dir_path, exist_ok=True)
+    # 移動済みで記録されていないファイル（振り分け先にのみある）は，配置先から判定を補う
+    placed = __find_unrecorded(dst_dirs, manifest, sources) if mode == "move" else []
+    for file_name, verdict in placed:
+        manifest[file_name] = verdict
+
+    done = {
+        file_name
+        for file_name, verdict in manifest.items()
+        if not (retry_errors and verdict == ERROR)
+    }
+    file_names = sorted(sources - done)
+    tasks = [
+        (os.path.join(json_dir, file_name), dst_dirs, mode) for file_name in file_names
+    ]
+    block_filter = BlockFilter(filter_path)
+
+    counts = Counter()
+    is_new = not os.path.exists(manifest_path)
+    with open(manifest_path, "a", newline="") as f:
+        writer = csv.writer(f)
+        if is_new:
+            writer.writerow(MANIFEST_COLUMNS)
+        writer.writerows(placed)
+        f.flush()
+        results = parallel_map(
+            _partition_file,
+            tasks,
+            backend="process",
+            workers=workers,
+            chunksize=64,
+            initializer=_init_worker,
+            initargs=(block_filter,),
+        )
+        __record(writer, f, file_names, results, counts)
+    return counts
+
+
+def __find_unrecorded(dst_dirs, manifest, sources):
+    unrecorded = []
+    for verdict, dir_path in dst_dirs.items():
+        for entry in os.scandir(dir_path):
+            if (
+                entry.is_file()
+                and entry.name not in manifest
+                and entry.name not in sources
+            ):
+                unrecorded.append([entry.name, verdict])
+    return sorted(unrecorded)
+
+
+def __record(writer, f, file_names, results, counts):
+    # 配置が終わったファイルから順にマニフェストへ書き出す（中断しても記録が残るよう1行ずつ）
+    for file_name, verdict in zip(file_names, results):
+        writer.writerow([file_name, verdict])
+        f.flush()
+        counts[verdict] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="作品JSONをフィルタリングし，データセットとそれ以外に振り分ける"
+    )
+    parser.add_argument("json_dir")
+    parser.add_argument("--dataset-dir", default="./dataset_json")
+    parser.add_argument("--notdataset-dir", default="./notdataset_json")
+    parser.add_argument("--manifest", default="./partition_manifest.csv")
+    parser.add_argument("--filter-path", default=constants.FILTER_CSV_PATH)
+    parser.add_argument("--mode", choices=MODES, default="link")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--retry-errors",
+        action="store_true",
+        help="読み込みに失敗した作品を再度処理する",
+    )
+    args = parser.parse_args()
+    counts = partition_dataset(
+        args.json_dir,
+        args.dataset_dir,
+        args.notdataset_dir,
+        args.manifest,
+        args.filter_path,
+        args.mode,
+        args.workers,
+        args.retry_errors,
+    )
+    print(
+        f"dataset: {counts[DATASET]}件，notdataset: {counts[NOT_DATASET]}件，"
+        f"error: {counts[ERROR]}件"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,8 @@ import sys
 sys.path.append("../")
 
 import os
-from utils import scratchManager, removeExtension
+from utils import read_project, remove_extension
+from tools import Sorter
 
 JSON_DIR = sys.path[-1] + "dataset_json"
 CSV_DIR = sys.path[-1] + "sorted_csv"
@@ -12,9 +13,12 @@ CSV_DIR = sys.path[-1] + "sorted_csv"
 def main():
     for filename in os.listdir(JSON_DIR):
         try:
-            id = removeExtension(filename)
-            SM = scratchManager(id)
-            SM.sortBlocks(CSV_DIR)
+            id = remove_extension(filename)
+            # ソートに使うブロック，座標，モニターだけを読み込む
+            project = read_project(os.path.join(JSON_DIR, filename))
+            sorter = Sorter(project)
+            sorter.sort_blocks()
+            sorter.to_csv(f"{CSV_DIR}/{id}.csv")
         except Exception as e:
             print("ソート中にエラーが発生しました．")
             print(e)
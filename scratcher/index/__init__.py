@@ -0,0 +1,15 @@
+from .clone import CloneIndex, fingerprint_script, build_clone_index
+from .lsh import (
+    MinHasher,
+    LshIndex,
+    estimate_jaccard,
+    is_empty_signature,
+    optimal_bands,
+)
+from .ngram import (
+    NgramIndex,
+    build_ngram_index,
+    get_project_terms,
+    encode_varint,
+    decode_varint,
+)
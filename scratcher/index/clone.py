@@ -0,0 +1,288 @@
+import sys
+
+sys.path.append("../")
+
+import os
+import json
+import hashlib
+import argparse
+from collections import defaultdict
+
+from converter import AstConverter
+from converter.abstracter import Abstracter
+from utils import read_project
+
+SUBSTACK_KEYS = ["SUBSTACK", "SUBSTACK2"]
+# 断片として登録する最小のブロック数（1ブロックだけの一致はほぼ全作品に存在する）
+MIN_SIZE = 3
+
+
+def fingerprint_script(blocks, abstracter=None):
+    """スクリプトの各部分木に，内容から決まるハッシュ値（Merkle木）を振る
+    ブロックはオペコードとSUBSTACKの中身のハッシュ値から，ブロックの並び（スクリプト，
+    SUBSTACKの中身）は各ブロックのハッシュ値の並びからハッシュ値を算出する．入力値は無視する．
+
+    Args:
+        blocks(list): AstConverter.get_astで取得したスクリプトのブロックのリスト
+        abstracter(Abstracter, optional): 指定した場合はオペコードを抽象クラスに置き換える.
+
+    Returns:
+        tuple: スクリプト全体のハッシュ値と，断片のハッシュ値 -> ブロック数 の辞書を返す
+    """
+    fragments = {}
+
+    def stack_digest(blocks):
+        digests = []
+        size = 0
+        for block in blocks:
+            digest, block_size = block_digest(block)
+            digests.append(digest)
+            size += block_size
+        digest = __digest(b"S", digests)
+        if blocks:
+            fragments[digest] = size
+        return digest, size
+
+    def block_digest(block):
+        label = block["name"]
+        if abstracter is not None:
+            label = abstracter.get_abstract_class(label)
+        digests = []
+        size = 1
+        for key in SUBSTACK_KEYS:
+            if key in block:
+                digest, stack_size = stack_digest(block[key])
+                digests.append(digest)
+                size += stack_size
+        digest = __digest(b"B" + label.encode("utf-8"), digests)
+        fragments[digest] = size
+        return digest, size
+
+    root, _ = stack_digest(blocks)
+    return root, fragments
+
+
+def __digest(prefix, digests):
+    hash_object = hashlib.blake2b(prefix, digest_size=8)
+    for digest in digests:
+        hash_object.update(b"\0" + digest.to_bytes(8, "little"))
+    return int.from_bytes(hash_object.digest(), "little")
+
+
+class CloneIndex:
+    """スクリプトの断片のハッシュ値から，その断片を含むスクリプトを引く転置インデックス
+
+    (作品ID, スプライト名, スクリプト番号) を1つの場所として登録し，クローンの検索は
+    ペアごとの比較ではなく，ハッシュ値の検索で行う．
+    """
+
+    def __init__(self, abstract=False, min_size=MIN_SIZE):
+        """CloneIndexの初期化
+        Args:
+            abstract(boolean, optional): sim.csvでオペコードを抽象化してからハッシュ値を算出するか.
+            min_size(int, optional): 登録する断片の最小のブロック数.
+        """
+        self.__abstract = abstract
+        self.__abstracter = Abstracter() if abstract else None
+        self.__min_size = min_size
+        # ハッシュ値 -> 場所のリスト
+        self.__postings = defaultdict(list)
+        # ハッシュ値 -> ブロック数
+        self.__sizes = {}
+        # 作品ID -> スクリプトごとの (スプライト名, 断片のハッシュ値のリスト)
+        self.__projects = {}
+
+    def __len__(self):
+        return len(self.__projects)
+
+    def __contains__(self, project_id):
+        return str(project_id) in self.__projects
+
+    def add_project(self, project_id, ast):
+        """作品のASTを登録
+        Args:
+            project_id(int or str): 作品ID
+            ast(dictionary): AstConverter.get_astで取得したAST
+        """
+        project_id = str(project_id)
+        if project_id in self.__projects:
+            self.remove_project(project_id)
+        scripts = []
+        for script_index, script in enumerate(ast["sprites"]):
+            fragments = self.get_fragments(script["blocks"])
+            location = (project_id, script["name"], script_index)
+            for digest, size in fragments.items():
+                self.__postings[digest].append(location)
+                self.__sizes[digest] = size
+            scripts.append((script["name"], list(fragments)))
+        self.__projects[project_id] = scripts
+
+    def remove_project(self, project_id):
+        """作品を削除
+        Args:
+            project_id(int or str): 作品ID
+        """
+        project_id = str(project_id)
+        for _, digests in self.__projects.pop(project_id, []):
+            for digest in digests:
+                # 同じ作品の別のスクリプトで削除済みの場合
+                if digest not in self.__postings:
+                    continue
+                locations = [
+                    location
+                    for location in self.__postings[digest]
+                    if location[0] != project_id
+                ]
+                if locations:
+                    self.__postings[digest] = locations
+                else:
+                    del self.__postings[digest]
+                    del self.__sizes[digest]
+
+    def get_fragments(self, blocks):
+        """スクリプトのうち，登録対象になる断片を取得
+        Args:
+            blocks(list): スクリプトのブロックのリスト
+
+        Returns:
+            dictionary: 断片のハッシュ値 -> ブロック数 を返す
+        """
+        _, fragments = fingerprint_script(blocks, self.__abstracter)
+        return {
+            digest: size
+            for digest, size in fragments.items()
+            if size >= self.__min_size
+        }
+
+    def find_script(self, blocks, exclude_project=None):
+        """スクリプトと断片を共有するスクリプトを検索
+        Args:
+            blocks(list): スクリプトのブロックのリスト
+            exclude_project(int or str, optional): 結果から除く作品ID.
+
+        Returns:
+            list: 共有する最大の断片のブロック数の降順に {"project", "sprite", "script", "size"} を
+                並べたリストを返す．sizeがスクリプトのブロック数と等しいものは完全なクローン
+        """
+        return self.__find(self.get_fragments(blocks), exclude_project)
+
+    def find_project(self, project_id):
+        """登録済みの作品の各スクリプトについて，他の作品のクローンを検索
+        Args:
+            project_id(int or str): 作品ID
+
+        Returns:
+            list: {"sprite", "script", "clones"} のリストを返す．clonesはfind_scriptの結果
+        """
+        results = []
+        for script_index, (sprite, digests) in enumerate(
+            self.__projects.get(str(project_id), [])
+        ):
+            fragments = {digest: self.__sizes[digest] for digest in digests}
+            clones = self.__find(fragments, project_id)
+            if clones:
+                results.append(
+                    {"sprite": sprite, "script": script_index, "clones": clones}
+                )
+        return results
+
+    def save(self, path):
+        """インデックスをJSONに保存
+        Args:
+            path(str): 保存先のパス
+        """
+        data = {
+            "abstract": self.__abstract,
+            "min_size": self.__min_size,
+            "sizes": {
+                format(digest, "x"): size for digest, size in self.__sizes.items()
+            },
+            "projects": {
+                project_id: [
+                    [sprite, [format(digest, "x") for digest in digests]]
+                    for sprite, digests in scripts
+                ]
+                for project_id, scripts in self.__projects.items()
+            },
+        }
+        # 読み込み中のプロセスを壊さないよう，一時ファイルに書いてから置き換える
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(data, f)
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, path):
+        """saveで保存したインデックスを読み込む
+        Args:
+            path(str): 保存したパス
+
+        Returns:
+            CloneIndex: 読み込んだインデックスを返す
+        """
+        with open(path) as f:
+            data = json.load(f)
+        index = cls(abstract=data["abstract"], min_size=data["min_size"])
+        index.__sizes = {
+            int(digest, 16): size for digest, size in data["sizes"].items()
+        }
+        for project_id, scripts in data["projects"].items():
+            index.__projects[project_id] = []
+            for script_index, (sprite, digests) in enumerate(scripts):
+                digests = [int(digest, 16) for digest in digests]
+                for digest in digests:
+                    index.__postings[digest].append((project_id, sprite, script_index))
+                index.__projects[project_id].append((sprite, digests))
+        return index
+
+    def __find(self, fragments, exclude_project):
+        # 場所ごとに，共有する断片のうち最大のブロック数を集計する
+        best = {}
+        exclude_project = None if exclude_project is None else str(exclude_project)
+        for digest, size in fragments.items():
+            for location in self.__postings.get(digest, []):
+                if location[0] != exclude_project and size > best.get(location, 0):
+                    best[location] = size
+        return [
+            {"project": project_id, "sprite": sprite, "script": script, "size": size}
+            for (project_id, sprite, script), size in sorted(
+                best.items(), key=lambda item: (-item[1], item[0])
+            )
+        ]
+
+
+def build_clone_index(json_dir, abstract=False, min_size=MIN_SIZE):
+    """ディレクトリ内の作品JSONからクローンインデックスを作成
+    Args:
+        json_dir(str): 作品JSON（作品ID.json）のディレクトリのパス
+        abstract(boolean, optional): sim.csvでオペコードを抽象化するか.
+        min_size(int, optional): 登録する断片の最小のブロック数.
+
+    Returns:
+        CloneIndex: 作成したインデックスを返す
+    """
+    index = CloneIndex(abstract=abstract, min_size=min_size)
+    for file_name in sorted(os.listdir(json_dir)):
+        project = read_project(os.path.join(json_dir, file_name))
+        if not project or "targets" not in project:
+            continue
+        project_id = os.path.splitext(file_name)[0]
+        index.add_project(project_id, AstConverter(project).get_ast())
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="作品JSONからクローンインデックスを作成する"
+    )
+    parser.add_argument("json_dir")
+    parser.add_argument("out_path")
+    parser.add_argument("--abstract", action="store_true", help="sim.csvで抽象化する")
+    parser.add_argument("--min-size", type=int, default=MIN_SIZE)
+    args = parser.parse_args()
+    index = build_clone_index(args.json_dir, args.abstract, args.min_size)
+    index.save(args.out_path)
+    print(f"{len(index)}件の作品を登録しました．")
+
+
+if __name__ == "__main__":
+    main()
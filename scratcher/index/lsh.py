@@ -0,0 +1,329 @@
+import sys
+
+sys.path.append("../")
+
+import os
+import hashlib
+from collections import defaultdict
+
+import numpy as np
+
+from config.vocabulary import get_vocabulary
+
+# 空のシグネチャに使う値（全てのハッシュ値より大きい）
+MAX_HASH = np.uint64((1 << 64) - 1)
+# n-gramのトークンのハッシュ値をまとめるときに掛ける奇数（FNV-1の64ビット素数）
+NGRAM_PRIME = np.uint64(0x100000001B3)
+
+
+def estimate_jaccard(signature1, signature2):
+    """2つのMinHashシグネチャからJaccard係数を推定
+    Args:
+        signature1(numpy.ndarray): 1つ目のシグネチャ
+        signature2(numpy.ndarray): 2つ目のシグネチャ
+
+    Returns:
+        float: 一致したハッシュ値の割合を返す
+    """
+    return float(np.mean(signature1 == signature2))
+
+
+def is_empty_signature(signature):
+    """シングルのない作品（空の作品など）のシグネチャかを判定
+    Args:
+        signature(numpy.ndarray): MinHasherで作成したシグネチャ
+
+    Returns:
+        boolean: 全てのハッシュ値がMAX_HASHならTrueを返す
+    """
+    return bool(np.all(np.asarray(signature, dtype=np.uint64) == MAX_HASH))
+
+
+def optimal_bands(threshold, num_perm, false_positive_weight=0.5):
+    """閾値に対して，偽陽性と偽陰性の確率が小さくなるバンド数と行数を選ぶ
+    Args:
+        threshold(float): Jaccard係数の閾値
+        num_perm(int): シグネチャの長さ
+        false_positive_weight(float, optional): 偽陽性の重み. 偽陰性の重みは 1 - これ.
+
+    Returns:
+        tuple: (バンド数, 1バンドあたりの行数) を返す
+    """
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        # 類似度sのペアが候補になる確率は 1 - (1 - s^r)^b
+        false_positive = __integrate(
+            lambda s: 1 - (1 - s**rows) ** bands, 0.0, threshold
+        )
+        false_negative = __integrate(lambda s: (1 - s**rows) ** bands, threshold, 1.0)
+        error = (
+            false_positive_weight * false_positive
+            + (1 - false_positive_weight) * false_negative
+        )
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+def __integrate(f, start, end, num=101):
+    # 台形公式による数値積分
+    x = np.linspace(start, end, num)
+    y = f(x)
+    return float(((y[1:] + y[:-1]) / 2 * np.diff(x)).sum())
+
+
+def _hash_opcode(opcode):
+    # オペコード名の64ビットのハッシュ値．語彙のIDと異なり，プロセスや設定ファイルによらず変わらない
+    digest = hashlib.blake2b(str(opcode).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _mix(shingles, seeds):
+    # シングルに乱数を加え，splitmix64の最終段で混ぜる（64ビットの桁あふれを利用する）
+    with np.errstate(over="ignore"):
+        x = shingles[None, :] + seeds[:, None]
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return x ^ (x >> np.uint64(31))
+
+
+class MinHasher:
+    """ソートしたブロック列のオペコードn-gramからMinHashシグネチャを作成するためのクラス"""
+
+    def __init__(self, num_perm=128, ngram=3, seed=1):
+        """MinHasherの初期化
+        Args:
+            num_perm(int, optional): シグネチャの長さ（ハッシュ関数の数）.
+            ngram(int, optional): シングルにするオペコードの連続数.
+            seed(int, optional): ハッシュ関数の乱数シード. 比較するシグネチャは同じシードで作る.
+        """
+        if ngram < 1:
+            raise ValueError("ngram must be positive")
+        self.__ngram = ngram
+        # 語彙のID -> オペコード名のハッシュ値（語彙に追加されたIDの分だけ後から伸ばす）
+        self.__token_hashes = np.empty(0, dtype=np.uint64)
+        rng = np.random.default_rng(seed)
+        # ハッシュ関数ごとに，シングルに加える64ビットの乱数
+        self.__seeds = rng.integers(
+            0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64, endpoint=True
+        )
+
+    def get_num_perm(self):
+        return len(self.__seeds)
+
+    def get_shingles(self, opcodes):
+        """オペコードIDの列からn-gramのシングルを取得
+        シングルはオペコード名のハッシュ値から作るため，別のプロセスで作ったものと比較してよい．
+
+        Args:
+            opcodes(numpy.ndarray): このプロセスの語彙のIDの配列
+
+        Returns:
+            numpy.ndarray: 重複を除いたシングルのuint64の配列を返す
+        """
+        tokens = self.__get_token_hashes()[np.asarray(opcodes, dtype=np.int64)]
+        ngram = min(self.__ngram, len(tokens))
+        if ngram == 0:
+            return np.empty(0, dtype=np.uint64)
+        # n個のハッシュ値を順序を区別して1つの整数にまとめる（64ビットの桁あふれを利用する）
+        count = len(tokens) - ngram + 1
+        shingles = tokens[:count].copy()
+        with np.errstate(over="ignore"):
+            for k in range(1, ngram):
+                shingles = shingles * NGRAM_PRIME + tokens[k : count + k]
+        return np.unique(shingles)
+
+    def get_signature(self, opcodes):
+        """オペコードの列からMinHashシグネチャを作成
+        Args:
+            opcodes(list or numpy.ndarray): オペコードの列，または語彙のIDの配列
+
+        Returns:
+            numpy.ndarray: (num_perm,) のuint64のシグネチャを返す. シングルがない場合は全てMAX_HASH
+        """
+        if not isinstance(opcodes, np.ndarray) or opcodes.dtype.kind not in "iu":
+            opcodes = get_vocabulary().encode(opcodes)
+        shingles = self.get_shingles(opcodes)
+        if len(shingles) == 0:
+            return np.full(len(self.__seeds), MAX_HASH, dtype=np.uint64)
+        return _mix(shingles, self.__seeds).min(axis=1)
+
+    def get_block_signature(self, df):
+        """Sorterでソートしたブロックからシグネチャを作成
+        Args:
+            df(Dataframe): Sorter.sort_blocksで取得したDataframe
+
+        Returns:
+            numpy.ndarray: (num_perm,) のuint64のシグネチャを返す
+        """
+        # 初期状態の行は除き，スクリプトの区切りは残す
+        opcodes = get_vocabulary().encode_blocks(df)[1:]
+        return self.get_signature(opcodes)
+
+    def __get_token_hashes(self):
+        vocabulary = get_vocabulary()
+        if len(self.__token_hashes) < len(vocabulary):
+            added = np.fromiter(
+                (
+                    _hash_opcode(vocabulary.get_opcode(id))
+                    for id in range(len(self.__token_hashes), len(vocabulary))
+                ),
+                dtype=np.uint64,
+            )
+            self.__token_hashes = np.concatenate([self.__token_hashes, added])
+        return self.__token_hashes
+
+
+class LshIndex:
+    """MinHashシグネチャをバンドごとにバケットへ振り分け，類似する作品の候補を取得するためのクラス
+
+    作品は後から追加でき，追加のたびに全体を作り直す必要はない．
+    空のシグネチャは互いに一致してしまうため，バケットに入れず候補にもしない．
+    """
+
+    def __init__(self, threshold=0.5, num_perm=128, bands=None, rows=None):
+        """LshIndexの初期化
+        Args:
+            threshold(float, optional): 候補にしたいJaccard係数の閾値.
+            num_perm(int, optional): シグネチャの長さ.
+            bands(int, optional): バンド数. 指定なしだと閾値から選ぶ.
+            rows(int, optional): 1バンドあたりの行数. 指定なしだと閾値から選ぶ.
+        """
+        if bands is None or rows is None:
+            bands, rows = optimal_bands(threshold, num_perm)
+        if bands * rows > num_perm:
+            raise ValueError("bands * rows must not exceed num_perm")
+        self.__threshold = threshold
+        self.__num_perm = num_perm
+        self.__bands = bands
+        self.__rows = rows
+        self.__buckets = [defaultdict(list) for _ in range(bands)]
+        self.__signatures = {}
+
+    def __len__(self):
+        return len(self.__signatures)
+
+    def __contains__(self, id):
+        return str(id) in self.__signatures
+
+    def get_params(self):
+        return {
+            "threshold": self.__threshold,
+            "num_perm": self.__num_perm,
+            "bands": self.__bands,
+            "rows": self.__rows,
+        }
+
+    def add(self, id, signature):
+        """作品のシグネチャを追加
+        Args:
+            id(int or str): 作品ID
+            signature(numpy.ndarray): MinHasherで作成したシグネチャ
+        """
+        id = str(id)
+        if id in self.__signatures:
+            raise ValueError(f"{id} is already in the index")
+        signature = np.asarray(signature, dtype=np.uint64)
+        self.__signatures[id] = signature
+        if is_empty_signature(signature):
+            return
+        for band, key in enumerate(self.__band_keys(signature)):
+            self.__buckets[band][key].append(id)
+
+    def get_signature(self, id):
+        return self.__signatures.get(str(id))
+
+    def query(self, signature, min_similarity=None):
+        """シグネチャと同じバケットに入る作品を取得
+        Args:
+            signature(numpy.ndarray): クエリのシグネチャ
+            min_similarity(float, optional): 推定Jaccard係数がこれ未満の候補を除く.
+
+        Returns:
+            list: 作品IDのリストを返す. 空のシグネチャでは空のリスト
+        """
+        if is_empty_signature(signature):
+            return []
+        candidates = set()
+        for band, key in enumerate(self.__band_keys(signature)):
+            candidates.update(self.__buckets[band].get(key, []))
+        if min_similarity is not None:
+            candidates = [
+                id
+                for id in candidates
+                if estimate_jaccard(signature, self.__signatures[id]) >= min_similarity
+            ]
+        return sorted(candidates)
+
+    def candidate_pairs(self, min_similarity=None):
+        """同じバケットに入った作品のペアを取得
+        Args:
+            min_similarity(float, optional): 推定Jaccard係数がこれ未満のペアを除く.
+                Noneの場合は閾値，0の場合は全ての候補を返す.
+
+        Returns:
+            list: (作品ID1, 作品ID2, 推定Jaccard係数) のリストを返す
+        """
+        if min_similarity is None:
+            min_similarity = self.__threshold
+        pairs = set()
+        for buckets in self.__buckets:
+            for ids in buckets.values():
+                for i in range(len(ids)):
+                    for j in range(i + 1, len(ids)):
+                        pairs.add((min(ids[i], ids[j]), max(ids[i], ids[j])))
+        results = []
+        for id1, id2 in sorted(pairs):
+            similarity = estimate_jaccard(
+                self.__signatures[id1], self.__signatures[id2]
+            )
+            if similarity >= min_similarity:
+                results.append((id1, id2, similarity))
+        return results
+
+    def save(self, path):
+        """シグネチャと設定をnpzで保存（バケットは読み込み時に作り直す）
+        Args:
+            path(str): 保存先のパス（.npz）
+        """
+        ids = list(self.__signatures)
+        signatures = (
+            np.vstack([self.__signatures[id] for id in ids])
+            if ids
+            else np.empty((0, self.__num_perm), dtype=np.uint64)
+        )
+        # 読み込み中のプロセスを壊さないよう，一時ファイルに書いてから置き換える
+        with open(f"{path}.tmp", "wb") as f:
+            np.savez(
+                f,
+                ids=np.array(ids, dtype=np.str_),
+                signatures=signatures,
+                params=np.array(
+                    [self.__threshold, self.__num_perm, self.__bands, self.__rows]
+                ),
+            )
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, path):
+        """saveで保存したインデックスを読み込む
+        Args:
+            path(str): 保存したパス
+
+        Returns:
+            LshIndex: 読み込んだインデックスを返す
+        """
+        with np.load(path) as data:
+            threshold, num_perm, bands, rows = data["params"].tolist()
+            index = cls(threshold, int(num_perm), int(bands), int(rows))
+            for id, signature in zip(data["ids"].tolist(), data["signatures"]):
+                index.add(id, signature)
+        return index
+
+    def __band_keys(self, signature):
+        for band in range(self.__bands):
+            start = band * self.__rows
+            yield signature[start : start + self.__rows].tobytes()
@@ -0,0 +1,361 @@
+import sys
+
+sys.path.append("../")
+
+import os
+import re
+import bisect
+import argparse
+
+import numpy as np
+
+from utils import read_project, parallel_map
+
+TERMS_FILE = "terms.npy"
+OFFSETS_FILE = "offsets.npy"
+POSTINGS_FILE = "postings.npy"
+IDS_FILE = "ids.npy"
+SUBSTACK_KEYS = ["SUBSTACK", "SUBSTACK2"]
+# n-gramのオペコードを区切る文字（クエリでは "a b" のように引用符で囲む）
+NGRAM_SEPARATOR = " "
+
+
+def encode_varint(values):
+    """0以上の整数の配列を可変長バイト列（LEB128）に変換
+    Args:
+        values(array-like): 0以上の整数の配列
+
+    Returns:
+        numpy.ndarray: uint8の配列を返す
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    if len(values) == 0:
+        return np.empty(0, dtype=np.uint8)
+    # 値ごとに必要なバイト数（7ビットずつ）
+    lengths = np.ones(len(values), dtype=np.int64)
+    rest = values >> np.uint64(7)
+    while rest.any():
+        lengths += rest > 0
+        rest >>= np.uint64(7)
+    shifts = np.arange(lengths.max(), dtype=np.uint64) * np.uint64(7)
+    chunks = ((values[:, None] >> shifts[None, :]) & np.uint64(0x7F)).astype(np.uint8)
+    # 最後のバイト以外は継続ビットを立てる
+    positions = np.arange(len(shifts))[None, :]
+    chunks[positions < lengths[:, None] - 1] |= 0x80
+    return chunks[positions < lengths[:, None]]
+
+
+def decode_varint(data):
+    """encode_varintで変換したバイト列を整数の配列に戻す
+    Args:
+        data(numpy.ndarray): uint8の配列
+
+    Returns:
+        numpy.ndarray: int64の配列を返す
+    """
+    data = np.asarray(data, dtype=np.uint8)
+    if len(data) == 0:
+        return np.empty(0, dtype=np.int64)
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    # 各バイトの値の中での位置
+    positions = np.arange(len(data)) - np.repeat(starts, ends - starts + 1)
+    parts = (data & 0x7F).astype(np.int64) << (7 * positions)
+    return np.add.reduceat(parts, starts)
+
+
+def get_project_terms(project, max_n=2):
+    """作品JSONから，オペコードとオペコードn-gramの集合を取得
+    n-gramはスクリプトごとに，SUBSTACKの中身を展開したブロックの並び（先行順）から作る．
+
+    Args:
+        project(dictionary): 作品のJSON
+        max_n(int, optional): n-gramの最大のn.
+
+    Returns:
+        set: 単語（オペコード，または空白区切りのn-gram）の集合を返す
+    """
+    terms = set()
+    for target in project.get("targets", []):
+        blocks = target["blocks"]
+        for block_id, block in blocks.items():
+            # 変数などのトップレベルのレポーターはリストで保存されているため除く
+            if not isinstance(block, dict) or not block.get("topLevel"):
+                continue
+            sequence = __get_sequence(blocks, block_id)
+            for n in range(1, max_n + 1):
+                for i in range(len(sequence) - n + 1):
+                    terms.add(NGRAM_SEPARATOR.join(sequence[i : i + n]))
+    return terms
+
+
+def __get_sequence(blocks, block_id):
+    # スクリプトのブロックを，SUBSTACKの中身を展開しながら先行順に並べる．
+    # 壊れた作品のnextやSUBSTACKが循環していても止まるよう，1度並べたブロックは飛ばす
+    sequence = []
+    visited = set()
+    stack = [block_id]
+    while stack:
+        block_id = stack.pop()
+        if block_id in visited:
+            continue
+        visited.add(block_id)
+        block = blocks[block_id]
+        sequence.append(block["opcode"])
+        inputs = block.get("inputs") or {}
+        bodies = []
+        for key in SUBSTACK_KEYS:
+            if key in inputs and isinstance(inputs[key][1], str):
+                bodies.append(inputs[key][1])
+        # 次のブロックは，SUBSTACKの中身の後に処理する
+        if isinstance(block.get("next"), str) and block["next"] in blocks:
+            stack.append(block["next"])
+        for body in reversed(bodies):
+            if body in blocks:
+                stack.append(body)
+    return sequence
+
+
+def _read_terms(args):
+    path, max_n = args
+    project = read_project(path)
+    if not project or "targets" not in project:
+        return None
+    return get_project_terms(project, max_n)
+
+
+def build_ngram_index(json_dir, out_path, max_n=2, workers=None):
+    """ディレクトリ内の作品JSONから，オペコードn-gramの転置インデックスを作成
+    各単語の出現する作品の番号（昇順）を差分にし，可変長バイト列で保存する．
+
+    Args:
+        json_dir(str): 作品JSON（作品ID.json）のディレクトリのパス
+        out_path(str): 保存先のディレクトリのパス
+        max_n(int, optional): n-gramの最大のn.
+        workers(int, optional): JSONを読み込むプロセス数. 0だと並列化しない.
+
+    Returns:
+        int: 登録した作品の数を返す
+    """
+    file_names = sorted(os.listdir(json_dir))
+    tasks = [(os.path.join(json_dir, file_name), max_n) for file_name in file_names]
+    results = parallel_map(
+        _read_terms, tasks, backend="process", workers=workers, chunksize=64
+    )
+    postings, ids = __collect(file_names, results)
+
+    terms = sorted(postings)
+    encoded = []
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    for i, term in enumerate(terms):
+        docs = np.asarray(postings[term], dtype=np.int64)
+        encoded.append(encode_varint(np.diff(docs, prepend=0)))
+        offsets[i + 1] = offsets[i] + len(encoded[-1])
+
+    os.makedirs(out_path, exist_ok=True)
+    arrays = {
+        TERMS_FILE: np.array(terms, dtype=np.str_),
+        OFFSETS_FILE: offsets,
+        POSTINGS_FILE: (
+            np.concatenate(encoded) if encoded else np.empty(0, dtype=np.uint8)
+        ),
+        IDS_FILE: np.array(ids, dtype=np.str_),
+    }
+    # 読み込み中のプロセスを壊さないよう，一時ファイルに書いてから置き換える
+    for file_name, array in arrays.items():
+        path = os.path.join(out_path, file_name)
+        with open(f"{path}.tmp", "wb") as f:
+            np.save(f, array)
+        os.replace(f"{path}.tmp", path)
+    return len(ids)
+
+
+def __collect(file_names, results):
+    # 作品の番号は読み込み順に振るため，各単語の作品の番号は昇順になる
+    postings = {}
+    ids = []
+    for file_name, terms in zip(file_names, results):
+        if terms is None:
+            continue
+        for term in terms:
+            postings.setdefault(term, []).append(len(ids))
+        ids.append(os.path.splitext(file_name)[0])
+    return postings, ids
+
+
+class NgramIndex:
+    """オペコードn-gramの転置インデックスを読み込み，ブール検索を行うためのクラス
+
+    クエリは AND，OR，NOT，括弧，前方一致（sensing_*），引用符で囲んだn-gram（"a b"）を使える．
+    並べた単語はANDとして扱う．
+    """
+
+    __TOKEN = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|([^\s()"]+))')
+
+    def __init__(self, dir_path):
+        """NgramIndexの初期化
+        Args:
+            dir_path(str): build_ngram_indexで保存したディレクトリのパス
+        """
+        self.__terms = np.load(os.path.join(dir_path, TERMS_FILE)).tolist()
+        self.__offsets = np.load(os.path.join(dir_path, OFFSETS_FILE))
+        self.__postings = np.load(os.path.join(dir_path, POSTINGS_FILE), mmap_mode="r")
+        self.__ids = np.load(os.path.join(dir_path, IDS_FILE))
+        self.__term_index = {term: i for i, term in enumerate(self.__terms)}
+
+    def __len__(self):
+        return len(self.__ids)
+
+    def get_ids(self):
+        """登録されている作品IDを取得
+        Returns:
+            numpy.ndarray: 作品の番号順に並べた作品IDの配列を返す
+        """
+        return self.__ids
+
+    def get_terms(self, prefix=""):
+        """前方一致する単語を取得
+        Args:
+            prefix(str, optional): 単語の先頭の文字列.
+
+        Returns:
+            list: 昇順に並べた単語のリストを返す
+        """
+        start = bisect.bisect_left(self.__terms, prefix)
+        end = start
+        while end < len(self.__terms) and self.__terms[end].startswith(prefix):
+            end += 1
+        return self.__terms[start:end]
+
+    def get_postings(self, term):
+        """単語の出現する作品の番号を取得
+        Args:
+            term(str): オペコード，または空白区切りのn-gram. 末尾の * は前方一致.
+
+        Returns:
+            numpy.ndarray: 昇順に並べた作品の番号を返す
+        """
+        if term.endswith("*"):
+            prefix = term[:-1]
+            # 単語の前方一致では，その単語から始まるn-gramは含めなくても結果は同じ
+            docs = [
+                self.get_postings(t)
+                for t in self.get_terms(prefix)
+                if NGRAM_SEPARATOR in prefix or NGRAM_SEPARATOR not in t
+            ]
+            return (
+                np.unique(np.concatenate(docs)) if docs else np.empty(0, dtype=np.int64)
+            )
+        i = self.__term_index.get(term)
+        if i is None:
+            return np.empty(0, dtype=np.int64)
+        data = self.__postings[self.__offsets[i] : self.__offsets[i + 1]]
+        return np.cumsum(decode_varint(data))
+
+    def query(self, expression):
+        """ブール式に一致する作品を検索
+        Args:
+            expression(str): 例 'control_forever AND motion_movesteps AND NOT sensing_*'
+
+        Returns:
+            numpy.ndarray: 一致した作品IDの配列を返す
+        """
+        return self.__ids[self.query_docs(expression)]
+
+    def query_docs(self, expression):
+        """ブール式に一致する作品の番号を検索
+        Args:
+            expression(str): クエリのブール式
+
+        Returns:
+            numpy.ndarray: 昇順に並べた作品の番号を返す
+        """
+        tokens = self.__tokenize(expression)
+        docs, position = self.__parse_or(tokens, 0)
+        if position != len(tokens):
+            raise ValueError(f"unexpected token: {tokens[position][1]}")
+        return docs
+
+    def __tokenize(self, expression):
+        tokens = []
+        expression = expression.strip()
+        position = 0
+        while position < len(expression):
+            match = self.__TOKEN.match(expression, position)
+            if not match or match.end() == position:
+                raise ValueError(f"invalid query: {expression}")
+            position = match.end()
+            open_, close, quoted, word = match.groups()
+            if open_:
+                tokens.append(("(", open_))
+            elif close:
+                tokens.append((")", close))
+            elif quoted is not None:
+                tokens.append(("TERM", NGRAM_SEPARATOR.join(quoted.split())))
+            elif word.upper() in ["AND", "OR", "NOT"]:
+                tokens.append((word.upper(), word))
+            else:
+                tokens.append(("TERM", word))
+        return tokens
+
+    def __parse_or(self, tokens, position):
+        docs, position = self.__parse_and(tokens, position)
+        while position < len(tokens) and tokens[position][0] == "OR":
+            right, position = self.__parse_and(tokens, position + 1)
+            docs = np.union1d(docs, right)
+        return docs, position
+
+    def __parse_and(self, tokens, position):
+        docs, position = self.__parse_not(tokens, position)
+        while position < len(tokens) and tokens[position][0] not in ["OR", ")"]:
+            if tokens[position][0] == "AND":
+                position += 1
+            right, position = self.__parse_not(tokens, position)
+            docs = np.intersect1d(docs, right, assume_unique=True)
+        return docs, position
+
+    def __parse_not(self, tokens, position):
+        if position < len(tokens) and tokens[position][0] == "NOT":
+            docs, position = self.__parse_not(tokens, position + 1)
+            return (
+                np.setdiff1d(np.arange(len(self)), docs, assume_unique=True),
+                position,
+            )
+        return self.__parse_atom(tokens, position)
+
+    def __parse_atom(self, tokens, position):
+        if position >= len(tokens):
+            raise ValueError("unexpected end of query")
+        kind, value = tokens[position]
+        if kind == "(":
+            docs, position = self.__parse_or(tokens, position + 1)
+            if position >= len(tokens) or tokens[position][0] != ")":
+                raise ValueError("missing )")
+            return docs, position + 1
+        if kind != "TERM":
+            raise ValueError(f"unexpected token: {value}")
+        return self.get_postings(value), position + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="オペコードn-gramの転置インデックスを作成・検索する"
+    )
+    parser.add_argument("index_path")
+    parser.add_argument(
+        "--build", metavar="JSON_DIR", help="作品JSONのディレクトリから作成する"
+    )
+    parser.add_argument("--max-n", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--query", help="例: 'control_forever AND NOT sensing_*'")
+    args = parser.parse_args()
+    if args.build:
+        count = build_ngram_index(args.build, args.index_path, args.max_n, args.workers)
+        print(f"{count}件の作品を登録しました．")
+    if args.query:
+        for id in NgramIndex(args.index_path).query(args.query):
+            print(id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+from .runner import Stage, Pipeline, IO, CPU
+from .stages import (
+    build_pipeline,
+    fetch_project,
+    filter_project,
+    sort_project,
+    track_project,
+    compare_trajectory,
+    read_project_ids,
+)
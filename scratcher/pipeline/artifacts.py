@@ -0,0 +1,196 @@
+import sys
+
+sys.path.append("../")
+
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+
+import pandas as pd
+
+from utils import generate_file_hash, read_project
+
+
+def get_input_hash(version, input_hashes):
+    """ステージの成果物を決める入力のハッシュ値を算出
+    Args:
+        version(str): ステージのコード・設定のバージョン
+        input_hashes(list): 入力（前のステージの成果物や元ファイル）のハッシュ値
+
+    Returns:
+        str: ハッシュ値を返す
+    """
+    data = json.dumps([version, input_hashes], sort_keys=True)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def get_version(**params):
+    """コードのバージョンと設定値をステージのバージョンの文字列に変換
+    Args:
+        params: バージョン番号や成果物に影響する設定値
+
+    Returns:
+        str: バージョンを表す文字列を返す
+    """
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+class ArtifactManifest:
+    """作品・ステージごとに，成果物を作ったときの入力のハッシュ値を記録するためのクラス
+
+    入力のハッシュ値が変わっていない成果物は作り直さずに使い回す．
+    複数スレッドから同じインスタンスを使ってもよい．
+    """
+
+    def __init__(self, path):
+        """ArtifactManifestの初期化
+        Args:
+            path(str): SQLiteファイルのパス
+        """
+        self.__lock = threading.Lock()
+        self.__conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.__conn.execute("PRAGMA journal_mode=WAL")
+        self.__conn.execute("PRAGMA synchronous=NORMAL")
+        self.__conn.execute("""CREATE TABLE IF NOT EXISTS artifacts (
+                stage TEXT NOT NULL,
+                project_id TEXT NOT NULL,
+                input_hash TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (stage, project_id)
+            ) WITHOUT ROWID""")
+        self.__conn.execute("""CREATE TABLE IF NOT EXISTS files (
+                path TEXT NOT NULL PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                hash TEXT NOT NULL
+            ) WITHOUT ROWID""")
+        self.__conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """SQLiteとの接続を閉じる"""
+        with self.__lock:
+            self.__conn.close()
+
+    def get(self, stage, project_id):
+        """記録されている成果物の情報を取得
+        Args:
+            stage(str): ステージ名
+            project_id(int or str): 作品ID
+
+        Returns:
+            tuple: (入力のハッシュ値, 記録した値) を返す．記録がない場合はNone
+        """
+        with self.__lock:
+            row = self.__conn.execute(
+                "SELECT input_hash, value FROM artifacts WHERE stage = ? AND project_id = ?",
+                (stage, str(project_id)),
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def put(self, stage, project_id, input_hash, value):
+        """成果物の情報を記録
+        Args:
+            stage(str): ステージ名
+            project_id(int or str): 作品ID
+            input_hash(str): get_input_hashで算出したハッシュ値
+            value(object): JSONに変換できる値. 除かれた作品はNone
+        """
+        row = (stage, str(project_id), input_hash, json.dumps(value, default=float))
+        with self.__lock:
+            with self.__conn:
+                self.__conn.execute(
+                    "INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?)", row
+                )
+
+    def get_file_hash(self, path):
+        """ファイルの内容のハッシュ値を取得
+        サイズと更新日時が記録時と同じ場合は，ファイルを読まずに記録したハッシュ値を返す．
+
+        Args:
+            path(str): ファイルのパス
+
+        Returns:
+            str: ハッシュ値を返す．ファイルが存在しない場合はNone
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        with self.__lock:
+            row = self.__conn.execute(
+                "SELECT size, mtime_ns, hash FROM files WHERE path = ?", (path,)
+            ).fetchone()
+        if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+        file_hash = generate_file_hash(path)
+        with self.__lock:
+            with self.__conn:
+                self.__conn.execute(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                    (path, stat.st_size, stat.st_mtime_ns, file_hash),
+                )
+        return file_hash
+
+
+class FileArtifact:
+    """作品ごとに1つのファイルとして保存される成果物
+
+    ファイルはステージの関数が保存し，このクラスは存在の確認と読み込みを行う．
+    """
+
+    def __init__(self, dir_path, extension, loader):
+        """FileArtifactの初期化
+        Args:
+            dir_path(str): 成果物のディレクトリのパス
+            extension(str): 拡張子（.csvなど）
+            loader(function): ファイルのパスを受け取り，成果物を返す関数
+        """
+        self.__dir_path = dir_path
+        self.__extension = extension
+        self.__loader = loader
+
+    def get_path(self, project_id):
+        return os.path.join(self.__dir_path, f"{project_id}{self.__extension}")
+
+    def exists(self, project_id):
+        return os.path.isfile(self.get_path(project_id))
+
+    def load(self, project_id):
+        return self.__loader(self.get_path(project_id))
+
+
+def load_sorted_csv(path):
+    """Sorter.to_csvで保存したCSVを読み込む
+    Returns:
+        Dataframe: Sorter.sort_blocksと同じ列のDataframeを返す
+    """
+    return pd.read_csv(path, index_col=0)
+
+
+def load_tracked_csv(path):
+    """Tracker.to_csvで保存したCSVから座標データを読み込む
+    Returns:
+        numpy.ndarray: (データ数, 2) の座標データを返す
+    """
+    return pd.read_csv(path, usecols=["x", "y"]).to_numpy(dtype=float)
+
+
+def json_artifact(dir_path):
+    """作品JSONのディレクトリを成果物として扱う
+    Args:
+        dir_path(str): 作品JSONのディレクトリのパス
+
+    Returns:
+        FileArtifact: read_projectで読み込む成果物を返す
+    """
+    return FileArtifact(dir_path, ".json", read_project)
@@ -0,0 +1,361 @@
+import queue
+import threading
+import traceback
+from functools import partial
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from .artifacts import get_input_hash
+
+# 通信や待機が中心のステージ（スレッドで実行）と，計算が中心のステージ（プロセスで実行）
+IO = "io"
+CPU = "cpu"
+KINDS = [IO, CPU]
+# ステージ間のキューの終端を表す値
+_END = None
+
+
+class Stage:
+    """作品IDごとに実行するパイプラインのステージ
+
+    funcは (作品ID, inputsで指定したステージの結果...) を受け取り，結果を返す．
+    Noneを返した作品は以降のステージに渡さない（フィルタリングなど）．
+    CPUステージのfuncと引数はプロセスに渡すため，pickleできる必要がある
+    （モジュールの関数やfunctools.partialを使う）．
+
+    versionを指定したステージは，マニフェストを使う実行で入力のハッシュ値が変わった作品のみ
+    計算し直す．artifactを指定しない場合，結果はJSONに変換してマニフェストに保存する．
+    例外を送出した作品はエラーとして扱い，マニフェストには記録しない（次回も計算する）．
+    cache=Falseのステージは，後のステージが計算し直す作品でのみ計算する．
+    """
+
+    def __init__(
+        self,
+        name,
+        func,
+        inputs=(),
+        kind=IO,
+        workers=1,
+        after=(),
+        version=None,
+        artifact=None,
+        source=None,
+        cache=True,
+    ):
+        """Stageの初期化
+        Args:
+            name(str): ステージ名
+            func(function): 作品IDと入力を受け取り，結果を返す関数
+            inputs(list, optional): 結果を入力として受け取るステージ名.
+            kind(str, optional): io（スレッドで実行）かcpu（プロセスプールで実行）.
+            workers(int, optional): 同時に処理する作品の数.
+            after(list, optional): 結果は受け取らないが，先に実行するステージ名.
+            version(str, optional): コード・設定のバージョン. 指定なしだと毎回計算する.
+            artifact(FileArtifact, optional): funcが保存する成果物. 再利用時はここから読み込む.
+            source(function, optional): 入力のないステージで，作品IDから元データのハッシュ値を返す関数.
+            cache(boolean, optional): Falseの場合は結果を記録せず，versionから求めた入力のハッシュ値だけを
+                後のステージに渡す．結果は後のステージが計算し直す場合にのみ計算する
+                （結果をJSONにできず，成果物もないステージ向け）.
+        """
+        if kind not in KINDS:
+            raise ValueError(f"kind must be one of {KINDS}")
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.after = list(after)
+        self.version = version
+        self.artifact = artifact
+        self.source = source
+        self.cache = cache
+
+
+class _Lazy:
+    # 再利用した成果物の読み込みや記録しないステージの計算は，後のステージで必要になるまで行わない
+    def __init__(self, load):
+        self.__load = load
+        self.__lock = threading.Lock()
+        self.__loaded = False
+        self.__value = None
+
+    def get(self):
+        with self.__lock:
+            if not self.__loaded:
+                self.__value = self.__load()
+                self.__loaded = True
+        return self.__value
+
+
+def _resolve(value):
+    return value.get() if isinstance(value, _Lazy) else value
+
+
+class Pipeline:
+    """ステージの依存関係（DAG）に従って，作品IDごとに処理を流すためのクラス
+
+    ステージは依存関係を満たす順（トポロジカル順）に並べ，ステージ間を上限付きのキューでつなぐ．
+    各作品は前のステージの結果を持って次のステージに進むため，取得と計算が重なって実行される．
+    CPUステージは1つのプロセスプールを共有する．
+    マニフェストを指定した場合は，入力のハッシュ値が変わっていない成果物を再利用する．
+    """
+
+    def __init__(self, stages, queue_size=64, processes=None, keep=None, manifest=None):
+        """Pipelineの初期化
+        Args:
+            stages(list): Stageのリスト
+            queue_size(int, optional): ステージ間のキューに溜める作品の上限.
+            processes(int, optional): CPUステージのプロセス数. 指定なしだとCPU数.
+            keep(list, optional): on_resultに渡す結果のステージ名. 指定なしだと最後のステージ.
+            manifest(ArtifactManifest, optional): 成果物の入力のハッシュ値を記録するマニフェスト.
+        """
+        self.__stages = self.__sort_stages(stages)
+        self.__queue_size = queue_size
+        self.__processes = processes
+        self.__manifest = manifest
+        if keep is None:
+            keep = [self.__stages[-1].name]
+        self.__keep = list(keep)
+        # 各ステージの後に残す結果（後のステージの入力とkeep）．不要な結果は次に渡さない
+        needed = set(keep)
+        self.__needed = []
+        for stage in reversed(self.__stages):
+            self.__needed.append(frozenset(needed))
+            needed |= set(stage.inputs)
+        self.__needed.reverse()
+
+    def get_stages(self):
+        """実行順に並べたステージ名を取得
+        Returns:
+            list: ステージ名のリストを返す
+        """
+        return [stage.name for stage in self.__stages]
+
+    def run(self, project_ids, on_result=None):
+        """作品IDを流してパイプラインを実行
+        Args:
+            project_ids(iterable): 作品IDの列（ジェネレータでもよい）
+            on_result(function, optional): 全ステージを通過した作品ごとに
+                (作品ID, ステージ名 -> 結果の辞書) を受け取る関数.
+
+        Returns:
+            dictionary: completed（全ステージを通過した作品数），dropped（ステージ名 -> Noneで
+                除かれた作品数），computed・reused（ステージ名 -> 計算した・再利用した作品数），
+                errors（(作品ID, ステージ名, エラー内容) のリスト）を返す．
+                後のステージが再利用したため計算しなかったcache=Falseのステージは，どちらにも数えない
+        """
+        summary = {
+            "completed": 0,
+            "dropped": Counter(),
+            "computed": Counter(),
+            "reused": Counter(),
+            "errors": [],
+        }
+        lock = threading.Lock()
+        queues = [queue.Queue(self.__queue_size) for _ in range(len(self.__stages) + 1)]
+        executor = None
+        if any(stage.kind == CPU for stage in self.__stages):
+            # 作品ごとにステージのスレッドから投入するため，parallel_mapではなく1つのプールを共有する
+            executor = ProcessPoolExecutor(max_workers=self.__processes)
+
+        threads = []
+        for i, stage in enumerate(self.__stages):
+            # 次のステージ（最後は集計）のワーカー数だけ終端を流す
+            downstream = (
+                self.__stages[i + 1].workers if i + 1 < len(self.__stages) else 1
+            )
+            remaining = [stage.workers]
+            for _ in range(stage.workers):
+                thread = threading.Thread(
+                    target=self.__work,
+                    args=(
+                        stage,
+                        self.__needed[i],
+                        queues[i],
+                        queues[i + 1],
+                        executor,
+                        summary,
+                        lock,
+                        remaining,
+                        downstream,
+                    ),
+                    daemon=True,
+                )
+                thread.start()
+                threads.append(thread)
+
+        collector = threading.Thread(
+            target=self.__collect, args=(queues[-1], summary, on_result), daemon=True
+        )
+        collector.start()
+        try:
+            for project_id in project_ids:
+                queues[0].put((project_id, {}, {}))
+            for _ in range(self.__stages[0].workers):
+                queues[0].put(_END)
+            for thread in threads:
+                thread.join()
+            collector.join()
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return summary
+
+    def __work(
+        self,
+        stage,
+        needed,
+        in_queue,
+        out_queue,
+        executor,
+        summary,
+        lock,
+        remaining,
+        downstream,
+    ):
+        while True:
+            item = in_queue.get()
+            if item is _END:
+                break
+            project_id, results, hashes = item
+            try:
+                input_hash = self.__get_input_hash(stage, project_id, hashes)
+                reused, result = self.__reuse(stage, project_id, input_hash)
+                if not reused and not stage.cache and input_hash is not None:
+                    # 後のステージが入力のハッシュ値から再利用できる場合は計算しない
+                    result = _Lazy(
+                        partial(
+                            self.__compute_deferred,
+                            stage,
+                            project_id,
+                            results,
+                            executor,
+                            summary,
+                            lock,
+                        )
+                    )
+                elif not reused:
+                    result = self.__compute(stage, project_id, results, executor)
+                    if input_hash is None and stage.source is not None:
+                        # 取得して初めて元データができた場合
+                        input_hash = self.__get_input_hash(stage, project_id, hashes)
+                    if input_hash is not None and stage.cache:
+                        self.__record(stage, project_id, input_hash, result)
+            except Exception:
+                with lock:
+                    summary["errors"].append(
+                        (project_id, stage.name, traceback.format_exc(limit=1))
+                    )
+                continue
+            with lock:
+                if not isinstance(result, _Lazy) or reused:
+                    summary["reused" if reused else "computed"][stage.name] += 1
+                if result is None:
+                    summary["dropped"][stage.name] += 1
+            if result is None:
+                continue
+            results[stage.name] = result
+            hashes[stage.name] = input_hash
+            results = {name: results[name] for name in needed if name in results}
+            out_queue.put((project_id, results, hashes))
+
+        with lock:
+            remaining[0] -= 1
+            is_last = remaining[0] == 0
+        # ステージの最後のワーカーが，次のステージに終端を伝える
+        if is_last:
+            for _ in range(downstream):
+                out_queue.put(_END)
+
+    def __get_input_hash(self, stage, project_id, hashes):
+        # バージョンと入力のハッシュ値から，成果物を決めるハッシュ値を算出する
+        if self.__manifest is None or stage.version is None:
+            return None
+        if stage.inputs:
+            input_hashes = [hashes.get(name) for name in stage.inputs]
+        elif stage.source is not None:
+            input_hashes = [stage.source(project_id)]
+        else:
+            return None
+        if any(value is None for value in input_hashes):
+            return None
+        return get_input_hash(stage.version, input_hashes)
+
+    def __reuse(self, stage, project_id, input_hash):
+        if input_hash is None or not stage.cache:
+            return False, None
+        entry = self.__manifest.get(stage.name, project_id)
+        if entry is None or entry[0] != input_hash:
+            return False, None
+        value = entry[1]
+        if stage.artifact is None or value is None:
+            return True, value
+        if not stage.artifact.exists(project_id):
+            return False, None
+        return True, _Lazy(partial(stage.artifact.load, project_id))
+
+    def __compute(self, stage, project_id, results, executor):
+        args = [_resolve(results[name]) for name in stage.inputs]
+        if any(arg is None for arg in args):
+            # 計算を遅らせたステージがNoneを返した作品は，ここで除く
+            return None
+        if stage.kind == CPU:
+            return executor.submit(stage.func, project_id, *args).result()
+        return stage.func(project_id, *args)
+
+    def __compute_deferred(self, stage, project_id, results, executor, summary, lock):
+        # 後のステージが入力として使うときに，そのスレッドで計算する（例外は後のステージのエラーになる）
+        result = self.__compute(stage, project_id, results, executor)
+        with lock:
+            summary["computed"][stage.name] += 1
+        return result
+
+    def __record(self, stage, project_id, input_hash, result):
+        # 成果物がファイルの場合は，作成済みであることだけを記録する
+        if result is not None and stage.artifact is not None:
+            result = True
+        self.__manifest.put(stage.name, project_id, input_hash, result)
+
+    def __collect(self, in_queue, summary, on_result):
+        while True:
+            item = in_queue.get()
+            if item is _END:
+                return
+            summary["completed"] += 1
+            if on_result is not None:
+                project_id, results, _ = item
+                on_result(
+                    project_id,
+                    {
+                        name: _resolve(results[name])
+                        for name in self.__keep
+                        if name in results
+                    },
+                )
+
+    def __sort_stages(self, stages):
+        # 入力のステージが先に来るように並べる（同じ深さでは指定順）
+        names = [stage.name for stage in stages]
+        if len(set(names)) != len(names):
+            raise ValueError("stage names must be unique")
+        pending = list(stages)
+        ordered = []
+        done = set()
+        while pending:
+            ready = [
+                stage
+                for stage in pending
+                if all(name in done for name in stage.inputs + stage.after)
+            ]
+            if not ready:
+                missing = {
+                    name for stage in pending for name in stage.inputs + stage.after
+                } - set(names)
+                if missing:
+                    raise ValueError(f"unknown input stages: {sorted(missing)}")
+                raise ValueError("stages have a cycle")
+            for stage in ready:
+                ordered.append(stage)
+                done.add(stage.name)
+                pending.remove(stage)
+        return ordered
@@ -0,0 +1,311 @@
+import sys
+
+sys.path.append("../")
+
+import os
+import csv
+import hashlib
+import argparse
+from functools import partial
+
+import pandas as pd
+
+from api import scratch_client
+from config import constants
+from dtw.core import NORMALIZATION_VERSION
+from dtw.query import DtwQuery
+from tools import Sorter, Tracker, get_block_filter
+from tools.sorter import SORT_VERSION
+from tools.tracker import TRACK_VERSION
+from utils import (
+    json_to_file,
+    read_project,
+    select_project_keys,
+    generate_file_hash,
+    remove_extension,
+)
+from .runner import Stage, Pipeline, CPU
+from .artifacts import (
+    ArtifactManifest,
+    FileArtifact,
+    get_version,
+    json_artifact,
+    load_sorted_csv,
+    load_tracked_csv,
+)
+
+
+def fetch_project(project_id, json_dir=None):
+    """作品のJSONを取得（json_dirに保存済みの場合はそれを読み込む）
+    Args:
+        project_id(int or str): 作品ID
+        json_dir(str, optional): 取得したJSONを保存するディレクトリのパス.
+
+    Returns:
+        dictionary: パイプラインで使うキーだけを持つ作品のJSONを返す．取得できない場合はNone
+    """
+    path = os.path.join(json_dir, f"{project_id}.json") if json_dir else None
+    if path and os.path.isfile(path):
+        project = read_project(path)
+    else:
+        project = scratch_client.get_project(project_id)
+        if project and path:
+            json_to_file(project, path)
+        project = select_project_keys(project)
+    if not project or "targets" not in project:
+        return None
+    return project
+
+
+def filter_project(project_id, project, filter_path=constants.FILTER_CSV_PATH):
+    """使用不可のブロックを含む作品を除く
+    Returns:
+        boolean: 通過した場合はTrue，除く場合はNoneを返す
+    """
+    return True if get_block_filter(filter_path).is_dataset(project) else None
+
+
+def sort_project(project_id, project, sorted_dir=None):
+    """ブロックを命令処理順にソート
+    Returns:
+        Dataframe: Sorter.sort_blocksの結果を返す
+    """
+    sorter = Sorter(project)
+    df = sorter.sort_blocks()
+    if sorted_dir:
+        sorter.to_csv(os.path.join(sorted_dir, f"{project_id}.csv"))
+    return df
+
+
+def track_project(project_id, sorted_df, tracked_dir=None):
+    """ソートしたブロックから動作軌跡を算出
+    Returns:
+        numpy.ndarray: (データ数, 2) の座標データを返す．動作しない作品はNone
+    """
+    tracker = Tracker(sorted_df)
+    df = tracker.get_coordinate()
+    if df is None:
+        # Trackerは失敗するとNoneを返すため，動作しない作品と区別してエラーにする（記録されない）
+        raise RuntimeError(f"failed to track project {project_id}")
+    if len(df.index) == 0:
+        return None
+    if tracked_dir:
+        tracker.to_csv(os.path.join(tracked_dir, f"{project_id}.csv"))
+    return df[["x", "y"]].to_numpy(dtype=float)
+
+
+def compare_trajectory(project_id, trajectory, query=None):
+    """クエリの軌跡とのDTW距離を算出
+    Args:
+        query(DtwQuery): 比較するクエリ
+
+    Returns:
+        float: DTW距離を返す
+    """
+    return float(query.score(trajectory))
+
+
+def build_pipeline(
+    json_dir=None,
+    sorted_dir=None,
+    tracked_dir=constants.TRACKED_PATH,
+    query=None,
+    filter_path=constants.FILTER_CSV_PATH,
+    fetch_workers=4,
+    cpu_workers=None,
+    queue_size=64,
+    manifest=None,
+):
+    """取得 → フィルタリング → ソート → 軌跡の算出 → 比較 のパイプラインを作成
+    マニフェストを指定した場合は，元のJSON，コードのバージョン（SORT_VERSIONなど），設定値
+    （REPEAT_TIMES，filter.csv，クエリ）が変わった作品のステージのみ計算し直す．
+    ソートはsorted_dirの指定がないと記録せず，軌跡の算出を計算し直す作品でのみ計算する．
+    軌跡の算出はtracked_dirの指定がないと毎回計算する．
+
+    Args:
+        json_dir(str, optional): 作品JSONの保存先（保存済みの作品は取得しない）.
+        sorted_dir(str, optional): ソートしたブロックのCSVの保存先.
+        tracked_dir(str, optional): 動作軌跡のCSVの保存先.
+        query(DtwQuery, optional): 比較するクエリ. 指定なしだと比較しない.
+        filter_path(str, optional): フィルタリング用CSVのパス.
+        fetch_workers(int, optional): 同時に取得する作品の数.
+        cpu_workers(int, optional): CPUステージのプロセス数. 指定なしだとCPU数.
+        queue_size(int, optional): ステージ間のキューの上限.
+        manifest(ArtifactManifest, optional): 成果物の入力のハッシュ値を記録するマニフェスト.
+
+    Returns:
+        Pipeline: 作成したパイプラインを返す
+    """
+    for dir_path in [json_dir, sorted_dir, tracked_dir]:
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+    workers = cpu_workers or os.cpu_count() or 1
+
+    fetch_artifact = json_artifact(json_dir) if json_dir else None
+    source = None
+    if fetch_artifact is not None and manifest is not None:
+        # 作品JSONの内容のハッシュ値（サイズと更新日時が同じ場合は記録した値）
+        source = lambda project_id: manifest.get_file_hash(
+            fetch_artifact.get_path(project_id)
+        )
+    sorted_artifact = (
+        FileArtifact(sorted_dir, ".csv", load_sorted_csv) if sorted_dir else None
+    )
+    tracked_artifact = (
+        FileArtifact(tracked_dir, ".csv", load_tracked_csv) if tracked_dir else None
+    )
+    stages = [
+        Stage(
+            "fetch",
+            partial(fetch_project, json_dir=json_dir),
+            workers=fetch_workers,
+            version=get_version(stage="fetch") if source else None,
+            artifact=fetch_artifact,
+            source=source,
+        ),
+        # 判定は軽いため，作品をプロセスに送らずスレッドで行う
+        Stage(
+            "filter",
+            partial(filter_project, filter_path=filter_path),
+            inputs=["fetch"],
+            version=get_version(filter=generate_file_hash(filter_path)),
+        ),
+        Stage(
+            "sort",
+            partial(sort_project, sorted_dir=sorted_dir),
+            inputs=["fetch"],
+            after=["filter"],
+            kind=CPU,
+            workers=workers,
+            version=get_version(code=SORT_VERSION, repeat_times=constants.REPEAT_TIMES),
+            artifact=sorted_artifact,
+            # DataFrameはマニフェストに保存できないため，CSVに保存しない場合は記録せず，
+            # 軌跡の算出が再利用できない作品でのみ計算する
+            cache=sorted_artifact is not None,
+        ),
+        Stage(
+            "track",
+            partial(track_project, tracked_dir=tracked_dir),
+            inputs=["sort"],
+            kind=CPU,
+            workers=workers,
+            version=get_version(code=TRACK_VERSION) if tracked_artifact else None,
+            artifact=tracked_artifact,
+        ),
+    ]
+    keep = ["track"]
+    if query is not None:
+        query_hash = hashlib.sha256(query.get_query().tobytes()).hexdigest()
+        stages.append(
+            Stage(
+                "compare",
+                partial(compare_trajectory, query=query),
+                inputs=["track"],
+                kind=CPU,
+                workers=workers,
+                version=get_version(
+                    normalization=NORMALIZATION_VERSION,
+                    query=query_hash,
+                    radius=query.get_radius(),
+                ),
+            )
+        )
+        keep = ["compare"]
+    return Pipeline(
+        stages, queue_size, processes=cpu_workers, keep=keep, manifest=manifest
+    )
+
+
+def read_project_ids(path, column="project_id"):
+    """作品IDのCSVから作品IDを1行ずつ読み込む
+    Args:
+        path(str): 作品IDのCSVのパス
+        column(str, optional): 作品IDの列名.
+
+    Returns:
+        generator: 作品IDを返す
+    """
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            yield row[column]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="作品の取得から軌跡の比較までを1つのコマンドで実行する"
+    )
+    parser.add_argument(
+        "ids_csv",
+        nargs="?",
+        help="project_id列を持つ作品IDのCSV. 指定なしだと--json-dirの作品",
+    )
+    parser.add_argument("--json-dir", default=None)
+    parser.add_argument("--sorted-dir", default=None)
+    parser.add_argument("--tracked-dir", default=constants.TRACKED_PATH)
+    parser.add_argument("--query", help="比較するクエリの軌跡のCSV（x, y列）")
+    parser.add_argument("--radius", type=int, default=None)
+    parser.add_argument("--out", help="比較結果（作品ID, DTW距離）のCSV")
+    parser.add_argument("--fetch-workers", type=int, default=4)
+    parser.add_argument("--cpu-workers", type=int, default=None)
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument(
+        "--manifest",
+        help="成果物のマニフェスト（SQLite）. 指定すると変更のあった作品のみ計算し直す",
+    )
+    args = parser.parse_args()
+    if args.ids_csv:
+        project_ids = read_project_ids(args.ids_csv)
+    elif args.json_dir:
+        project_ids = (
+            remove_extension(file_name)
+            for file_name in sorted(os.listdir(args.json_dir))
+            if file_name.endswith(".json")
+        )
+    else:
+        parser.error("ids_csv or --json-dir is required")
+
+    query = None
+    if args.query:
+        query = DtwQuery(pd.read_csv(args.query)[["x", "y"]].values, args.radius)
+    manifest = ArtifactManifest(args.manifest) if args.manifest else None
+    pipeline = build_pipeline(
+        json_dir=args.json_dir,
+        sorted_dir=args.sorted_dir,
+        tracked_dir=args.tracked_dir,
+        query=query,
+        fetch_workers=args.fetch_workers,
+        cpu_workers=args.cpu_workers,
+        queue_size=args.queue_size,
+        manifest=manifest,
+    )
+
+    out_file = open(args.out, "w", newline="") if args.out and query else None
+    writer = csv.writer(out_file) if out_file else None
+    if writer:
+        writer.writerow(["project_id", "distance"])
+
+    def on_result(project_id, results):
+        if writer:
+            writer.writerow([project_id, results["compare"]])
+
+    try:
+        summary = pipeline.run(project_ids, on_result)
+    finally:
+        if out_file:
+            out_file.close()
+        if manifest:
+            manifest.close()
+    print(f"{summary['completed']}件の作品を処理しました．")
+    for stage in pipeline.get_stages():
+        print(
+            f"{stage}: 計算 {summary['computed'][stage]}件，"
+            f"再利用 {summary['reused'][stage]}件"
+        )
+    for stage, count in summary["dropped"].items():
+        print(f"{stage}: {count}件を除きました．")
+    for project_id, stage, error in summary["errors"]:
+        print(f"{project_id} ({stage}): {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,15 @@ import sys
 
 sys.path.append("../")
 
-import csv
 from utils import json_to_file
 from api import scratch_client
-from tools import Sorter, Tracker
+from config import constants
+from tools import Sorter, Tracker, get_block_filter
 from converter import AstConverter
+from corpus.stats import get_project_stats
 
 
 class ProjectManager:
-
     """Scratch作品を管理するためのクラス
 
     Args:
@@ -88,20 +88,29 @@ class ProjectManager:
         """
 
         return len(self.__blocks)
-    
+
     def get_all_blocks_length(self):
         """現在管理している全スプライトに含まれるブロック数の合計を取得
 
         Returns:
             int: 現在管理している全スプライトに含まれるブロック数の合計を返す
         """
-        
+
         length = 0
         for target in self.__blocks:
             length += len(target["blocks"])
 
         return length
 
+    def get_stats(self):
+        """現在管理している作品の統計量を1度の走査で取得
+
+        Returns:
+            dictionary: スプライト数，ブロック数，イベントブロックの重複数，ループの深さ，定義ブロック数などを返す
+        """
+
+        return get_project_stats(self.__project)
+
     def get_ast(self, path=""):
         """現在管理しているブロックをASTに変換して取得
 
@@ -168,34 +177,19 @@ class ProjectManager:
             case "blocks":
                 json_to_file(self.__blocks, f"{dir_path}/{self.__ID}_blocks.json")
 
-    def is_dataset(self, ava_path="utils/filter/filter.csv"):
+    def is_dataset(self, ava_path=constants.FILTER_CSV_PATH):
         """フィルタリング用関数
 
         Args:
-            ava_path (str, optional): フィルタリング用CSVのパス. Defaults to "utils/filter/filter.csv".
+            ava_path (str, optional): フィルタリング用CSVのパス. Defaults to constants.FILTER_CSV_PATH.
 
         Returns:
             boolean: フィルタリングに引っかかったか否かを返す．True -> 引っかかっていない　False -> 引っかかった
         """
-        ava_blocks = []
-        # フィルタリング用CSVの読み込み
-        with open(ava_path, encoding="utf-8-sig") as f:
-            reader = csv.reader(f)
-            for row in reader:
-                ava_blocks.append(row)
-
-        isDataset = self.__filter_json(ava_blocks)
-        return isDataset
+        # CSVはパスごとに1度だけ読み込み，使用不可のオペコードの集合で判定する
+        return get_block_filter(ava_path).is_dataset(self.__project)
 
     # Private関数
 
-    # フィルタリング
-    def __filter_json(self, ava_blocks):
-        for k in self.__blocks:
-            for block, ava in ava_blocks:
-                if self.__blocks[k]["opcode"] == block and int(ava) == 0:
-                    return False
-        return True
-
     def __format_blocks(target):
         return {"isStage": target["isStage"], "blocks": target["blocks"]}
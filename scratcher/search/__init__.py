@@ -0,0 +1,2 @@
+from .metrics import LatencyHistogram
+from .searcher import MotionSearcher
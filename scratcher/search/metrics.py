@@ -0,0 +1,62 @@
+import bisect
+import threading
+
+# ヒストグラムの区切り（ミリ秒）
+DEFAULT_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+
+class LatencyHistogram:
+    """リクエストの処理時間をヒストグラムで集計するためのクラス"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """LatencyHistogramの初期化
+        Args:
+            buckets(list, optional): ヒストグラムの区切り（ミリ秒, 昇順）.
+        """
+        self.__buckets = list(buckets)
+        # 最後の要素は最大の区切りを超えたもの
+        self.__counts = [0] * (len(self.__buckets) + 1)
+        self.__total = 0.0
+        self.__lock = threading.Lock()
+
+    def observe(self, seconds):
+        """処理時間を1件記録
+        Args:
+            seconds(float): 処理時間（秒）
+        """
+        ms = seconds * 1000
+        index = bisect.bisect_left(self.__buckets, ms)
+        with self.__lock:
+            self.__counts[index] += 1
+            self.__total += ms
+
+    def get_summary(self):
+        """集計結果を取得
+        Returns:
+            dictionary: 件数，平均，パーセンタイル（区切りの上限値），区切りごとの件数を返す
+        """
+        with self.__lock:
+            counts = list(self.__counts)
+            total = self.__total
+
+        count = sum(counts)
+        labels = [f"<={b}ms" for b in self.__buckets] + [f">{self.__buckets[-1]}ms"]
+        return {
+            "count": count,
+            "mean_ms": total / count if count else None,
+            "p50_ms": self.__percentile(counts, count, 0.5),
+            "p95_ms": self.__percentile(counts, count, 0.95),
+            "p99_ms": self.__percentile(counts, count, 0.99),
+            "buckets": dict(zip(labels, counts)),
+        }
+
+    def __percentile(self, counts, count, q):
+        if not count:
+            return None
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            seen += bucket_count
+            if seen >= q * count:
+                if index < len(self.__buckets):
+                    return self.__buckets[index]
+                return float("inf")
@@ -0,0 +1,180 @@
+import sys
+
+sys.path.append("../")
+
+import os
+import heapq
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+
+from config import constants
+from corpus import TrajectoryStore
+from corpus.motion import PROJECT_COLUMN, SPRITE_COLUMN
+from dtw import DtwQuery, normalize_coordinate
+
+# ワーカープロセスごとに1度だけ開くインデックス．プロセスプールごとに新しいプロセスで開くため，
+# 検索を呼び出したプロセスでは使わない（そちらはMotionSearcherが自分のTrajectoryStoreを渡す）
+_store = None
+
+
+def _init_worker(index_path):
+    global _store
+    _store = TrajectoryStore(index_path)
+
+
+def _score_range(query, start, end, radius, threshold, k):
+    # ワーカープロセス側で [start, end) の軌跡とのDTWを算出し，上位k件を返す
+    return _score_store(_store, query, start, end, radius, threshold, k)
+
+
+def _score_store(store, query, start, end, radius, threshold, k):
+    dtw_query = DtwQuery(query, radius=radius, normalized=True)
+    candidates = (store.get_at(i) for i in range(start, end))
+    if not store.is_normalized():
+        # 正規化せずに保存したインデックスは読み込んだ軌跡ごとに正規化する
+        candidates = (normalize_coordinate(candidate) for candidate in candidates)
+    distances = dtw_query.score_batch(
+        candidates, normalized=True, max_distance=threshold, k=k
+    )
+    # 打ち切った候補（inf）と閾値より遠い候補は返さない
+    limit = np.inf if threshold is None else threshold
+    kept = np.flatnonzero(np.isfinite(distances) & (distances <= limit))
+    best = kept[np.argsort(distances[kept], kind="stable")[:k]]
+    return [(float(distances[i]), start + int(i)) for i in best]
+
+
+class MotionSearcher:
+    """クエリ軌跡とDTW距離の近い動作をインデックスから検索するためのクラス
+
+    インデックスはメモリマップで開き，DTWの算出はワーカープロセスで並列に行う．
+    """
+
+    def __init__(
+        self,
+        index_path=constants.TRAJECTORY_CACHE_PATH,
+        workers=None,
+        chunk_size=256,
+        radius=None,
+    ):
+        """MotionSearcherの初期化
+        Args:
+            index_path(str, optional): 軌跡のインデックス（TrajectoryStore, MotionDataset）のパス.
+                正規化せずに保存したインデックスは検索時に軌跡ごとに正規化する.
+            workers(int, optional): ワーカープロセス数. 0だと検索を呼び出したプロセスで計算.
+            chunk_size(int, optional): 1回のタスクでワーカーに渡す軌跡の数.
+            radius(int, optional): Sakoe-Chibaバンドの半径. 指定なしだと制約なしのDTW.
+        """
+        self.__store = TrajectoryStore(index_path)
+        self.__ids = self.__store.get_ids()
+        # 動作データセットの場合は作品IDとスプライト名も結果に含める
+        self.__columns = {
+            name: self.__store.get_column(name)
+            for name in [PROJECT_COLUMN, SPRITE_COLUMN]
+            if self.__store.has_column(name)
+        }
+        self.__chunk_size = chunk_size
+        self.__radius = radius
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self.__workers = workers
+        self.__executor = None
+        if workers != 0:
+            # 検索ごとにプロセスを作り直さないよう，parallel_mapではなくプールをインスタンスで保持する
+            self.__executor = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(index_path,),
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self.__store)
+
+    def close(self):
+        """ワーカープロセスを終了"""
+        if self.__executor is not None:
+            self.__executor.shutdown()
+            self.__executor = None
+
+    def search(self, data, k=10, max_distance=None):
+        """クエリ軌跡とDTW距離の近い動作を検索
+        Args:
+            data(array-like): クエリの座標データ [[x, y], [x1, y1], ...]
+            k(int, optional): 取得する件数.
+            max_distance(float, optional): これより遠い動作は結果に含めない.
+
+        Returns:
+            list: 距離の昇順に {"id", "distance"} を並べたリストを返す
+        """
+        if isinstance(k, bool) or not isinstance(k, (int, np.integer)) or k < 1:
+            raise ValueError("k must be a positive integer")
+        query = np.asarray(data, dtype=np.float64)
+        if query.ndim != 2 or query.shape[1] != 2 or len(query) == 0:
+            raise ValueError("data must be a non-empty list of [x, y]")
+        if not np.all(np.isfinite(query)):
+            raise ValueError("data must not contain NaN or infinity")
+        query = normalize_coordinate(query)
+        threshold = np.inf if max_distance is None else max_distance
+        ranges = [
+            (start, min(start + self.__chunk_size, len(self.__store)))
+            for start in range(0, len(self.__store), self.__chunk_size)
+        ]
+
+        # 上位k件（符号を反転して最大ヒープとして扱う）
+        best = []
+
+        def merge(results):
+            nonlocal threshold
+            for dist, index in results:
+                if len(best) < k:
+                    heapq.heappush(best, (-dist, -index))
+                elif dist < -best[0][0]:
+                    heapq.heapreplace(best, (-dist, -index))
+            if len(best) == k:
+                threshold = min(threshold, -best[0][0])
+
+        if self.__executor is None:
+            for start, end in ranges:
+                merge(
+                    _score_store(
+                        self.__store, query, start, end, self.__radius, threshold, k
+                    )
+                )
+        else:
+            # 投入するタスク数を抑え，終わった結果で閾値を絞ってから次を投入する
+            pending = set()
+            ranges = iter(ranges)
+            while True:
+                for start, end in ranges:
+                    pending.add(
+                        self.__executor.submit(
+                            _score_range,
+                            query,
+                            start,
+                            end,
+                            self.__radius,
+                            None if np.isinf(threshold) else threshold,
+                            k,
+                        )
+                    )
+                    if len(pending) >= self.__workers * 2:
+                        break
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    merge(future.result())
+
+        results = []
+        for dist, index in sorted((-dist, -index) for dist, index in best):
+            result = {"id": str(self.__ids[index]), "distance": dist}
+            for name, values in self.__columns.items():
+                result[name] = values[index].item()
+            results.append(result)
+        return results
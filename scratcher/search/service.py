@@ -0,0 +1,87 @@
+import sys
+
+sys.path.append("../")
+
+import time
+import argparse
+
+from flask import Flask, jsonify, request
+
+from config import constants
+from .searcher import MotionSearcher
+from .metrics import LatencyHistogram
+
+
+def _parse_request(body):
+    # 検索の条件を取り出す．不正な値の場合はValueErrorを送出する
+    coordinates = body.get("coordinates")
+    if not isinstance(coordinates, list) or not coordinates:
+        raise ValueError("coordinatesを [[x, y], ...] の形式で指定してください．")
+    k = body.get("k", 10)
+    if isinstance(k, bool) or not isinstance(k, int) or k < 1:
+        raise ValueError("kは1以上の整数で指定してください．")
+    max_distance = body.get("max_distance")
+    if max_distance is not None and (
+        isinstance(max_distance, bool)
+        or not isinstance(max_distance, (int, float))
+        or max_distance < 0
+    ):
+        raise ValueError("max_distanceは0以上の数値で指定してください．")
+    return coordinates, k, max_distance
+
+
+def create_app(searcher):
+    """動作検索のWebアプリケーションを作成
+    クエリはリクエストごとに受け取るため，複数の利用者が同時に検索してもよい．
+
+    Args:
+        searcher(MotionSearcher): 検索に使うMotionSearcher
+
+    Returns:
+        Flask: Flaskアプリケーションを返す
+    """
+    app = Flask(__name__)
+    histogram = LatencyHistogram()
+
+    @app.route("/search", methods=["POST"])
+    def search():
+        start = time.perf_counter()
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            return jsonify({"error": "JSONのオブジェクトを送信してください．"}), 400
+        try:
+            coordinates, k, max_distance = _parse_request(body)
+            results = searcher.search(coordinates, k=k, max_distance=max_distance)
+        except (TypeError, ValueError) as e:
+            # 座標の形が [x, y] の並びでない場合などはsearchが送出する
+            return jsonify({"error": str(e)}), 400
+        elapsed = time.perf_counter() - start
+        histogram.observe(elapsed)
+        return jsonify({"results": results, "elapsed_ms": elapsed * 1000})
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        return jsonify(histogram.get_summary())
+
+    @app.route("/health", methods=["GET"])
+    def health():
+        return jsonify({"status": "ok", "motions": len(searcher)})
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="動作検索サーバを起動する")
+    parser.add_argument("--index", default=constants.TRAJECTORY_CACHE_PATH)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--radius", type=int, default=None)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    args = parser.parse_args()
+
+    with MotionSearcher(args.index, workers=args.workers, radius=args.radius) as s:
+        create_app(s).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
 from .sorter import Sorter
 from .tracker import Tracker
 from .collector import Collector
+from .block_filter import BlockFilter, get_block_filter
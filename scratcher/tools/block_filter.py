@@ -0,0 +1,91 @@
+import sys
+
+sys.path.append("../")
+
+import csv
+
+from config import constants
+
+
+class BlockFilter:
+    """filter.csvで使用不可（Available=0）とされたブロックを含む作品を判定するためのクラス
+
+    CSVは初期化時に1度だけ読み込み，使用不可のオペコードのfrozensetにまとめる．
+    状態を変更しないため，スレッド間で共有でき，pickleしてプロセスにも渡せる．
+    """
+
+    def __init__(self, filter_path=constants.FILTER_CSV_PATH):
+        """BlockFilterの初期化
+        Args:
+            filter_path(str, optional): フィルタリング用CSVのパス.
+        """
+        forbidden = set()
+        with open(filter_path, encoding="utf-8-sig") as f:
+            for row in list(csv.reader(f))[1:]:
+                # "Motion(3.0)" のような区切り行は除く
+                if len(row) < 2 or "(" in row[0]:
+                    continue
+                if int(row[1]) == 0:
+                    forbidden.add(row[0].strip())
+        self.__forbidden = frozenset(forbidden)
+
+    def __len__(self):
+        return len(self.__forbidden)
+
+    def __contains__(self, opcode):
+        return opcode in self.__forbidden
+
+    def get_forbidden(self):
+        return self.__forbidden
+
+    def find_forbidden(self, blocks):
+        """ブロックのうち，最初に見つかった使用不可のオペコードを取得
+        Args:
+            blocks(dictionary): スプライトのブロック（ハッシュ値 -> ブロック）
+
+        Returns:
+            str: 使用不可のオペコードを返す．ない場合はNone
+        """
+        for block in blocks.values():
+            # 変数などのトップレベルのレポーターはリストで保存されているため除く
+            if isinstance(block, dict) and block.get("opcode") in self.__forbidden:
+                return block["opcode"]
+        return None
+
+    def is_dataset_blocks(self, blocks):
+        """ブロックに使用不可のオペコードが含まれないかを判定
+        Args:
+            blocks(dictionary): スプライトのブロック（ハッシュ値 -> ブロック）
+
+        Returns:
+            boolean: True -> 引っかかっていない　False -> 引っかかった
+        """
+        return self.find_forbidden(blocks) is None
+
+    def is_dataset(self, project):
+        """作品の全てのスプライト（ステージを含む）を1度だけ走査し，見つかった時点で打ち切る
+        Args:
+            project(dictionary): 作品のJSON
+
+        Returns:
+            boolean: True -> 引っかかっていない　False -> 引っかかった
+        """
+        return all(
+            self.is_dataset_blocks(target["blocks"]) for target in project["targets"]
+        )
+
+
+__block_filters = {}
+
+
+def get_block_filter(filter_path=constants.FILTER_CSV_PATH):
+    """プロセス内で共有するBlockFilterを取得
+    Args:
+        filter_path(str, optional): フィルタリング用CSVのパス.
+
+    Returns:
+        BlockFilter: CSVのパスごとに初回のみ作成したBlockFilterを返す
+    """
+    if filter_path not in __block_filters:
+        __block_filters[filter_path] = BlockFilter(filter_path)
+    return __block_filters[filter_path]
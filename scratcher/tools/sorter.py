@@ -4,16 +4,24 @@ sys.path.append("../")
 
 from utils import DfManager, single_to_double
 from config import constants
+from config.vocabulary import UNKNOWN_ID, get_vocabulary
+
+# ソートの方法を変えた場合は更新する（パイプラインの成果物の無効化に使う）
+SORT_VERSION = 2
 
 
 class Sorter:
     """Scratch作品を命令処理順にソートするためのクラス"""
 
-    __IF_BLOCKS = constants.IF_BLOCKS
-    __R_BLOCKS = constants.REPEAT_BLOCKS
-    __E_BLOCKS = constants.EVENT_BLOCKS
-    __VAR_BLOCKS = constants.VARIABLE_BLOCKS
-    __PRO_CALL_BLOCKS = constants.PROCEDURES_CALL
+    __VOCABULARY = get_vocabulary()
+    # オペコードID -> 分類（文字列を比較せずにIDで分類する）
+    __CATEGORIES = {
+        **{id: "EVENT" for id in __VOCABULARY.get_ids(constants.EVENT_BLOCKS)},
+        **{id: "IF" for id in __VOCABULARY.get_ids(constants.IF_BLOCKS)},
+        **{id: "REPEAT" for id in __VOCABULARY.get_ids(constants.REPEAT_BLOCKS)},
+        **{id: "VARIABLE" for id in __VOCABULARY.get_ids(constants.VARIABLE_BLOCKS)},
+        **{id: "CALL" for id in __VOCABULARY.get_ids(constants.PROCEDURES_CALL)},
+    }
 
     def __init__(self, project):
         """Sorterの初期化
@@ -21,7 +29,7 @@ class Sorter:
             project(dictionary): 作品のJSON
         """
         self.__dfM = DfManager(
-            ["BlockName", "Key", "Field", "node_id", "parent_id", "hash"]
+            ["BlockName", "Key", "Field", "node_id", "parent_id", "hash", "opcode_id"]
         )
         self.__blocks = project["targets"][1]["blocks"]
         self.__sprite = project["targets"][1]
@@ -35,6 +43,14 @@ class Sorter:
         """
         self.__dfM.to_csv(dir_path)
 
+    def to_dataset(self, writer, project_id):
+        """ソートされたブロックを作品ID列を付けてデータセットに追記
+        Args:
+            writer(ColumnarWriter): 追記先のデータセット
+            project_id(int or str): 作品ID
+        """
+        self.__dfM.to_dataset(writer, project_id)
+
     def sort_blocks(self):
         """ブロックを命令処理順にソートして取得
         Returns:
@@ -48,6 +64,7 @@ class Sorter:
                 None,
                 None,
                 None,
+                UNKNOWN_ID,
             ]
         )
         for block_hash, block in self.__blocks.items():
@@ -70,22 +87,12 @@ class Sorter:
         else:
             return 0
 
-    def __categorize_blocks(self, block_name):
-        try:
-            if block_name in self.__E_BLOCKS:
-                return "EVENT"
-            elif block_name in self.__IF_BLOCKS:
-                return "IF"
-            elif block_name in self.__R_BLOCKS:
-                return "REPEAT"
-            elif block_name in self.__VAR_BLOCKS:
-                return "VARIABLE"
-            elif block_name in self.__PRO_CALL_BLOCKS:
-                return "CALL"
-            else:
-                return "NORMAL"
-        except Exception as e:
-            print(e)
+    def __categorize_blocks(self, opcode_id):
+        return self.__CATEGORIES.get(opcode_id, "NORMAL")
+
+    def __add_row(self, row):
+        # ブロック名はパース時にIDへ変換し，固定のIDをopcode_id列に保存する
+        self.__dfM.add_row(row + [self.__VOCABULARY.get_stored_id(row[0])])
 
     def __has_forever_block(self, block_hash):
         while True:
@@ -110,12 +117,12 @@ class Sorter:
         try:
             block = self.__blocks[block_hash]
             block_name = block["opcode"]
-            category = self.__categorize_blocks(block_name)
+            category = self.__categorize_blocks(self.__VOCABULARY.get_id(block_name))
             self.__node_id += 1
             match category:
                 case "EVENT":
                     self.__node_id = 0
-                    self.__dfM.add_row(
+                    self.__add_row(
                         [
                             "SCRIPT",
                             None,
@@ -128,7 +135,7 @@ class Sorter:
                     self.__node_id += 1
                     if block_name == constants.EVENT_KEY_BLOCK:
                         key_name = self.__blocks[block_hash]["fields"]["KEY_OPTION"][0]
-                        self.__dfM.add_row(
+                        self.__add_row(
                             [
                                 block_name,
                                 key_name,
@@ -139,7 +146,7 @@ class Sorter:
                             ]
                         )
                     else:
-                        self.__dfM.add_row(
+                        self.__add_row(
                             [
                                 block_name,
                                 None,
@@ -152,7 +159,7 @@ class Sorter:
                     if block["next"]:
                         self.__write_blocks(block["next"])
                 case "REPEAT":
-                    self.__dfM.add_row(
+                    self.__add_row(
                         [
                             block_name,
                             None,
@@ -172,7 +179,7 @@ class Sorter:
                     if block["next"]:
                         self.__write_blocks(block["next"])
                 case "IF":
-                    self.__dfM.add_row(
+                    self.__add_row(
                         [
                             block_name,
                             None,
@@ -186,15 +193,15 @@ class Sorter:
                         self.__write_blocks(block["inputs"]["SUBSTACK"][1])
                 case "VARIABLE":
                     if block_name == constants.SET_VARIABLE:
-                        self.__variables[
-                            block["fields"]["VARIABLE"][1]
-                        ] = self.__get_variable_value(block["inputs"]["VALUE"])
+                        self.__variables[block["fields"]["VARIABLE"][1]] = (
+                            self.__get_variable_value(block["inputs"]["VALUE"])
+                        )
                     elif block_name == constants.CHANGE_VARIABLE:
                         self.__variables[block["fields"]["VARIABLE"][1]] = str(
                             float(self.__variables[block["fields"]["VARIABLE"][1]])
                             + float(self.__get_variable_value(block["inputs"]["VALUE"]))
                         )
-                    self.__dfM.add_row(
+                    self.__add_row(
                         [
                             block_name,
                             None,
@@ -208,7 +215,7 @@ class Sorter:
                         self.__write_blocks(block["next"])
                 case "CALL":
                     procedure_name = block["mutation"]["proccode"]
-                    self.__dfM.add_row(
+                    self.__add_row(
                         [
                             block_name,
                             None,
@@ -227,7 +234,7 @@ class Sorter:
                                 == procedure_name
                             ):
                                 if block2["next"]:
-                                    self.__dfM.add_row(
+                                    self.__add_row(
                                         [
                                             block2["opcode"],
                                             None,
@@ -248,7 +255,7 @@ class Sorter:
                                 block["inputs"][key][1][1] = self.__get_variable_value(
                                     input
                                 )
-                        self.__dfM.add_row(
+                        self.__add_row(
                             [
                                 block_name,
                                 None,
@@ -259,7 +266,7 @@ class Sorter:
                             ]
                         )
                     elif block["fields"] != None:
-                        self.__dfM.add_row(
+                        self.__add_row(
                             [
                                 block_name,
                                 single_to_double(str(block["fields"])),
@@ -270,7 +277,7 @@ class Sorter:
                             ]
                         )
                     else:
-                        self.__dfM.add_row(
+                        self.__add_row(
                             [
                                 block_name,
                                 None,
@@ -4,11 +4,15 @@ sys.path.append("../")
 
 from utils import DfManager
 from config import constants
+from config.vocabulary import get_vocabulary
 
 import math
 import pandas as pd
 import ast
 
+# 軌跡の算出方法を変えた場合は更新する（パイプラインの成果物の無効化に使う）
+TRACK_VERSION = 1
+
 
 class Tracker:
     """Scratch作品のスプライト動作軌跡を取得するためのクラス"""
@@ -20,6 +24,12 @@ class Tracker:
     # 待機時間情報を格納しているキー名
     __WAIT = constants.WAIT_FIELDS
     __COORDINATE = constants.COORDINATE_FIELDS
+    # 比較に使うオペコードのID
+    __VOCABULARY = get_vocabulary()
+    __FLAG_ID = __VOCABULARY.get_id("event_whenflagclicked")
+    __SCRIPT_ID = __VOCABULARY.get_id("SCRIPT")
+    __TURN_LEFT_ID = __VOCABULARY.get_id("motion_turnleft")
+    __TURN_RIGHT_ID = __VOCABULARY.get_id("motion_turnright")
 
     def __init__(self, project):
         if isinstance(project, str):
@@ -31,6 +41,12 @@ class Tracker:
             return
 
         self.__dfM = DfManager(["key", "x", "y", "wait", "move_index"])
+        self.__opcodes = self.__get_opcodes()
+        self.__fields = self.__sorted_df["Field"].tolist()
+
+    def __get_opcodes(self):
+        # ブロックを1度だけIDに変換し，以降は整数で比較する（1行目は初期状態）
+        return self.__VOCABULARY.encode_blocks(self.__sorted_df).astype(int)
 
     def to_csv(self, dir_path):
         """時系列の座標情報をCSVに保存
@@ -39,6 +55,14 @@ class Tracker:
         """
         self.__dfM.to_csv(dir_path)
 
+    def to_dataset(self, writer, project_id):
+        """時系列の座標情報を作品ID列を付けてデータセットに追記
+        Args:
+            writer(ColumnarWriter): 追記先のデータセット
+            project_id(int or str): 作品ID
+        """
+        self.__dfM.to_dataset(writer, project_id)
+
     def __get_step_movement(self, steps):
         degree_rad = math.radians(90.0 - float(self.__degree))
         dx = steps * math.cos(degree_rad)
@@ -54,17 +78,18 @@ class Tracker:
         self.__x = self.__sorted_df.iloc[0]["Key"]
         self.__y = self.__sorted_df.iloc[0]["Field"]
         self.__df_length = len(self.__sorted_df.index)
+        # "event" を含むオペコードのIDのマスク
+        is_event = self.__VOCABULARY.match(lambda opcode: "event" in str(opcode))
         try:
             for i in range(1, self.__df_length):
-                block_name = self.__sorted_df.iloc[i]["BlockName"]
-                if block_name == "event_whenflagclicked":
+                if self.__opcodes[i] == self.__FLAG_ID:
                     self.__dfM.add_row([None, self.__x, self.__y, 0, i])
                     self.__calculate_coordinate(i)
                     break
             for i in range(1, self.__df_length):
-                block_name = self.__sorted_df.iloc[i]["BlockName"]
-                if "event" in str(block_name):
-                    if block_name != "event_whenflagclicked":
+                opcode = self.__opcodes[i]
+                if is_event[opcode]:
+                    if opcode != self.__FLAG_ID:
                         self.__dfM.add_row([None, self.__x, self.__y, 0, i])
                         self.__calculate_coordinate(i)
 
@@ -77,10 +102,10 @@ class Tracker:
         wait = 0.0
         for i in range(index, self.__df_length):
             try:
-                if self.__sorted_df["BlockName"].iloc[i] == "SCRIPT":
+                if self.__opcodes[i] == self.__SCRIPT_ID:
                     return
-                if not pd.isna(self.__sorted_df.iloc[i]["Field"]):
-                    dic = ast.literal_eval(self.__sorted_df.iloc[i]["Field"])
+                if not pd.isna(self.__fields[i]):
+                    dic = ast.literal_eval(self.__fields[i])
                     for key in dic.keys():
                         if key in self.__MOVE:
                             if key == "DX":
@@ -94,17 +119,11 @@ class Tracker:
                                 self.__y = float(dic[key][1][1])
                         elif key in self.__DEGREE:
                             if key == "DEGREES":
-                                if (
-                                    self.__sorted_df.iloc[i]["BlockName"]
-                                    == "motion_turnleft"
-                                ):
+                                if self.__opcodes[i] == self.__TURN_LEFT_ID:
                                     self.__degree = float(self.__degree) + float(
                                         dic[key][1][1]
                                     )
-                                elif (
-                                    self.__sorted_df.iloc[i]["BlockName"]
-                                    == "motion_turnright"
-                                ):
+                                elif self.__opcodes[i] == self.__TURN_RIGHT_ID:
                                     self.__degree = float(self.__degree) - float(
                                         dic[key][1][1]
                                     )
@@ -5,3 +5,4 @@ from .draw_graph import *
 from .util import *
 from .parallelizer import *
 from .env import *
+from .project_reader import *
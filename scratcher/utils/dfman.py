@@ -26,3 +26,6 @@ class DfManager:
 
     def to_csv(self, dir_path):
         self.__df.to_csv(dir_path)
+
+    def to_dataset(self, writer, project_id):
+        writer.write(project_id, self.__df)
@@ -3,6 +3,9 @@ import pandas as pd
 import os
 import csv
 import json
+import atexit
+import weakref
+import threading
 
 
 def count_files(dir_path):
@@ -55,14 +58,158 @@ def read_json_file(path):
         print(e)
 
 
+# 閉じられていないToCsv（使われなくなったものは自動で外れる）
+_open_writers = weakref.WeakSet()
+
+
+@atexit.register
+def _close_writers():
+    # 終了時に，閉じられていないToCsvの残りの行を書き込む
+    for writer in list(_open_writers):
+        writer.close()
+
+
 class ToCsv:
-    def __init__(self, csv_path, rowNames):
+    """CSVに1行ずつ書き込むためのクラス
+
+    行はメモリに溜め，一定の行数か一定の時間ごとにバックグラウンドのスレッドでまとめて書き込む．
+    複数のスレッドから同じインスタンスのwriteRowを呼んでも，行が混ざることはない．
+    closeを呼ぶと（呼ばなかった場合は回収時か終了時に）残りの行を書き込み，ディスクに同期する．
+    書き込みに失敗した行は破棄せずに残し，例外は次のwriteRow，flush，closeで送出する．
+    """
+
+    def __init__(
+        self,
+        csv_path,
+        rowNames=None,
+        buffer_size=1000,
+        flush_interval=1.0,
+        append=False,
+    ):
+        """ToCsvの初期化
+        Args:
+            csv_path(str): CSVのパス
+            rowNames(list, optional): 列名. 追記でファイルが空でない場合は書き込まない.
+            buffer_size(int, optional): この行数が溜まったら書き込む.
+            flush_interval(float, optional): 最後の書き込みからこの秒数が経ったら書き込む.
+            append(bool, optional): 既存のファイルに追記する場合はTrue.
+        """
         self.__CSV_PATH = csv_path
-        with open(self.__CSV_PATH, "w") as f:
-            writer = csv.writer(f)
-            writer.writerow(rowNames)
+        self.__buffer_size = buffer_size
+        self.__file = open(
+            csv_path, "a" if append else "w", newline="", encoding="utf-8"
+        )
+        self.__writer = csv.writer(self.__file)
+        if rowNames and self.__file.tell() == 0:
+            self.__writer.writerow(rowNames)
+        self.__rows = []
+        # 行の追加（短時間）とファイルへの書き込みで別のロックを使う
+        self.__rows_lock = threading.Lock()
+        self.__file_lock = threading.Lock()
+        self.__wake = threading.Event()
+        self.__closed = False
+        # バックグラウンドの書き込みで発生し，まだ呼び出し元に送出していない例外
+        self.__error = None
+        self.__thread = threading.Thread(
+            target=ToCsv.__flush_loop,
+            args=(weakref.ref(self), self.__wake, flush_interval),
+            daemon=True,
+        )
+        self.__thread.start()
+        _open_writers.add(self)
+
+    def __del__(self):
+        # 閉じ忘れたまま使われなくなった場合も，残りの行を書き込む
+        if "_ToCsv__thread" in self.__dict__:
+            self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
 
     def writeRow(self, rowData):
-        with open(self.__CSV_PATH, "a") as f:
-            writer = csv.writer(f)
-            writer.writerow(rowData)
+        """1行を追加（書き込みはまとめて行う）
+        バックグラウンドの書き込みで例外が発生していた場合は，行を追加せずにその例外を送出する．
+
+        Args:
+            rowData(list): 行の値
+        """
+        self.__raise_error()
+        with self.__rows_lock:
+            if self.__closed:
+                raise ValueError(f"{self.__CSV_PATH} is already closed")
+            self.__rows.append(list(rowData))
+            is_full = len(self.__rows) >= self.__buffer_size
+        if is_full:
+            self.__wake.set()
+
+    def flush(self):
+        """溜まっている行をファイルに書き込む．失敗した場合は行を残したまま例外を送出する"""
+        self.__raise_error()
+        self.__write_rows()
+
+    def close(self):
+        """残りの行を書き込み，ディスクに同期してファイルを閉じる
+        書き込みに失敗した場合は例外を送出し，ファイルは開いたままにする（再度closeを呼ぶと書き込み直す）．
+        """
+        with self.__rows_lock:
+            if self.__file.closed:
+                return
+            self.__closed = True
+        self.__wake.set()
+        # 書き込みのスレッドで回収された場合は，そのスレッド自身を待たない
+        if threading.current_thread() is not self.__thread:
+            self.__thread.join()
+        self.flush()
+        with self.__file_lock:
+            os.fsync(self.__file.fileno())
+            self.__file.close()
+        _open_writers.discard(self)
+
+    def __write_rows(self):
+        with self.__file_lock:
+            with self.__rows_lock:
+                rows, self.__rows = self.__rows, []
+            if self.__file.closed:
+                return
+            written = 0
+            try:
+                for row in rows:
+                    self.__writer.writerow(row)
+                    written += 1
+                self.__file.flush()
+            except Exception:
+                # 書き込めなかった行は，その間に追加された行より前に戻す
+                with self.__rows_lock:
+                    self.__rows[:0] = rows[written:]
+                raise
+
+    def __raise_error(self):
+        with self.__rows_lock:
+            error, self.__error = self.__error, None
+        if error is not None:
+            raise error
+
+    @staticmethod
+    def __flush_loop(ref, wake, flush_interval):
+        # 待機中はインスタンスを参照せず，閉じ忘れたToCsvも回収されるようにする
+        while True:
+            wake.wait(flush_interval)
+            wake.clear()
+            writer = ref()
+            if writer is None or writer.__closed:
+                return
+            writer.__flush_in_background()
+            del writer
+
+    def __flush_in_background(self):
+        # 例外を呼び出し元に送出するまでは書き込み直さない
+        if self.__error is not None:
+            return
+        try:
+            self.__write_rows()
+        except Exception as e:
+            with self.__rows_lock:
+                self.__error = e
@@ -1,10 +1,292 @@
-from concurrent.futures import ThreadPoolExecutor
+import os
+import asyncio
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+
+try:
+    from tqdm import tqdm
+except ImportError:
+    tqdm = None
+
+# thread: 通信や待機が中心の処理，process: 計算が中心の処理，
+# async: コルーチン関数，serial: 並列化しない（デバッグや小さな入力向け）
+BACKENDS = ["thread", "process", "async", "serial"]
+ERRORS = ["raise", "capture"]
+
+
+class TaskError:
+    """parallel_mapでerrors="capture"の場合に，失敗したタスクの結果の代わりに返す値"""
+
+    def __init__(self, item, error, traceback):
+        self.item = item
+        self.error = error
+        self.traceback = traceback
+
+    def __repr__(self):
+        return f"TaskError({self.item!r}, {self.error!r})"
+
+
+def parallel_map(
+    func,
+    iterable,
+    backend="thread",
+    workers=None,
+    chunksize=1,
+    max_in_flight=None,
+    ordered=True,
+    errors="raise",
+    progress=False,
+    star=False,
+    initializer=None,
+    initargs=(),
+):
+    """iterableの各要素にfuncを並列に適用し，結果を順に返す
+    iterableは必要な分だけ読み進めるため，ジェネレータや非常に大きな範囲（rangeなど）でもよい．
+
+    Args:
+        func(function): 要素を1つ受け取り，結果を返す関数. asyncの場合はコルーチン関数.
+            processの場合はpickleできる必要がある（モジュールの関数など）.
+        iterable(iterable): 入力の列
+        backend(str, optional): thread，process，async，serialのいずれか.
+        workers(int, optional): 同時に実行する数. 0だとserialと同じ. 指定なしだと
+            threadはCPU数+4（最大32），processはCPU数，asyncは64.
+        chunksize(int, optional): 1タスクにまとめる要素の数. processでは大きくすると速い.
+        max_in_flight(int, optional): 同時に投入しておくタスクの上限. 指定なしだとworkersの2倍
+            （asyncはworkers）.
+        ordered(bool, optional): Falseの場合は終わった順に返す.
+        errors(str, optional): raiseは最初の例外を送出して残りを取り消す．
+            captureは失敗した要素の結果の代わりにTaskErrorを返す.
+        progress(bool or function, optional): Trueの場合はtqdmで進捗を表示する．
+            関数の場合は完了した要素の数を受け取る.
+        star(bool, optional): Trueの場合は要素をfunc(*item)として展開して渡す.
+        initializer(function, optional): 各ワーカーの開始時に1度だけ呼ぶ関数.
+        initargs(tuple, optional): initializerの引数.
+
+    Returns:
+        generator: 結果を返す（orderedの場合はiterableの順）
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {BACKENDS}")
+    if errors not in ERRORS:
+        raise ValueError(f"errors must be one of {ERRORS}")
+    if progress is True and tqdm is None:
+        raise ImportError("tqdm is not installed")
+    if workers == 0:
+        backend = "serial"
+    workers = workers or _default_workers(backend)
+    if max_in_flight is None:
+        # asyncではイベントループに投入したタスクが全て同時に実行されるため，workersで制限する
+        max_in_flight = workers if backend == "async" else 2 * workers
+    max_in_flight = max(1, max_in_flight)
+    total = len(iterable) if hasattr(iterable, "__len__") else None
+    return __run(
+        func,
+        iterable,
+        backend,
+        workers,
+        max(1, chunksize),
+        max_in_flight,
+        ordered,
+        errors == "capture",
+        progress,
+        total,
+        star,
+        initializer,
+        initargs,
+    )
 
 
 def parallel_runner(callback, worker_num, props=None):
-    with ThreadPoolExecutor(max_workers=worker_num) as executor:
-        for i in range(worker_num):
-            if props:
-                executor.submit(callback, *props[i])
+    """callbackをworker_num回（propsを指定した場合はprops[i]を引数として）スレッドで並列に実行
+    従来どおり，callbackで発生した例外は送出しない．
+
+    Returns:
+        list: 各呼び出しの結果を返す．失敗した呼び出しはTaskError
+    """
+    args = [props[i] if props else () for i in range(worker_num)]
+    return list(
+        parallel_map(callback, args, workers=worker_num, errors="capture", star=True)
+    )
+
+
+def _default_workers(backend):
+    cpu_count = os.cpu_count() or 1
+    if backend == "thread":
+        return min(32, cpu_count + 4)
+    if backend == "async":
+        return 64
+    return cpu_count
+
+
+def __get_progress(progress, total):
+    if progress is True:
+        return tqdm(total=total)
+    if callable(progress):
+        return _Progress(progress)
+    return None
+
+
+def __run(
+    func,
+    iterable,
+    backend,
+    workers,
+    chunksize,
+    max_in_flight,
+    ordered,
+    capture,
+    progress,
+    total,
+    star,
+    initializer,
+    initargs,
+):
+    executor = _create_executor(backend, workers, initializer, initargs)
+    # 進捗バーは結果を読み始めた時点で作る（読まずに破棄した場合に表示が残らないよう）
+    progress = __get_progress(progress, total)
+    run = _run_async_chunk if backend == "async" else _run_chunk
+    pending = deque() if ordered else set()
+    try:
+        for chunk in __chunk(iterable, chunksize):
+            # 投入済みのタスクが上限に達したら，終わったものを返してから次を投入する
+            while len(pending) >= max_in_flight:
+                yield from __drain(pending, ordered, progress)
+            future = executor.submit(run, func, chunk, capture, star)
+            if ordered:
+                pending.append(future)
             else:
-                executor.submit(callback)
+                pending.add(future)
+        while pending:
+            yield from __drain(pending, ordered, progress)
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+        if progress is not None:
+            progress.close()
+
+
+def __chunk(iterable, chunksize):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def __drain(pending, ordered, progress):
+    if ordered:
+        futures = [pending.popleft()]
+    else:
+        futures, _ = wait(pending, return_when=FIRST_COMPLETED)
+        pending.difference_update(futures)
+    for future in futures:
+        results = future.result()
+        if progress is not None:
+            progress.update(len(results))
+        yield from results
+
+
+def _run_chunk(func, chunk, capture, star):
+    results = []
+    for item in chunk:
+        try:
+            results.append(func(*item) if star else func(item))
+        except Exception as e:
+            if not capture:
+                raise
+            results.append(TaskError(item, e, traceback.format_exc()))
+    return results
+
+
+async def _run_async_chunk(func, chunk, capture, star):
+    results = []
+    for item in chunk:
+        try:
+            results.append(await (func(*item) if star else func(item)))
+        except Exception as e:
+            if not capture:
+                raise
+            results.append(TaskError(item, e, traceback.format_exc()))
+    return results
+
+
+def _create_executor(backend, workers, initializer, initargs):
+    if backend == "thread":
+        return ThreadPoolExecutor(
+            max_workers=workers, initializer=initializer, initargs=initargs
+        )
+    if backend == "process":
+        return ProcessPoolExecutor(
+            max_workers=workers, initializer=initializer, initargs=initargs
+        )
+    if initializer is not None:
+        initializer(*initargs)
+    if backend == "async":
+        return _AsyncExecutor()
+    return _SerialExecutor()
+
+
+class _Progress:
+    # 進捗を関数で受け取る場合に，tqdmと同じupdate・closeで扱う
+    def __init__(self, callback):
+        self.__callback = callback
+        self.__count = 0
+
+    def update(self, n):
+        self.__count += n
+        self.__callback(self.__count)
+
+    def close(self):
+        pass
+
+
+class _SerialExecutor:
+    # 呼び出し元のスレッドで実行し，完了済みのFutureを返す
+    def submit(self, func, *args):
+        future = Future()
+        try:
+            future.set_result(func(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class _AsyncExecutor:
+    # 別スレッドのイベントループでコルーチンを実行する．同時に実行する数はmax_in_flightで制限する
+    def __init__(self):
+        self.__loop = asyncio.new_event_loop()
+        self.__thread = threading.Thread(target=self.__loop.run_forever, daemon=True)
+        self.__thread.start()
+
+    def submit(self, func, *args):
+        return asyncio.run_coroutine_threadsafe(func(*args), self.__loop)
+
+    def shutdown(self, wait=True):
+        # 取り消したタスクの後始末が終わってからループを止める
+        asyncio.run_coroutine_threadsafe(self.__cancel_all(), self.__loop).result()
+        self.__loop.call_soon_threadsafe(self.__loop.stop)
+        self.__thread.join()
+        self.__loop.close()
+
+    async def __cancel_all(self):
+        tasks = [
+            task for task in asyncio.all_tasks() if task is not asyncio.current_task()
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,141 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# フィルタリング，ソート，AST変換で使う作品JSONのキー
+PROJECT_KEYS = ["targets", "monitors"]
+# 各スプライト（ステージを含む）のうち使うキー．コスチュームや音の情報は読み込まない
+TARGET_KEYS = ["isStage", "name", "blocks", "x", "y", "direction"]
+BACKENDS = ["auto", "orjson", "ijson", "json"]
+
+
+def get_json_backend(backend="auto"):
+    """作品JSONの読み込みに使うライブラリを選ぶ
+    Args:
+        backend(str, optional): auto，orjson，ijson，jsonのいずれか.
+            autoの場合はorjsonがあればorjson，なければjsonを使う．ijsonは速度より
+            メモリを優先する場合（非常に大きな作品）に指定する.
+
+    Returns:
+        str: 使うライブラリの名前を返す
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {BACKENDS}")
+    if backend == "auto":
+        return "json" if orjson is None else "orjson"
+    if backend == "orjson" and orjson is None:
+        raise ImportError("orjson is not installed")
+    if backend == "ijson" and ijson is None:
+        raise ImportError("ijson is not installed")
+    return backend
+
+
+def read_project(
+    path, project_keys=PROJECT_KEYS, target_keys=TARGET_KEYS, backend="auto"
+):
+    """作品JSONのうち，必要なキーだけを読み込む
+    ijsonの場合はファイルを逐次読み込み，不要な部分は辞書やリストを作らずに読み飛ばす．
+    orjson，jsonの場合は全体を読み込んでから不要なキーを捨てる．
+
+    Args:
+        path(str): 作品JSONのパス
+        project_keys(list, optional): 読み込むトップレベルのキー.
+        target_keys(list, optional): targetsの各要素で読み込むキー. Noneの場合は全て.
+        backend(str, optional): auto，orjson，ijson，jsonのいずれか.
+
+    Returns:
+        dictionary: 読み込んだ作品のJSONを返す．読み込めなかった場合はNone
+    """
+    try:
+        backend = get_json_backend(backend)
+        with open(path, "rb") as f:
+            if backend == "ijson":
+                return __parse_selected(f, project_keys, target_keys)
+            if backend == "orjson":
+                project = orjson.loads(f.read())
+            else:
+                project = json.load(f)
+    except Exception as e:
+        print("JSON読み込み中にエラーが発生しました．")
+        print(e)
+        return None
+    return select_project_keys(project, project_keys, target_keys)
+
+
+def select_project_keys(project, project_keys=PROJECT_KEYS, target_keys=TARGET_KEYS):
+    """読み込み済みの作品JSONから必要なキーだけを残す
+    Args:
+        project(dictionary): 作品のJSON
+        project_keys(list, optional): 残すトップレベルのキー.
+        target_keys(list, optional): targetsの各要素で残すキー. Noneの場合は全て.
+
+    Returns:
+        dictionary: 必要なキーだけを持つ作品のJSONを返す
+    """
+    if not isinstance(project, dict):
+        return project
+    selected = {key: project[key] for key in project_keys if key in project}
+    if target_keys is not None and isinstance(selected.get("targets"), list):
+        selected["targets"] = [
+            {key: target[key] for key in target_keys if key in target}
+            for target in selected["targets"]
+        ]
+    return selected
+
+
+def __parse_selected(f, project_keys, target_keys):
+    # 残す値の接頭辞（ijsonのprefix）．targetsは要素ごとに辞書を作ってから値を入れる
+    project = {}
+    wanted = {key for key in project_keys if key != "targets"}
+    target_prefixes = (
+        None
+        if target_keys is None
+        else {f"targets.item.{key}": key for key in target_keys}
+    )
+    builder = None
+    builder_prefix = None
+    for prefix, event, value in ijson.parse(f, use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == builder_prefix and event in ("end_map", "end_array"):
+                destination, key = builder_target
+                destination[key] = builder.value
+                builder = None
+            continue
+
+        if "targets" in project_keys and prefix == "targets.item":
+            if event == "start_map":
+                project["targets"].append({})
+                if target_prefixes is None:
+                    # 全てのキーを残す場合は要素全体を組み立てる
+                    builder = ijson.ObjectBuilder()
+                    builder.event(event, value)
+                    builder_prefix = prefix
+                    builder_target = (project["targets"], len(project["targets"]) - 1)
+            continue
+        if "targets" in project_keys and prefix == "targets" and event == "start_array":
+            project["targets"] = []
+            continue
+
+        if prefix in wanted and "." not in prefix:
+            destination, key = project, prefix
+        elif target_prefixes is not None and prefix in target_prefixes:
+            destination, key = project["targets"][-1], target_prefixes[prefix]
+        else:
+            continue
+        if event in ("start_map", "start_array"):
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+            builder_prefix = prefix
+            builder_target = (destination, key)
+        elif event not in ("map_key", "end_map", "end_array"):
+            destination[key] = value
+    return project
@@ -33,3 +33,12 @@ def resolve_numbers(value, key):
 
 def single_to_double(string):
     return string.replace("'", '"')
+
+
+def generate_file_hash(path, chunk_size=1 << 20):
+    # ファイルの内容からハッシュ値を算出する
+    hash_object = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hash_object.update(chunk)
+    return hash_object.hexdigest()
@@ -0,0 +1,34 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "scratcher"))
+
+import numpy as np
+
+from dtw import DtwQuery, calculate_dtw_cost, band_window
+
+
+def test_single_point_query_with_radius():
+    # 1点のクエリではバンドが候補の後半を覆わないため，下界もDTW距離もinfになる
+    candidate = np.random.default_rng(0).random((10, 2))
+    query = DtwQuery(candidate[:1], radius=2, normalized=True)
+    expected = calculate_dtw_cost(
+        query.get_query(), candidate, band_window(1, len(candidate), 2)
+    )
+
+    assert query.lower_bound(candidate, band_window(1, len(candidate), 2)) == np.inf
+    assert query.score(candidate, normalized=True) == expected
+    assert query.score(candidate, normalized=True, max_distance=1.0) == np.inf
+    distances = query.score_batch(
+        [candidate, candidate[:1], candidate[:2]], normalized=True, k=1
+    )
+    assert distances.shape == (3,)
+    assert distances[1] == 0.0
+
+
+def test_single_point_candidate_with_radius():
+    query = DtwQuery(np.random.default_rng(1).random((5, 2)), radius=1, normalized=True)
+    candidate = np.array([[0.2, 0.3]])
+    assert query.score(candidate, normalized=True, max_distance=10.0) == query.score(
+        candidate, normalized=True
+    )
@@ -0,0 +1,60 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "scratcher"))
+
+import numpy as np
+
+from corpus.store import TrajectoryStore, write_store
+from dtw import DTW, DtwResultCache
+
+
+def _partial_dtw(store, cache, key1, key2):
+    dtw = DTW(windowSize=4, store=store, result_cache=cache)
+    dtw.set_dtw(key1, key2)
+    return dtw.get_dtw([key1, key2])
+
+
+def test_partial_dtw_has_same_type_on_cache_miss_and_hit(tmp_path):
+    rng = np.random.default_rng(0)
+    trajectories = [rng.random((8, 2)), rng.random((10, 2))]
+    write_store(
+        str(tmp_path / "store"),
+        ["1", "2"],
+        trajectories,
+        point_columns={"move_index": [np.arange(8), np.arange(10) + 100]},
+        normalized=True,
+    )
+    store = TrajectoryStore(str(tmp_path / "store"))
+
+    with DtwResultCache(str(tmp_path / "cache.sqlite3")) as cache:
+        computed = _partial_dtw(store, cache, "1", "2")
+        cached = _partial_dtw(store, cache, "1", "2")
+        # IDの順序を入れ替えた場合は範囲も入れ替えて返す
+        reversed_cached = _partial_dtw(store, cache, "2", "1")
+
+    assert isinstance(computed, tuple)
+    assert isinstance(cached, tuple)
+    assert isinstance(reversed_cached, tuple)
+    assert cached == computed
+    assert reversed_cached == (computed[0], computed[2], computed[1])
+    assert computed[1][0] < 100 <= computed[2][0]
+
+
+def test_rebuilt_trajectory_is_not_served_from_cache(tmp_path):
+    rng = np.random.default_rng(1)
+    first = [rng.random((8, 2)), rng.random((10, 2))]
+    second = [first[0], rng.random((10, 2))]
+
+    with DtwResultCache(str(tmp_path / "cache.sqlite3")) as cache:
+        distances = []
+        for trajectories in [first, second, first]:
+            dtw = DTW(result_cache=cache)
+            dtw.set_dtw(*trajectories, normalized=True)
+            distances.append(dtw.get_dtw(["1", "2"]))
+        # 作品2の軌跡を作り直した場合は計算し直し，元の軌跡では保存した結果を使う
+        expected = DTW()
+        expected.set_dtw(*second, normalized=True)
+        assert distances[1] == expected.get_dtw()
+        assert distances[1] != distances[0]
+        assert distances[2] == distances[0]
@@ -0,0 +1,28 @@
+import gc
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "scratcher"))
+
+from utils import ToCsv
+from utils import fileman
+
+
+def test_unclosed_writer_is_collected_and_flushed(tmp_path):
+    path = str(tmp_path / "rows.csv")
+    writer = ToCsv(path, ["a", "b"], flush_interval=0.01)
+    writer.writeRow([1, 2])
+    assert writer in fileman._open_writers
+
+    # 閉じ忘れても終了まで残らず，回収時に残りの行を書き込む
+    del writer
+    gc.collect()
+    assert len(fileman._open_writers) == 0
+    with open(path) as f:
+        assert f.read().splitlines() == ["a,b", "1,2"]
+
+
+def test_closed_writer_leaves_open_writers(tmp_path):
+    with ToCsv(str(tmp_path / "rows.csv")) as writer:
+        writer.writeRow([1])
+    assert writer not in fileman._open_writers
@@ -0,0 +1,29 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "scratcher"))
+
+from index import LshIndex, MinHasher, is_empty_signature
+
+
+def test_empty_signatures_are_not_candidates(tmp_path):
+    hasher = MinHasher(num_perm=32)
+    empty = hasher.get_signature([])
+    script = ["event_whenflagclicked", "motion_movesteps", "motion_turnright"]
+    assert is_empty_signature(empty)
+    assert not is_empty_signature(hasher.get_signature(script))
+
+    index = LshIndex(threshold=0.5, num_perm=32)
+    index.add("empty1", empty)
+    index.add("empty2", empty)
+    index.add("script1", hasher.get_signature(script))
+    index.add("script2", hasher.get_signature(script))
+
+    assert "empty1" in index
+    assert index.query(empty) == []
+    assert index.candidate_pairs(min_similarity=0) == [("script1", "script2", 1.0)]
+
+    index.save(str(tmp_path / "lsh.npz"))
+    loaded = LshIndex.load(str(tmp_path / "lsh.npz"))
+    assert len(loaded) == 4
+    assert loaded.candidate_pairs(min_similarity=0) == [("script1", "script2", 1.0)]
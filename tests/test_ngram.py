@@ -0,0 +1,25 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "scratcher"))
+
+from index import get_project_terms
+
+
+def _block(opcode, next=None, substack=None, top_level=False):
+    inputs = {"SUBSTACK": [2, substack]} if substack else {}
+    return {"opcode": opcode, "next": next, "inputs": inputs, "topLevel": top_level}
+
+
+def test_cyclic_blocks_terminate():
+    # 壊れた作品: nextが先頭に戻り，SUBSTACKが自身を指す
+    blocks = {
+        "a": _block("event_whenflagclicked", next="b", top_level=True),
+        "b": _block("control_repeat", next="a", substack="b"),
+    }
+    project = {"targets": [{"blocks": blocks}]}
+    assert get_project_terms(project, max_n=2) == {
+        "event_whenflagclicked",
+        "control_repeat",
+        "event_whenflagclicked control_repeat",
+    }
@@ -0,0 +1,53 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "scratcher"))
+
+from pipeline.artifacts import ArtifactManifest
+from pipeline.runner import Pipeline, Stage
+
+
+def test_uncached_stage_runs_only_when_downstream_recomputes(tmp_path):
+    calls = []
+
+    def middle(project_id, value):
+        calls.append(project_id)
+        return value * 2
+
+    def build(version):
+        return [
+            Stage(
+                "source",
+                lambda project_id: int(project_id),
+                version="1",
+                source=lambda project_id: f"source-{project_id}",
+            ),
+            Stage("middle", middle, inputs=["source"], version="1", cache=False),
+            Stage(
+                "last",
+                lambda project_id, value: value + 1,
+                inputs=["middle"],
+                version=version,
+            ),
+        ]
+
+    results = {}
+    with ArtifactManifest(str(tmp_path / "manifest.sqlite3")) as manifest:
+        summary = Pipeline(build("1"), manifest=manifest).run(
+            ["1", "2"], lambda project_id, result: results.update({project_id: result})
+        )
+        assert sorted(calls) == ["1", "2"]
+        assert summary["computed"]["middle"] == 2
+        assert results == {"1": {"last": 3}, "2": {"last": 5}}
+
+        # 後のステージを再利用できる場合は，記録しないステージも計算しない
+        calls.clear()
+        summary = Pipeline(build("1"), manifest=manifest).run(["1", "2"])
+        assert calls == []
+        assert summary["reused"]["last"] == 2
+        assert summary["computed"]["middle"] == 0
+
+        # 後のステージのバージョンが変わった場合は計算する
+        summary = Pipeline(build("2"), manifest=manifest).run(["1", "2"])
+        assert sorted(calls) == ["1", "2"]
+        assert summary["computed"]["last"] == 2
@@ -0,0 +1,78 @@
+import os
+import sys
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+SCRATCHER_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "scratcher"
+)
+sys.path.append(SCRATCHER_DIR)
+
+from config.vocabulary import OPCODE_COLUMN, OTHER_ID, get_vocabulary
+from pipeline import sort_project, track_project
+from pipeline.artifacts import load_sorted_csv
+
+PEN_OPCODE = "pen_setPenHueToNumber"
+# 固定のIDを持たない拡張機能のブロック
+OTHER_OPCODE = "customExtension_doSomething"
+
+
+def _pen_project():
+    # Square.jsonの最初の移動ブロックの直後に，ペンのブロックと固定のIDを持たないブロックを挿入する
+    with open(os.path.join(SCRATCHER_DIR, "sample_json", "Square.json")) as f:
+        project = json.load(f)
+    blocks = project["targets"][1]["blocks"]
+    block_hash, block = next(
+        (block_hash, block)
+        for block_hash, block in blocks.items()
+        if block["opcode"].startswith("motion_") and block.get("next")
+    )
+    blocks["pen"] = {
+        "opcode": PEN_OPCODE,
+        "next": block["next"],
+        "parent": block_hash,
+        "inputs": {"HUE": [1, [4, "50"]]},
+        "fields": {},
+        "shadow": False,
+        "topLevel": False,
+    }
+    blocks["other"] = {
+        "opcode": OTHER_OPCODE,
+        "next": block["next"],
+        "parent": "pen",
+        "inputs": {},
+        "fields": {},
+        "shadow": False,
+        "topLevel": False,
+    }
+    blocks["pen"]["next"] = "other"
+    blocks[block["next"]]["parent"] = "other"
+    block["next"] = "pen"
+    return project
+
+
+def _track_sorted_csv(path):
+    # 新しいプロセスの語彙には，ソートしたプロセスで実行時に追加したIDがない
+    return track_project("pen", load_sorted_csv(path))
+
+
+def test_track_sorted_csv_in_another_process(tmp_path):
+    sorted_df = sort_project("pen", _pen_project(), sorted_dir=str(tmp_path))
+    vocabulary = get_vocabulary()
+    # ペンのブロックは固定のIDで保存し，固定のIDを持たないブロックはOTHER_IDで保存する
+    opcode_ids = dict(zip(sorted_df["BlockName"], sorted_df[OPCODE_COLUMN]))
+    assert opcode_ids[PEN_OPCODE] == vocabulary.get_id(PEN_OPCODE)
+    assert opcode_ids[PEN_OPCODE] < vocabulary.get_stable_size()
+    assert opcode_ids[OTHER_OPCODE] == OTHER_ID
+    assert vocabulary.get_id(OTHER_OPCODE) >= vocabulary.get_stable_size()
+    expected = track_project("pen", sorted_df)
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        trajectory = executor.submit(
+            _track_sorted_csv, str(tmp_path / "pen.csv")
+        ).result()
+
+    assert trajectory is not None
+    assert (trajectory == expected).all()
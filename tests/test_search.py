@@ -0,0 +1,57 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "scratcher"))
+
+import numpy as np
+
+from corpus.store import write_store
+from dtw import DtwQuery, calculate_dtw_cost, normalize_coordinate
+from search import MotionSearcher
+
+
+def _trajectories(count=60, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        normalize_coordinate(rng.random((rng.integers(5, 20), 2))) for _ in range(count)
+    ]
+
+
+def _cap(distances):
+    # 中央付近の2つの距離の中間（float32で保存した軌跡の丸め誤差で境界が変わらないように）
+    values = np.sort(distances)
+    return float(values[len(values) // 2] + values[len(values) // 2 + 1]) / 2
+
+
+def test_calculate_dtw_cost_respects_max_cost():
+    x, y = _trajectories(2)
+    cost = calculate_dtw_cost(x, y)
+    assert calculate_dtw_cost(x, y, max_cost=cost) == cost
+    assert calculate_dtw_cost(x, y, max_cost=cost * 0.999) == np.inf
+
+
+def test_score_batch_prunes_above_max_distance():
+    trajectories = _trajectories()
+    query = DtwQuery(trajectories[0], normalized=True)
+    exact = query.score_batch(trajectories, normalized=True)
+    cap = _cap(exact)
+    distances = query.score_batch(trajectories, normalized=True, max_distance=cap)
+    assert np.all(np.isinf(distances[exact > cap]))
+    assert np.array_equal(distances[exact <= cap], exact[exact <= cap])
+
+
+def test_search_excludes_motions_beyond_max_distance(tmp_path):
+    trajectories = _trajectories()
+    write_store(str(tmp_path), range(len(trajectories)), trajectories, normalized=True)
+    exact = DtwQuery(trajectories[0], normalized=True).score_batch(
+        trajectories, normalized=True
+    )
+    cap = _cap(exact)
+
+    for workers in [0, 2]:
+        with MotionSearcher(str(tmp_path), workers=workers, chunk_size=16) as searcher:
+            results = searcher.search(
+                trajectories[0], k=len(trajectories), max_distance=cap
+            )
+        assert len(results) == int(np.sum(exact <= cap))
+        assert all(result["distance"] <= cap for result in results)